@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compression benchmark
+Measures space saved and CPU spent compressing realistic payloads with
+every available compressor.
+
+Usage: ./benchmarks/compression.py [number of payloads]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+from shiftevent import exceptions as x
+from shiftevent.codecs import CodecRegistry
+
+
+def make_payload(i):
+    """ Create a repetitive payload, similar to an order with line items """
+    created = datetime(2019, 1, 1) + timedelta(minutes=i)
+    return dict(
+        order_id='order-{}'.format(i),
+        customer=dict(id=i % 1000, name='Customer name', country='GB'),
+        created=created.isoformat(),
+        status='CONFIRMED',
+        items=[dict(
+            sku='SKU-{:05d}'.format(n),
+            title='Product title number {}'.format(n),
+            quantity=n % 3 + 1,
+            price='{}.99'.format(n % 50),
+            attributes=dict(colour='black', size='M', material='cotton'),
+        ) for n in range(100)],
+    )
+
+
+def run(count=1000):
+    """ Run benchmark and print results """
+    payloads = [make_payload(i) for i in range(count)]
+    plain = CodecRegistry(binary=True)
+    size = sum(len(plain.encode(payload)) for payload in payloads)
+    print('payloads: {}, average size: {:.0f} bytes'.format(
+        count,
+        size / count
+    ))
+
+    print('{:<8} {:>10} {:>8} {:>12} {:>12}'.format(
+        'method', 'avg size', 'ratio', 'encode us', 'decode us'
+    ))
+    compressions = [None]
+    for compressor in CodecRegistry.COMPRESSORS:
+        try:
+            plain.get_compressor(compressor.name)
+        except x.ConfigurationException:
+            continue
+        compressions.append(compressor.name)
+
+    for compression in compressions:
+        registry = CodecRegistry(
+            binary=True,
+            compression=compression,
+            compression_threshold=0
+        )
+
+        start = time.perf_counter()
+        encoded = [registry.encode(payload) for payload in payloads]
+        encode = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for data in encoded:
+            registry.decode(data)
+        decode = time.perf_counter() - start
+
+        compressed = sum(len(data) for data in encoded)
+        print('{:<8} {:>10.0f} {:>8.2f} {:>12.1f} {:>12.1f}'.format(
+            compression or 'none',
+            compressed / count,
+            size / compressed,
+            encode / count * 1e6,
+            decode / count * 1e6,
+        ))
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:2]]
+    run(*args)
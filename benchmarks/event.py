@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Event benchmark
+Measures per-instance memory, construction and attribute access cost of
+event objects. Run it against different revisions to compare.
+
+Usage: ./benchmarks/event.py [number of events]
+"""
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from shiftevent.event import Event
+
+
+def make_event():
+    """ Create an event similar to one loaded from the store """
+    return Event(
+        id=1,
+        created=datetime.utcnow(),
+        type='DUMMY_EVENT',
+        author='benchmark',
+        object_id='123',
+        payload={'body': 'Some event payload'},
+    )
+
+
+def run(count=100000):
+    """ Run benchmark and print results """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    events = [make_event() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    allocated = sum(stat.size_diff for stat in stats)
+
+    event = events[0]
+    number = 1000000
+    get = timeit.timeit(lambda: event.object_id, number=number)
+    set = timeit.timeit(lambda: setattr(event, 'author', 'x'), number=number)
+    create = timeit.timeit(make_event, number=count // 10)
+
+    print('events:         {}'.format(count))
+    print('memory/event:   {:.0f} bytes'.format(allocated / count))
+    print('attribute get:  {:.1f} ns'.format(get / number * 1e9))
+    print('attribute set:  {:.1f} ns'.format(set / number * 1e9))
+    print('construction:   {:.2f} us'.format(create / (count // 10) * 1e6))
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:2]]
+    run(*args)
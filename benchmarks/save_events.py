@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Bulk save benchmark
+Compares throughput of saving events one by one with event() against
+bulk inserts with save_events() on a file-based SQLite database.
+
+Usage: ./benchmarks/save_events.py [number of events] [batch size]
+"""
+import os
+import sys
+import tempfile
+import time
+from shiftevent.db import Db
+from shiftevent.event import Event
+from shiftevent.event_service import EventService
+
+
+def make_service(path):
+    """ Create event service over a fresh database """
+    if os.path.exists(path):
+        os.remove(path)
+    db = Db('sqlite:///{}'.format(path))
+    db.meta.create_all()
+    return EventService(db=db)
+
+
+def make_events(count):
+    """ Generate event data """
+    for i in range(count):
+        yield dict(
+            type='DUMMY_EVENT',
+            author='benchmark',
+            object_id=str(i % 100),
+            payload={'number': i, 'body': 'Some event payload'},
+        )
+
+
+def run(count=2000, batch_size=500):
+    """ Run benchmark and print results """
+    path = os.path.join(tempfile.gettempdir(), 'shiftevent_bench.db')
+
+    service = make_service(path)
+    start = time.perf_counter()
+    for data in make_events(count):
+        service.event(**data)
+    single = time.perf_counter() - start
+
+    service = make_service(path)
+    start = time.perf_counter()
+    service.save_events(
+        (Event(**data) for data in make_events(count)),
+        batch_size=batch_size
+    )
+    bulk = time.perf_counter() - start
+    os.remove(path)
+
+    print('events:        {}'.format(count))
+    print('event():       {:.0f} events/sec'.format(count / single))
+    print('save_events(): {:.0f} events/sec'.format(count / bulk))
+    print('speedup:       {:.1f}x'.format(single / bulk))
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*args)
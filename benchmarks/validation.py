@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Validation benchmark
+Compares per-event cost of the reference EventSchema and the precompiled
+EventValidator.
+
+Usage: ./benchmarks/validation.py [number of events]
+"""
+import sys
+import timeit
+from shiftevent.event import Event
+from shiftevent.event import EventSchema
+from shiftevent.event import EventValidator
+
+
+def run(count=20000):
+    """ Run benchmark and print results """
+    event = Event(
+        type=' dummy_event ',
+        author=' benchmark ',
+        object_id=' 123 ',
+        payload={'body': 'Some event payload'},
+    )
+    validator = EventValidator()
+
+    schema = timeit.timeit(lambda: EventSchema().process(event), number=count)
+    fast = timeit.timeit(lambda: validator.validate(event), number=count)
+
+    print('events:          {}'.format(count))
+    print('EventSchema:     {:.2f} us/event'.format(schema / count * 1e6))
+    print('EventValidator:  {:.2f} us/event'.format(fast / count * 1e6))
+    print('speedup:         {:.0f}x'.format(schema / fast))
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:2]]
+    run(*args)
@@ -89,9 +89,15 @@ setup(**dict(
     # project dependencies
     install_requires=[
         'shiftschema>=0.2.0,<0.3.0',
-        'SQLAlchemy>=1.3.1,<1.4.0'
+        'SQLAlchemy>=1.3.1,<1.5.0'
     ],
 
+    # optional dependencies
+    extras_require={
+        'codecs': ['orjson', 'ujson', 'msgpack', 'zstandard'],
+        'async': ['SQLAlchemy>=1.4.0,<1.5.0', 'aiosqlite'],
+    },
+
 
     # project license
     license=license_type
@@ -1,3 +1,32 @@
-from .event_service import EventService
-from .event import Event
-from .db import Db
+# public api, imported on first access to keep package import fast
+exports = dict(
+    EventService='shiftevent.event_service',
+    AsyncEventService='shiftevent.async_event_service',
+    Event='shiftevent.event',
+    Db='shiftevent.db',
+)
+
+__all__ = list(exports)
+
+
+def __getattr__(name):
+    """
+    Module getattr
+    Imports public api lazily, so that importing the package does not pull
+    in SQLAlchemy until a service or database is actually used.
+    :param name: str, attribute name
+    :return: object
+    """
+    if name not in exports:
+        msg = 'module {!r} has no attribute {!r}'
+        raise AttributeError(msg.format(__name__, name))
+
+    from importlib import import_module
+    value = getattr(import_module(exports[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """ Lists public api along with module attributes """
+    return sorted(list(globals()) + __all__)
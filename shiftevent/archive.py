@@ -0,0 +1,140 @@
+from shiftevent import exceptions as x
+from sqlalchemy import sql
+
+
+class Archiver:
+    """
+    Archiver
+    Moves events created before a cutoff date from event store to archive
+    table in batches. Every batch is copied and deleted in its own short
+    transaction, so the hot table is never locked for long and archiving
+    can be interrupted and resumed at any time. Latest event of every
+    object always stays in the store, as object versions are counted
+    from there.
+
+    Archived events remain readable by event services configured with
+    read_archive. With natively partitioned archive on postgresql yearly
+    partitions are created as events are moved in.
+    """
+
+    def __init__(self, service, batch_size=1000):
+        """
+        Initialize archiver
+        :param service: shiftevent.event_service.EventService
+        :param batch_size: int, max number of events moved per transaction
+        """
+        if batch_size < 1:
+            msg = 'Batch size must be a positive integer, got {}'
+            raise x.ConfigurationException(msg.format(batch_size))
+
+        self.service = service
+        self.batch_size = batch_size
+
+    def __repr__(self):
+        """ Returns printable representation of an archiver """
+        return '<Archiver batch_size=[{}]>'.format(self.batch_size)
+
+    @property
+    def partitioned(self):
+        """
+        Partitioned
+        Returns whether archive is natively partitioned on postgresql,
+        where partitions have to be created before rows are moved in
+        :return: bool
+        """
+        archive = self.service.db.tables['archive']
+        return bool(archive.kwargs.get('postgresql_partition_by'))
+
+    def candidates(self, before):
+        """
+        Candidates
+        Builds a query selecting next batch of events to archive: created
+        before cutoff and followed by a newer event of the same object
+        (or not belonging to any object).
+
+        :param before: datetime, archive events created before this date
+        :return: sqlalchemy.sql.Select
+        """
+        events = self.service.db.tables['events']
+        newer = events.alias('newer')
+        superseded = sql.exists().where(sql.and_(
+            newer.c.object_id == events.c.object_id,
+            newer.c.id > events.c.id
+        ))
+
+        query = sql.select([events.c.id, events.c.created])
+        query = query.where(events.c.created < before)
+        query = query.where(sql.or_(events.c.object_id.is_(None), superseded))
+        return query.order_by(events.c.created).limit(self.batch_size)
+
+    def create_partitions(self, conn, since, until):
+        """
+        Create partitions
+        Creates yearly archive partitions covering date range, if missing.
+
+        :param conn: sqlalchemy.engine.Connection
+        :param since: datetime, earliest date to cover
+        :param until: datetime, latest date to cover
+        :return: None
+        """
+        name = self.service.db.tables['archive'].name
+        ddl = 'CREATE TABLE IF NOT EXISTS {name}_{year} PARTITION OF {name} ' \
+              'FOR VALUES FROM (\'{year}-01-01\') TO (\'{next}-01-01\')'
+        for year in range(since.year, until.year + 1):
+            ddl_year = ddl.format(name=name, year=year, next=year + 1)
+            conn.execute(sql.text(ddl_year))
+
+    def archive_batch(self, before):
+        """
+        Archive batch
+        Moves a single batch of events to archive in one transaction.
+
+        :param before: datetime, archive events created before this date
+        :return: int, number of events archived
+        """
+        events = self.service.db.tables['events']
+        archive = self.service.db.tables['archive']
+        columns = [column.name for column in events.columns]
+
+        with self.service.db.engine.begin() as conn:
+            rows = conn.execute(self.candidates(before)).fetchall()
+            if not rows:
+                return 0
+
+            if self.partitioned:
+                dates = [row[1] for row in rows]
+                self.create_partitions(conn, min(dates), max(dates))
+
+            ids = [row[0] for row in rows]
+            chunk_size = self.service.MAX_PARAMS.get(conn.dialect.name, 999)
+            for i in range(0, len(ids), chunk_size):
+                chunk = ids[i:i + chunk_size]
+                select = events.select().where(events.c.id.in_(chunk))
+                conn.execute(archive.insert().from_select(columns, select))
+                conn.execute(events.delete().where(events.c.id.in_(chunk)))
+
+        return len(ids)
+
+    def archive(self, before, max_batches=None, progress=None):
+        """
+        Archive
+        Moves events created before cutoff to archive batch by batch until
+        there is nothing left to move.
+
+        :param before: datetime, archive events created before this date
+        :param max_batches: int, stop after this many batches
+        :param progress: callable, accepts number of events archived so far
+        :return: int, number of events archived
+        """
+        archived = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = self.archive_batch(before)
+            archived += moved
+            batches += 1
+            if moved and progress:
+                progress(archived)
+            if moved < self.batch_size:
+                break
+
+        return archived
@@ -0,0 +1,346 @@
+from inspect import isawaitable
+from time import perf_counter
+from shiftevent.event import Event
+from shiftevent.event_service import BaseEventService
+from shiftevent import exceptions as x
+from sqlalchemy.exc import IntegrityError
+
+
+class AsyncEventService(BaseEventService):
+    """
+    Async event service
+    Asyncio counterpart of event service. Runs on SQLAlchemy async engine
+    (requires SQLAlchemy 1.4 and an async driver, like aiosqlite or asyncpg)
+    and supports handlers with async handle and rollback methods alongside
+    regular ones.
+    """
+
+    # whether service can run handlers with async handle/rollback
+    async_handlers = True
+
+    async def event(
+        self,
+        type,
+        author,
+        object_id=None,
+        payload=None,
+        payload_rollback=None,
+        expected_version=None):
+        """
+        Persist an event
+        Creates a new event object, validates it and saves to the database.
+        See EventService.event() for details.
+
+        :param type: str, event type
+        :param author:  str, author id in external system
+        :param object_id: str, an id of the object being affected
+        :param payload: dict, event payload
+        :param payload_rollback: dict, payload to roll back an event
+        :param expected_version: int, current version of the object
+        :return: shiftevent.event.Event
+        """
+        event = Event(
+            type=type,
+            author=author,
+            object_id=object_id,
+            payload=payload,
+            payload_rollback=payload_rollback
+        )
+
+        event = await self.save_event(event, expected_version=expected_version)
+        return event
+
+    async def emit(self, event):
+        """
+        Emit event
+        Sequentially executes every handler in the chain for the event,
+        awaiting async handlers. On failure rolls back handlers that ran
+        and drops the event from the store.
+        :param event: shiftevent.events.event.Event
+        :return: shiftevent.event.Event
+        """
+        chain = self.chains.get(event.type)
+        if chain is None:
+            raise x.EventError('No handlers for event {}'.format(event.type))
+
+        # instantiate handlers
+        if not self.reuse_handlers:
+            context = self.handler_context
+            chain = [handler(context=context) for handler in chain]
+
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+            self.instrument(chain)
+
+        # run chain
+        ran = []
+        for handler in chain:
+            try:
+                ran.append(handler)
+                handled = handler.handle_event(event)
+                if isawaitable(handled):
+                    handled = await handled
+                if handled:
+                    event = handled
+                else:
+                    break  # skip next handler
+            except Exception as handler_exception:
+
+                # first, reverse all handlers that ran
+                for handler in ran:
+                    handled = handler.rollback_event(event)
+                    if isawaitable(handled):
+                        handled = await handled
+                    if handled:
+                        event = handled
+
+                # drop event from the store
+                events = self.db.tables['events']
+                async with self.db.async_engine.begin() as conn:
+                    await conn.execute(events.delete().where(
+                        events.c.id == event.id
+                    ))
+                if self.cache is not None:
+                    self.cache.invalidate(event.id)
+                if metrics is not None:
+                    metrics.increment('events_failed_total', type=event.type)
+
+                # re-raise the exception
+                raise handler_exception
+
+        if metrics is not None:
+            self.record('emit', event, start)
+            metrics.increment('events_emitted_total', type=event.type)
+
+        # return event at the end
+        return event
+
+    async def save_event(self, event, expected_version=None):
+        """
+        Save event
+        Validates and persist event object, assigning next object version
+        to new events. See EventService.save_event() for details.
+
+        :param event: shiftevent.event.Event
+        :param expected_version: int, current version of the object
+        :return: shiftevent.event.Event
+        """
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+
+        self.validate_event(event)
+        if metrics is not None:
+            self.record('validate', event, start)
+            start = perf_counter()
+
+        # update
+        events = self.db.tables['events']
+        if event.id:
+            async with self.db.async_engine.begin() as conn:
+                data = event.to_db(self.codecs)
+                del data['id']
+                query = events.update().where(events.c.id == event.id)
+                await conn.execute(query.values(**data))
+            if self.cache is not None:
+                self.cache.invalidate(event.id)
+            if metrics is not None:
+                self.record('update', event, start)
+            return event
+
+        # insert
+        if expected_version is not None and event.object_id is None:
+            msg = 'Expected version requires event to have an object id'
+            raise x.EventError(msg)
+
+        attempts = self.VERSION_RETRIES if expected_version is None else 1
+        for _ in range(attempts):
+            try:
+                async with self.db.async_engine.begin() as conn:
+                    if event.object_id is not None:
+                        version = await self.get_version(event.object_id, conn)
+                        if expected_version is not None \
+                                and version != expected_version:
+                            raise x.ConcurrencyError(
+                                object_id=event.object_id,
+                                expected_version=expected_version,
+                                actual_version=version
+                            )
+                        event.version = version + 1
+
+                    data = event.to_db(self.codecs)
+                    del data['id']
+                    result = await conn.execute(events.insert(), data)
+                    event.id = result.inserted_primary_key[0]
+                if metrics is not None:
+                    self.record('insert', event, start)
+                    metrics.increment('events_saved_total', type=event.type)
+                return event
+            except IntegrityError:
+                if not await self.version_taken(event):
+                    raise
+
+        raise x.ConcurrencyError(
+            object_id=event.object_id,
+            expected_version=expected_version,
+            actual_version=await self.get_version(event.object_id)
+        )
+
+    async def get_version(self, object_id, conn=None):
+        """
+        Get version
+        Returns current version of an object, or 0 if there are no events.
+
+        :param object_id: str, id of the object
+        :param conn: sqlalchemy.ext.asyncio.AsyncConnection, optional
+        :return: int
+        """
+        if not conn:
+            async with self.db.async_engine.begin() as conn:
+                return await self.get_version(object_id, conn)
+
+        object_id = str(object_id)
+        result = await conn.execute(self.versions_query([object_id]))
+        row = result.fetchone()
+        return (row[1] or 0) if row else 0
+
+    async def version_taken(self, event):
+        """
+        Version taken
+        Checks if the version assigned to an event that failed to insert
+        has since been written by someone else.
+
+        :param event: shiftevent.event.Event
+        :return: bool
+        """
+        if event.object_id is None or not event.version:
+            return False
+        return await self.get_version(event.object_id) >= event.version
+
+    async def get_event(self, id):
+        """
+        Get event
+        Returns event found by unique id. Reads through event cache
+        if configured.
+        :param id: int, event id
+        :return: shiftevent.event.Event
+        """
+        if self.cache is not None:
+            data = self.cache.get(id)
+            if data:
+                return Event.from_db(data, self.codecs)
+
+        tables = [self.db.tables['events']]
+        if self.read_archive:
+            tables.append(self.db.tables['archive'])
+
+        async with self.db.async_engine.begin() as conn:
+            for events in tables:
+                select = events.select().where(events.c.id == id)
+                result = await conn.execute(select)
+                data = result.fetchone()
+                if data:
+                    break
+
+        if not data:
+            return None
+        if self.cache is not None:
+            self.cache.put(id, data._mapping)
+        return Event.from_db(data._mapping, self.codecs)
+
+    async def get_events(self, ids):
+        """
+        Get events
+        Returns events found by ids in the order ids were given, with None
+        in place of events that don't exist.
+        See EventService.get_events() for details.
+
+        :param ids: iterable, event ids
+        :return: list of shiftevent.event.Event or None
+        """
+        ids = list(ids)
+        rows = dict()
+        if self.cache is not None:
+            for id in set(ids):
+                data = self.cache.get(id)
+                if data:
+                    rows[id] = data
+
+        tables = [self.db.tables['events']]
+        if self.read_archive:
+            tables.append(self.db.tables['archive'])
+
+        for events in tables:
+            missing = [id for id in set(ids) if id not in rows]
+            if not missing:
+                break
+
+            async with self.db.async_engine.begin() as conn:
+                chunk_size = self.MAX_PARAMS.get(conn.dialect.name, 999)
+                for i in range(0, len(missing), chunk_size):
+                    chunk = missing[i:i + chunk_size]
+                    query = events.select().where(events.c.id.in_(chunk))
+                    result = await conn.execute(query)
+                    for data in result.fetchall():
+                        data = dict(data._mapping)
+                        rows[data['id']] = data
+                        if self.cache is not None:
+                            self.cache.put(data['id'], data)
+
+        return [
+            Event.from_db(rows[id], self.codecs) if id in rows else None
+            for id in ids
+        ]
+
+    async def get_stream(self, object_id, from_id=None, to_id=None,
+                         reverse=False, limit=None):
+        """
+        Get stream
+        Returns events for a single object ordered by id.
+        See EventService.get_stream() for details.
+
+        :param object_id: str, object id to get events for
+        :param from_id: int, only return events starting from this id
+        :param to_id: int, only return events up to and including this id
+        :param reverse: bool, return newest events first
+        :param limit: int, maximum number of events to return
+        :return: list of shiftevent.event.Event
+        """
+        query = self.stream_query(object_id, from_id, to_id, reverse, limit)
+        async with self.db.async_engine.begin() as conn:
+            result = await conn.execute(query)
+            rows = result.fetchall()
+        return [Event.from_db(row._mapping, self.codecs) for row in rows]
+
+    async def iter_events(self, after_id=None, batch_size=1000, types=None,
+                          until=None):
+        """
+        Iterate events
+        Returns an async generator over stored events in id order, reading
+        the store page by page with keyset pagination.
+        See EventService.iter_events() for details.
+
+        :param after_id: int, only return events with greater ids
+        :param batch_size: int, number of events to fetch per query
+        :param types: str or list, only return events of these types
+        :param until: datetime, only return events created up to this time
+        :return: async generator of shiftevent.event.Event
+        """
+        if batch_size < 1:
+            msg = 'Batch size must be a positive integer, got {}'
+            raise x.ConfigurationException(msg.format(batch_size))
+
+        last = after_id
+        while True:
+            query = self.page_query(last, batch_size, types, until)
+            async with self.db.async_engine.connect() as conn:
+                result = await conn.execute(query)
+                rows = result.fetchall()
+
+            for row in rows:
+                last = row._mapping['id']
+                yield Event.from_db(row._mapping, self.codecs)
+
+            if len(rows) < batch_size:
+                break
@@ -0,0 +1,240 @@
+import os
+import platform
+import random
+import tempfile
+import time
+from datetime import datetime
+from shiftevent.db import Db
+from shiftevent.event import Event
+from shiftevent.event_service import EventService
+from shiftevent.handlers import BaseHandler
+from shiftevent.replay import Replay
+
+# databases to run benchmarks against
+DATABASES = ('sqlite-file', 'sqlite-memory')
+
+# benchmarks in order of execution
+BENCHMARKS = (
+    'event_create',
+    'event_to_db',
+    'event_from_db',
+    'append',
+    'emit',
+    'get_event',
+    'scan',
+    'replay',
+)
+
+
+class BenchHandler(BaseHandler):
+    """
+    Bench handler
+    Does nothing, measures the cost of running handler chains
+    """
+    EVENT_TYPES = ('BENCH_EVENT',)
+
+    def handle(self, event):
+        return event
+
+    def rollback(self, event):
+        return event
+
+
+def percentile(values, percent):
+    """
+    Percentile
+    Returns nearest-rank percentile of sorted values.
+    :param values: list, sorted values
+    :param percent: float, percentile to get
+    :return: float
+    """
+    index = max(0, int(round(percent / 100 * len(values))) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def summarize(durations):
+    """
+    Summarize
+    Returns statistics of measured operation durations. Latencies are
+    reported in microseconds.
+    :param durations: list, durations in seconds
+    :return: dict
+    """
+    values = sorted(durations)
+    total = sum(values)
+    micro = 1000000
+    return dict(
+        count=len(values),
+        seconds=total,
+        ops_per_sec=len(values) / total if total else 0.0,
+        mean=total / len(values) * micro,
+        min=values[0] * micro,
+        p50=percentile(values, 50) * micro,
+        p90=percentile(values, 90) * micro,
+        p99=percentile(values, 99) * micro,
+        max=values[-1] * micro,
+    )
+
+
+def measure(operation, items):
+    """
+    Measure
+    Runs operation for every item and returns statistics of durations.
+    :param operation: callable, accepts a single item
+    :param items: iterable, items to run operation for
+    :return: dict
+    """
+    clock = time.perf_counter
+    durations = []
+    for item in items:
+        start = clock()
+        operation(item)
+        durations.append(clock() - start)
+    return summarize(durations)
+
+
+def event_data(count):
+    """
+    Event data
+    Generates benchmark event data.
+    :param count: int, number of events
+    :return: list of dicts
+    """
+    return [dict(
+        type='BENCH_EVENT',
+        author='benchmark',
+        object_id=str(i % 100),
+        payload={'number': i, 'body': 'Some event payload', 'tags': ['a']},
+    ) for i in range(count)]
+
+
+def make_service(database, handlers=1):
+    """
+    Make service
+    Creates event service over a fresh database.
+    :param database: str, one of DATABASES
+    :param handlers: int, number of handlers in the chain
+    :return: tuple, event service and database file path or None
+    """
+    path = None
+    url = 'sqlite://'
+    if database == 'sqlite-file':
+        handle, path = tempfile.mkstemp(prefix='shiftevent_bench_')
+        os.close(handle)
+        url = 'sqlite:///{}'.format(path)
+
+    db = Db(url)
+    db.meta.create_all()
+    chain = [BenchHandler] * handlers
+    service = EventService(db=db, handlers=dict(BENCH_EVENT=chain))
+    return service, path
+
+
+def run_database(database, count=1000, handlers=3):
+    """
+    Run database
+    Runs all benchmarks against a single database.
+    :param database: str, one of DATABASES
+    :param count: int, number of events to run each benchmark with
+    :param handlers: int, number of handlers in emit chain
+    :return: dict, benchmark name to statistics
+    """
+    results = dict()
+    data = event_data(count)
+    service, path = make_service(database, handlers)
+    try:
+        events = [Event(**item) for item in data]
+        rows = [event.to_db(service.codecs) for event in events]
+        for i, row in enumerate(rows):
+            row['id'] = i + 1
+
+        results['event_create'] = measure(lambda d: Event(**d), data)
+        results['event_to_db'] = measure(
+            lambda e: e.to_db(service.codecs),
+            events
+        )
+        results['event_from_db'] = measure(
+            lambda r: Event.from_db(r, service.codecs).payload,
+            rows
+        )
+
+        saved = []
+        results['append'] = measure(
+            lambda d: saved.append(service.event(**d)),
+            data
+        )
+        results['emit'] = measure(service.emit, saved)
+
+        ids = [event.id for event in saved]
+        random.Random(count).shuffle(ids)
+        results['get_event'] = measure(service.get_event, ids)
+
+        scan = service.iter_events(batch_size=500)
+        results['scan'] = measure(lambda _: next(scan).payload, ids)
+        scan.close()
+
+        replay = Replay(service, [BenchHandler], workers=0, batch_size=500)
+        start = time.perf_counter()
+        replayed = replay.run()
+        seconds = time.perf_counter() - start
+        results['replay'] = dict(
+            count=replayed,
+            seconds=seconds,
+            ops_per_sec=replayed / seconds if seconds else 0.0,
+        )
+    finally:
+        service.db.engine.dispose()
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    return results
+
+
+def run(databases=DATABASES, count=1000, handlers=3):
+    """
+    Run
+    Runs benchmark suite and returns results with environment details
+    that can be written as json and compared across runs.
+    :param databases: list, databases to run against
+    :param count: int, number of events to run each benchmark with
+    :param handlers: int, number of handlers in emit chain
+    :return: dict
+    """
+    import sqlalchemy
+    return dict(
+        meta=dict(
+            created=datetime.utcnow().isoformat(),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            sqlalchemy=sqlalchemy.__version__,
+            events=count,
+            handlers=handlers,
+        ),
+        results={
+            database: run_database(database, count, handlers)
+            for database in databases
+        },
+    )
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compare
+    Finds benchmarks whose throughput dropped below baseline by more than
+    tolerance.
+    :param results: dict, current run
+    :param baseline: dict, previous run
+    :param tolerance: float, allowed relative slowdown
+    :return: list of tuples, (database, benchmark, baseline ops, ops)
+    """
+    regressions = []
+    for database, benchmarks in results['results'].items():
+        previous = baseline.get('results', {}).get(database, {})
+        for name, stats in benchmarks.items():
+            if name not in previous:
+                continue
+            was = previous[name]['ops_per_sec']
+            now = stats['ops_per_sec']
+            if now < was * (1 - tolerance):
+                regressions.append((database, name, was, now))
+    return regressions
@@ -0,0 +1,145 @@
+import sys
+import threading
+from collections import OrderedDict
+from shiftevent import exceptions as x
+
+
+class EventCache:
+    """
+    Event cache
+    In-process LRU cache of event rows used by event service to serve
+    repeated reads by id without querying the database. Bounded by number
+    of events, estimated memory or both, evicting least recently used
+    events first. Cache keeps raw database rows rather than event objects,
+    so every read gets its own event that handlers are free to modify,
+    while payloads are still only decoded on access. Safe to share between
+    threads.
+    """
+
+    def __init__(self, max_size=1000, max_bytes=None):
+        """
+        Initialize cache
+        :param max_size: int, max number of events to keep, None for no limit
+        :param max_bytes: int, max estimated memory of cached events in bytes,
+                          None for no limit
+        """
+        if not max_size and not max_bytes:
+            msg = 'Event cache requires max size or max bytes to be set'
+            raise x.ConfigurationException(msg)
+
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.rows = OrderedDict()
+        self.sizes = dict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, id):
+        return id in self.rows
+
+    def measure(self, row):
+        """
+        Measure
+        Estimates memory used by a cached row.
+        :param row: dict, event row
+        :return: int, size in bytes
+        """
+        size = sys.getsizeof(row)
+        for value in row.values():
+            size += sys.getsizeof(value)
+        return size
+
+    def get(self, id):
+        """
+        Get
+        Returns cached row and marks it as recently used.
+        :param id: int, event id
+        :return: dict or None
+        """
+        with self.lock:
+            row = self.rows.get(id)
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.rows.move_to_end(id)
+            return row
+
+    def put(self, id, row):
+        """
+        Put
+        Caches event row, evicting least recently used rows if over limits.
+        :param id: int, event id
+        :param row: dict, event row
+        :return: None
+        """
+        row = dict(row)
+        size = self.measure(row)
+        if self.max_bytes and size > self.max_bytes:
+            return
+
+        with self.lock:
+            self.discard(id)
+            self.rows[id] = row
+            self.sizes[id] = size
+            self.bytes += size
+            while (self.max_size and len(self.rows) > self.max_size) \
+                    or (self.max_bytes and self.bytes > self.max_bytes):
+                self.discard(next(iter(self.rows)))
+                self.evictions += 1
+
+    def invalidate(self, id):
+        """
+        Invalidate
+        Drops event from cache, if cached.
+        :param id: int, event id
+        :return: None
+        """
+        with self.lock:
+            self.discard(id)
+
+    def discard(self, id):
+        """
+        Discard
+        Drops cached row without locking, callers must hold the lock.
+        :param id: int, event id
+        :return: None
+        """
+        if id in self.rows:
+            del self.rows[id]
+            self.bytes -= self.sizes.pop(id)
+
+    def clear(self):
+        """
+        Clear
+        Drops all cached events, keeps statistics.
+        :return: None
+        """
+        with self.lock:
+            self.rows.clear()
+            self.sizes.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """
+        Stats
+        Returns cache statistics.
+        :return: dict
+        """
+        with self.lock:
+            requests = self.hits + self.misses
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                hit_rate=self.hits / requests if requests else 0.0,
+                evictions=self.evictions,
+                size=len(self.rows),
+                bytes=self.bytes,
+            )
@@ -27,5 +27,170 @@ def test(nose_argsuments):
     run(argv=params)
 
 
+@cli.command(name='bench')
+@click.option('--events', '-n', default=1000, help='Events per benchmark')
+@click.option('--handlers', default=3, help='Handlers in emit chain')
+@click.option(
+    '--db',
+    'databases',
+    multiple=True,
+    type=click.Choice(['sqlite-file', 'sqlite-memory']),
+    help='Database to run against, all by default'
+)
+@click.option('--output', '-o', type=click.Path(), help='Write json here')
+@click.option('--baseline', type=click.Path(exists=True),
+              help='Json results to check for regressions against')
+@click.option('--tolerance', default=0.1, help='Allowed relative slowdown')
+def bench(events, handlers, databases, output, baseline, tolerance):
+    """ Run performance benchmarks """
+    import json
+    from shiftevent import bench as benchmarks
 
+    databases = databases or benchmarks.DATABASES
+    results = benchmarks.run(databases, events, handlers)
 
+    columns = ('ops/sec', 'p50 us', 'p90 us', 'p99 us')
+    for database, stats in results['results'].items():
+        click.echo(yellow('\n{} ({} events)'.format(database, events)))
+        click.echo('{:<16}'.format('') + ''.join(
+            '{:>12}'.format(column) for column in columns
+        ))
+        for name in benchmarks.BENCHMARKS:
+            row = stats[name]
+            values = [row['ops_per_sec']]
+            values += [row.get(p) for p in ('p50', 'p90', 'p99')]
+            click.echo('{:<16}'.format(name) + ''.join(
+                '{:>12}'.format('-' if v is None else '{:.1f}'.format(v))
+                for v in values
+            ))
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+        click.echo(green('\nResults written to {}'.format(output)))
+
+    if baseline:
+        with open(baseline) as file:
+            baseline = json.load(file)
+        regressions = benchmarks.compare(results, baseline, tolerance)
+        for database, name, was, now in regressions:
+            msg = 'Regression: {} {} {:.1f} -> {:.1f} ops/sec'
+            click.echo(red(msg.format(database, name, was, now)))
+        if regressions:
+            raise click.exceptions.Exit(1)
+        click.echo(green('No regressions against baseline'))
+
+
+@cli.command(name='profile')
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--limit', '-n', default=10, help='Functions per handler')
+@click.option(
+    '--sort',
+    default='cumulative',
+    type=click.Choice(['cumulative', 'tottime', 'calls']),
+    help='Order functions by'
+)
+def profile(path, limit, sort):
+    """ Summarize handler profiles """
+    from shiftevent.profiler import summarize
+
+    summary = summarize(path, limit, sort)
+    if not summary:
+        click.echo(red('No handler profiles found in {}'.format(path)))
+        raise click.exceptions.Exit(1)
+
+    columns = ('calls', 'tottime', 'cumtime')
+    for handler, rows in summary.items():
+        click.echo(yellow('\n{}'.format(handler)))
+        click.echo(''.join('{:>10}'.format(c) for c in columns) + '  function')
+        for row in rows:
+            click.echo('{:>10}{:>10.4f}{:>10.4f}  {}'.format(
+                row['calls'],
+                row['tottime'],
+                row['cumtime'],
+                row['function']
+            ))
+
+
+def transfer_service(db_url, binary_payloads):
+    """ Create event service to export from or import to """
+    from shiftevent.db import Db
+    from shiftevent.event_service import EventService
+    db = Db(db_url, binary_payloads=binary_payloads)
+    return EventService(db=db)
+
+
+def transfer_progress(action):
+    """ Create progress callback printing number of events """
+    def progress(events, last_id):
+        msg = '\r{} {} events, last id {}'.format(action, events, last_id)
+        click.echo(msg, nl=False)
+    return progress
+
+
+def transfer_report(action, stats):
+    """ Print transfer throughput """
+    msg = '\n{} {} events in {:.1f}s: {:.0f} events/sec, {:.1f} MB/sec'
+    click.echo(green(msg.format(
+        action,
+        stats['events'],
+        stats['seconds'],
+        stats['events_per_sec'],
+        stats['bytes_per_sec'] / 1024 / 1024
+    )))
+
+
+@cli.command(name='export')
+@click.argument('path', type=click.Path())
+@click.option('--db-url', required=True, help='Database to export from')
+@click.option('--binary-payloads', is_flag=True,
+              help='Database stores payloads in binary columns')
+@click.option('--batch-size', default=1000, help='Events per page')
+@click.option(
+    '--compression',
+    type=click.Choice(['gzip', 'zstd', 'none']),
+    help='Detected from file extension by default'
+)
+@click.option('--type', 'types', multiple=True, help='Only export this type')
+@click.option('--resume', is_flag=True, help='Resume interrupted export')
+def export(path, db_url, binary_payloads, batch_size, compression, types,
+           resume):
+    """ Export events to ndjson file """
+    from shiftevent.transfer import Exporter
+
+    service = transfer_service(db_url, binary_payloads)
+    stats = Exporter(service, batch_size).export(
+        path,
+        compression=compression,
+        types=list(types) or None,
+        resume=resume,
+        progress=transfer_progress('Exported')
+    )
+    transfer_report('Exported', stats)
+
+
+@cli.command(name='import')
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--db-url', required=True, help='Database to import to')
+@click.option('--binary-payloads', is_flag=True,
+              help='Database stores payloads in binary columns')
+@click.option('--batch-size', default=5000, help='Events per transaction')
+@click.option(
+    '--compression',
+    type=click.Choice(['gzip', 'zstd', 'none']),
+    help='Detected from file extension by default'
+)
+@click.option('--resume', is_flag=True, help='Skip events already imported')
+def import_events(path, db_url, binary_payloads, batch_size, compression,
+                  resume):
+    """ Import events from ndjson file """
+    from shiftevent.transfer import Importer
+
+    service = transfer_service(db_url, binary_payloads)
+    stats = Importer(service, batch_size).import_events(
+        path,
+        compression=compression,
+        resume=resume,
+        progress=transfer_progress('Imported')
+    )
+    transfer_report('Imported', stats)
@@ -0,0 +1,489 @@
+import abc
+import base64
+import importlib
+import json
+import zlib
+from shiftevent import exceptions as x
+
+# optional dependencies, loaded when their codec is first requested
+OPTIONAL = ('orjson', 'ujson', 'msgpack', 'zstandard')
+
+# loaded optional dependencies, none if not installed
+modules = dict()
+
+
+def load(name):
+    """
+    Load
+    Imports optional dependency on first use.
+    :param name: str, module name
+    :return: module or None if not installed
+    """
+    if name not in modules:
+        try:
+            modules[name] = importlib.import_module(name)
+        except ImportError:  # pragma: no cover
+            modules[name] = None
+    return modules[name]
+
+
+def __getattr__(name):
+    """
+    Module getattr
+    Loads optional dependencies on first access: importing them all takes
+    longer than the rest of the package and most stores use none.
+    :param name: str, attribute name
+    :return: module or None if not installed
+    """
+    if name in OPTIONAL:
+        return load(name)
+    msg = 'module {!r} has no attribute {!r}'
+    raise AttributeError(msg.format(__name__, name))
+
+
+class BaseCodec(metaclass=abc.ABCMeta):
+    """
+    Base payload codec
+    Encodes event payloads for persistence and decodes them back. Codecs
+    producing plain json don't define a header as their output can be read
+    by any json codec. Other codecs must define a header that is written
+    in front of every encoded payload, so that rows written with different
+    codecs can be read side by side.
+    """
+
+    # codec name to reference it in configuration
+    name = None
+
+    # header to prefix encoded payloads with, none for plain json
+    header = None
+
+    # whether codec produces bytes, which are stored base64-encoded
+    binary = False
+
+    # optional dependency module the codec requires
+    requires = None
+
+    @abc.abstractmethod
+    def encode(self, payload):
+        """
+        Encode payload
+        :param payload: dict
+        :return: str or bytes
+        """
+        raise NotImplemented('Implement me in your concrete codec')
+
+    @abc.abstractmethod
+    def decode(self, data):
+        """
+        Decode payload
+        :param data: str or bytes
+        :return: dict
+        """
+        raise NotImplemented('Implement me in your concrete codec')
+
+
+class JsonCodec(BaseCodec):
+    """
+    Json codec
+    Standard library json, always available.
+    """
+    name = 'json'
+
+    def encode(self, payload):
+        """ Encode payload """
+        return json.dumps(payload, ensure_ascii=False)
+
+    def decode(self, data):
+        """ Decode payload """
+        return json.loads(data)
+
+
+class OrjsonCodec(BaseCodec):
+    """
+    Orjson codec
+    Fast json, available when orjson is installed. Must be enabled
+    explicitly: integers are limited to 64 bits.
+    """
+    name = 'orjson'
+    requires = 'orjson'
+
+    def encode(self, payload):
+        """ Encode payload """
+        orjson = load('orjson')
+        option = orjson.OPT_NON_STR_KEYS
+        return orjson.dumps(payload, option=option).decode('utf-8')
+
+    def decode(self, data):
+        """ Decode payload """
+        return load('orjson').loads(data)
+
+
+class UjsonCodec(BaseCodec):
+    """
+    Ujson codec
+    Fast json, available when ujson is installed. Must be enabled
+    explicitly: integers are limited to 64 bits.
+    """
+    name = 'ujson'
+    requires = 'ujson'
+
+    def encode(self, payload):
+        """ Encode payload """
+        return load('ujson').dumps(payload, ensure_ascii=False)
+
+    def decode(self, data):
+        """ Decode payload """
+        return load('ujson').loads(data)
+
+
+class MsgpackCodec(BaseCodec):
+    """
+    MessagePack codec
+    Binary codec, available when msgpack is installed. Must be enabled
+    explicitly.
+    """
+    name = 'msgpack'
+    header = 'msgpack'
+    binary = True
+    requires = 'msgpack'
+
+    def encode(self, payload):
+        """ Encode payload """
+        return load('msgpack').packb(payload, use_bin_type=True)
+
+    def decode(self, data):
+        """ Decode payload """
+        return load('msgpack').unpackb(data, raw=False)
+
+
+class BaseCompressor(metaclass=abc.ABCMeta):
+    """
+    Base payload compressor
+    Compresses large encoded payloads stored in binary payload columns.
+    """
+
+    # compressor name to reference it in configuration and headers
+    name = None
+
+    # optional dependency module the compressor requires
+    requires = None
+
+    @abc.abstractmethod
+    def compress(self, data):
+        """
+        Compress data
+        :param data: bytes
+        :return: bytes
+        """
+        raise NotImplemented('Implement me in your concrete compressor')
+
+    @abc.abstractmethod
+    def decompress(self, data):
+        """
+        Decompress data
+        :param data: bytes
+        :return: bytes
+        """
+        raise NotImplemented('Implement me in your concrete compressor')
+
+
+class ZlibCompressor(BaseCompressor):
+    """
+    Zlib compressor
+    Standard library zlib, always available.
+    """
+    name = 'zlib'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        """ Compress data """
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        """ Decompress data """
+        return zlib.decompress(data)
+
+
+class ZstdCompressor(BaseCompressor):
+    """
+    Zstandard compressor
+    Faster and stronger than zlib, used when zstandard is installed.
+    """
+    name = 'zstd'
+    requires = 'zstandard'
+
+    def __init__(self, level=3):
+        self.level = level
+
+    def compress(self, data):
+        """ Compress data """
+        compressor = load('zstandard').ZstdCompressor(level=self.level)
+        return compressor.compress(data)
+
+    def decompress(self, data):
+        """ Decompress data """
+        return load('zstandard').ZstdDecompressor().decompress(data)
+
+
+class CodecRegistry:
+    """
+    Codec registry
+    Holds available codecs, encodes payloads with the default one and
+    decodes payloads with the codec recorded in their header. Payloads
+    without a header are plain json and are decoded with standard library
+    json, or with a fast json codec if it is configured as default.
+
+    For binary payload columns encodes payloads to bytes and optionally
+    compresses those above size threshold. Compressed payloads start with
+    a zero byte followed by compressor name and a separator, which can
+    never start a json or codec header.
+    """
+
+    # separates codec header from encoded payload
+    SEPARATOR = ':'
+
+    # marks compressed binary payloads
+    COMPRESSED = b'\x00'
+
+    # built-in codecs, registered when first requested
+    CODECS = (JsonCodec, OrjsonCodec, UjsonCodec, MsgpackCodec)
+
+    # built-in compressors, registered when first requested
+    COMPRESSORS = (ZlibCompressor, ZstdCompressor)
+
+    def __init__(
+        self,
+        default=None,
+        binary=False,
+        compression=None,
+        compression_threshold=1024):
+        """
+        Initialize registry
+        Built-in codecs and compressors with optional dependencies are
+        registered on first request by name or header, if installed.
+
+        :param default: str or BaseCodec, codec to encode payloads with,
+                        defaults to standard library json
+        :param binary: bool, encode payloads to bytes for binary columns
+        :param compression: str or BaseCompressor, compress payloads with
+        :param compression_threshold: int, compress payloads of this size
+                                      in bytes or larger
+        """
+        self.codecs = dict()
+        self.headers = dict()
+        self.register(JsonCodec())
+
+        self.compressors = dict()
+        self.register_compressor(ZlibCompressor())
+
+        if compression and not binary:
+            msg = 'Payload compression requires binary payload columns'
+            raise x.ConfigurationException(msg)
+        if compression and not isinstance(compression, BaseCompressor):
+            compression = self.get_compressor(compression)
+        elif compression:
+            self.register_compressor(compression)
+
+        self.binary = binary
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+
+        self.json = self.codecs['json']
+        if default is None:
+            default = self.json
+        elif isinstance(default, BaseCodec):
+            self.register(default)
+        else:
+            default = self.get(default)
+        self.default = default
+
+        # plain json payloads are read with configured fast json codec
+        if not default.header and not default.binary:
+            self.json = default
+
+    def register(self, codec):
+        """
+        Register codec
+        :param codec: shiftevent.codecs.BaseCodec
+        :return: shiftevent.codecs.CodecRegistry
+        """
+        if not isinstance(codec, BaseCodec):
+            msg = 'Payload codecs must extend BaseCodec, got {}'
+            raise x.ConfigurationException(msg.format(type(codec)))
+
+        self.codecs[codec.name] = codec
+        if codec.header:
+            self.headers[codec.header] = codec
+        return self
+
+    def builtin(self, builtins, value, attribute='name'):
+        """
+        Builtin
+        Returns built-in codec or compressor class by name or header if
+        its dependency is installed.
+        :param builtins: tuple, built-in classes
+        :param value: str, name or header to look up
+        :param attribute: str, attribute to look up by
+        :return: type or None
+        """
+        for builtin in builtins:
+            if getattr(builtin, attribute) != value:
+                continue
+            if builtin.requires and load(builtin.requires) is None:
+                return None
+            return builtin
+        return None
+
+    def get(self, name):
+        """
+        Get codec
+        Registers built-in codec on first request.
+        :param name: str, codec name
+        :return: shiftevent.codecs.BaseCodec
+        """
+        if name not in self.codecs:
+            builtin = self.builtin(self.CODECS, name)
+            if builtin:
+                self.register(builtin())
+        if name not in self.codecs:
+            msg = 'Payload codec [{}] is not available'
+            raise x.ConfigurationException(msg.format(name))
+        return self.codecs[name]
+
+    def register_compressor(self, compressor):
+        """
+        Register compressor
+        :param compressor: shiftevent.codecs.BaseCompressor
+        :return: shiftevent.codecs.CodecRegistry
+        """
+        if not isinstance(compressor, BaseCompressor):
+            msg = 'Payload compressors must extend BaseCompressor, got {}'
+            raise x.ConfigurationException(msg.format(type(compressor)))
+
+        self.compressors[compressor.name.encode('ascii')] = compressor
+        return self
+
+    def get_compressor(self, name):
+        """
+        Get compressor
+        Registers built-in compressor on first request.
+        :param name: str, compressor name
+        :return: shiftevent.codecs.BaseCompressor
+        """
+        key = name.encode('ascii')
+        if key not in self.compressors:
+            builtin = self.builtin(self.COMPRESSORS, name)
+            if builtin:
+                self.register_compressor(builtin())
+        if key not in self.compressors:
+            msg = 'Payload compressor [{}] is not available'
+            raise x.ConfigurationException(msg.format(name))
+        return self.compressors[key]
+
+    def has_header(self, data):
+        """
+        Has header
+        Checks whether encoded payload string starts with a codec header.
+        Plain json payloads are objects and never do.
+        :param data: str, encoded payload
+        :return: bool
+        """
+        if type(data) is not str or not data or data[0] == '{':
+            return False
+        header, separator, _ = data.partition(self.SEPARATOR)
+        return bool(separator) and header.isidentifier()
+
+    def encode(self, payload, codec=None):
+        """
+        Encode
+        Encodes payload into a string for persistence, prefixed with codec
+        header if required. Binary output is base64-encoded. For binary
+        payload columns returns utf-8 bytes, compressed if large enough.
+
+        :param payload: dict
+        :param codec: shiftevent.codecs.BaseCodec, defaults to default codec
+        :return: str or bytes
+        """
+        codec = codec if codec else self.default
+        try:
+            data = codec.encode(payload)
+        except (ValueError, TypeError, OverflowError) as exception:
+            msg = 'Failed to encode payload with {} codec: {}'
+            raise x.EventError(msg.format(codec.name, exception))
+
+        if codec.header:
+            if codec.binary:
+                data = base64.b64encode(data).decode('ascii')
+            data = codec.header + self.SEPARATOR + data
+
+        if not self.binary:
+            return data
+
+        data = data.encode('utf-8')
+        compression = self.compression
+        if compression and len(data) >= self.compression_threshold:
+            header = compression.name.encode('ascii') + b':'
+            data = self.COMPRESSED + header + compression.compress(data)
+        return data
+
+    def decode(self, data):
+        """
+        Decode
+        Decodes payload string with the codec recorded in its header.
+        Binary payloads are decompressed first if compressed.
+        :param data: str or bytes, encoded payload
+        :return: dict
+        """
+        if type(data) is not str:
+            data = self.decompress(bytes(data)).decode('utf-8')
+
+        codec = self.json
+        if self.has_header(data):
+            header, _, data = data.partition(self.SEPARATOR)
+            if header not in self.headers:
+                builtin = self.builtin(self.CODECS, header, 'header')
+                if builtin:
+                    self.register(builtin())
+            if header not in self.headers:
+                msg = 'Unable to decode payload: unknown codec [{}]'
+                raise x.EventError(msg.format(header))
+            codec = self.headers[header]
+
+        try:
+            if codec.binary:
+                data = base64.b64decode(data)
+            return codec.decode(data)
+        except (ValueError, TypeError):
+            raise x.EventError('Failed to decode payload string')
+
+    def decompress(self, data):
+        """
+        Decompress
+        Decompresses binary payload with the compressor recorded in its
+        header, returns payloads that are not compressed as is.
+        :param data: bytes, binary payload
+        :return: bytes
+        """
+        if data[:1] != self.COMPRESSED:
+            return data
+
+        name, _, data = data[1:].partition(b':')
+        if name not in self.compressors:
+            key = name.decode('ascii', 'replace')
+            builtin = self.builtin(self.COMPRESSORS, key)
+            if builtin:
+                self.register_compressor(builtin())
+        if name not in self.compressors:
+            msg = 'Unable to decompress payload: unknown compressor [{}]'
+            raise x.EventError(msg.format(name.decode('ascii', 'replace')))
+
+        try:
+            return self.compressors[name].decompress(data)
+        except Exception:
+            raise x.EventError('Failed to decompress payload')
+
+
+# registry used when no other is configured
+default_registry = CodecRegistry()
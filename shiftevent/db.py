@@ -1,5 +1,4 @@
 import json
-from collections import Mapping
 from sqlalchemy import create_engine
 from sqlalchemy import MetaData
 from sqlalchemy import sql
@@ -11,9 +10,13 @@ from shiftevent import exceptions as x
 class Db:
     db_url = None
     db_params = None
+    async_db_url = None
+    binary_payloads = False
+    partition_archive = False
     tables = dict()
     _meta = None
     _engine = None
+    _async_engine = None
 
     def __init__(
         self,
@@ -21,6 +24,10 @@ class Db:
         engine=None,
         meta=None,
         dialect=None,
+        binary_payloads=False,
+        async_db_url=None,
+        async_engine=None,
+        partition_archive=False,
         **db_params
     ):
         """
@@ -33,6 +40,10 @@ class Db:
         is useful for integration into applications when we don't need to
         manage separate connection pools.
 
+        For use with async event service accepts an async database url
+        (e.g. sqlite+aiosqlite://) or a ready-made async engine. These
+        require SQLAlchemy 1.4 or later and an async driver.
+
         Additionally accepts a custom metadata object. Pass this if you want
         to integration tables in already existing metadata catalogue
         of your application.
@@ -41,17 +52,30 @@ class Db:
         :param engine: sqlachemy engine
         :param meta: metadata object to attach to, optional
         :param dialect: str, only required for mysql
+        :param binary_payloads: bool, store payloads in binary columns
+        :param async_db_url: str, async database url
+        :param async_engine: sqlalchemy.ext.asyncio.AsyncEngine
+        :param partition_archive: bool, natively partition event archive
         :param db_params: parameters for engine creation (if not passed in)
         """
-        if not db_url and not engine:
+        if not db_url and not engine and not async_db_url and not async_engine:
             msg = 'Can\'t instantiate database:db_url or engine required'
             raise x.DatabaseError(msg)
 
         self.db_url = db_url
         self.db_params = db_params
+        self.async_db_url = async_db_url
         self._engine = engine
+        self._async_engine = async_engine
         self._meta = meta
-        self.tables = define_tables(self.meta, dialect=dialect)
+        self.binary_payloads = binary_payloads
+        self.partition_archive = partition_archive
+        self.tables = define_tables(
+            self.meta,
+            dialect=dialect,
+            binary_payloads=binary_payloads,
+            partition_archive=partition_archive
+        )
 
     @property
     def engine(self):
@@ -63,15 +87,43 @@ class Db:
             self._engine = create_engine(self.db_url, **self.db_params)
         return self._engine
 
+    @property
+    def async_engine(self):
+        """
+        Async engine
+        Async interface to the database, used by async event service.
+        :return: sqlalchemy.ext.asyncio.AsyncEngine
+        """
+        if not self._async_engine:
+            if not self.async_db_url:
+                msg = 'Async engine requires async_db_url to be configured'
+                raise x.ConfigurationException(msg)
+
+            try:
+                from sqlalchemy.ext.asyncio import create_async_engine
+            except ImportError:
+                msg = 'Async engine requires SQLAlchemy 1.4 or later'
+                raise x.ConfigurationException(msg)
+
+            self._async_engine = create_async_engine(
+                self.async_db_url,
+                **self.db_params
+            )
+        return self._async_engine
+
     @property
     def meta(self):
         """
         Metadata
-        A catalogue of tables and columns.
+        A catalogue of tables and columns. Only bound to an engine when
+        sync database is configured.
         :return: sqlalchemy.sql.schema.MetaData
         """
         if not self._meta:
-            self._meta = MetaData(self.engine)
+            if self.db_url or self._engine:
+                self._meta = MetaData(self.engine)
+            else:
+                self._meta = MetaData()
         return self._meta
 
 
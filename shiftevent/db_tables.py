@@ -1,8 +1,11 @@
 import sqlalchemy as sa
-from sqlalchemy.dialects import mysql
 
 
-def define_tables(meta, dialect=None):
+def define_tables(
+    meta,
+    dialect=None,
+    binary_payloads=False,
+    partition_archive=False):
     """
     Creates table definitions and adds them to schema catalogue.
     Use your application schema when integrating into your app for migrations
@@ -10,22 +13,103 @@ def define_tables(meta, dialect=None):
 
     :param meta: metadata catalogue to add to
     :param dialect: str, only required for mysql to switch payload to longtext
+    :param binary_payloads: bool, store payloads in binary columns, required
+                            for payload compression
+    :param partition_archive: bool, use native partitioning by creation
+                              date for event archive (postgresql, mysql)
     :return: dict
     """
     tables = dict()
 
     # mysql needs longtext to store enough data in text column
-    text_type = sa.Text if dialect != 'mysql' else mysql.LONGTEXT
+    text_type = sa.Text
+    blob_type = sa.LargeBinary
+    if dialect == 'mysql':
+        from sqlalchemy.dialects import mysql
+        text_type = mysql.LONGTEXT
+        blob_type = mysql.LONGBLOB
+    payload_type = blob_type if binary_payloads else text_type
 
     # events
     tables['events'] = sa.Table('event_store', meta,
         sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
         sa.Column('created', sa.DateTime, nullable=False, index=True),
-        sa.Column('type', sa.String(256), nullable=False, index=True),
-        sa.Column('author', sa.String(256), nullable=False, index=True),
-        sa.Column('object_id', sa.String(256), nullable=True, index=True),
-        sa.Column('payload', text_type, nullable=True),
-        sa.Column('payload_rollback', text_type, nullable=True),
+        sa.Column('type', sa.String(256), nullable=False),
+        sa.Column('author', sa.String(256), nullable=False),
+        sa.Column('object_id', sa.String(256), nullable=True),
+        sa.Column('version', sa.Integer, nullable=True),
+        sa.Column('payload', payload_type, nullable=True),
+        sa.Column('payload_rollback', payload_type, nullable=True),
+
+        # object streams are range scans over this (also serves object_id)
+        sa.Index('ix_event_store_object_id_id', 'object_id', 'id'),
+
+        # type and author queries by date (also serve type and author)
+        sa.Index('ix_event_store_type_created', 'type', 'created'),
+        sa.Index('ix_event_store_author_created', 'author', 'created'),
+
+        # optimistic concurrency: one event per object version
+        sa.UniqueConstraint(
+            'object_id',
+            'version',
+            name='uq_event_store_object_id_version'
+        ),
+    )
+
+    # archive: yearly range partitions on postgresql (created on demand by
+    # archiver), hash by year on mysql. Partition key must be in primary key
+    partitioning = dict()
+    if partition_archive and dialect == 'postgresql':
+        partitioning = dict(postgresql_partition_by='RANGE (created)')
+    if partition_archive and dialect == 'mysql':
+        partitioning = dict(
+            mysql_partition_by='HASH (YEAR(created))',
+            mysql_partitions='16'
+        )
+    partitioned = bool(partitioning)
+
+    tables['archive'] = sa.Table('event_store_archive', meta,
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column(
+            'created',
+            sa.DateTime,
+            nullable=False,
+            index=True,
+            primary_key=partitioned
+        ),
+        sa.Column('type', sa.String(256), nullable=False),
+        sa.Column('author', sa.String(256), nullable=False),
+        sa.Column('object_id', sa.String(256), nullable=True),
+        sa.Column('version', sa.Integer, nullable=True),
+        sa.Column('payload', payload_type, nullable=True),
+        sa.Column('payload_rollback', payload_type, nullable=True),
+        sa.Index('ix_event_store_archive_object_id_id', 'object_id', 'id'),
+        **partitioning
+    )
+
+    # snapshots
+    tables['snapshots'] = sa.Table('event_snapshots', meta,
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('created', sa.DateTime, nullable=False),
+        sa.Column('object_id', sa.String(256), nullable=False),
+        sa.Column('event_id', sa.Integer, nullable=False),
+        sa.Column('state', blob_type, nullable=True),
+
+        # latest snapshot lookups scan this backwards
+        sa.Index(
+            'ix_event_snapshots_object_id_event_id',
+            'object_id',
+            'event_id',
+            unique=True
+        ),
+    )
+
+    # subscription checkpoints
+    tables['checkpoints'] = sa.Table('event_checkpoints', meta,
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('name', sa.String(256), nullable=False, unique=True),
+        sa.Column('event_id', sa.Integer, nullable=True),
+        sa.Column('updated', sa.DateTime, nullable=False),
     )
 
     return tables
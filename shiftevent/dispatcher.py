@@ -0,0 +1,246 @@
+import itertools
+import logging
+import threading
+import zlib
+from queue import Queue, Empty
+from shiftevent import exceptions as x
+
+logger = logging.getLogger(__name__)
+
+# signals worker to stop
+STOP = object()
+
+
+class Dispatcher:
+    """
+    Dispatcher
+    Runs handler chains in the background. Events are persisted right away
+    and put on a worker queue to be emitted by a pool of worker threads.
+    Events are partitioned by object id, so events of a single object are
+    always handled by the same worker, strictly in order, while events of
+    different objects are handled in parallel. Queues are bounded to apply
+    backpressure on producers when workers fall behind.
+
+    Producers reserve a queue slot before the event is persisted, so that
+    an event is never stored without being dispatched, and hold a lock of
+    the partition while saving and enqueueing, so that events of an object
+    are queued in the order of their ids even with concurrent producers.
+    Closing takes partition locks too, so no event is queued after its
+    worker was told to stop.
+    """
+
+    def __init__(
+        self,
+        service,
+        workers=4,
+        queue_size=1000,
+        timeout=None,
+        on_error=None):
+        """
+        Initialize dispatcher
+        Starts worker threads.
+
+        :param service: shiftevent.event_service.EventService
+        :param workers: int, number of worker threads (partitions)
+        :param queue_size: int, max events waiting per worker
+        :param timeout: float, seconds to wait for space in a full queue,
+                        waits indefinitely if None
+        :param on_error: callable, accepts event and exception raised when
+                         emitting it, logs exceptions if not set
+        """
+        if workers < 1 or queue_size < 1:
+            msg = 'Dispatcher needs at least one worker and queue slot'
+            raise x.ConfigurationException(msg)
+
+        self.service = service
+        self.timeout = timeout
+        self.on_error = on_error
+        self.closed = False
+
+        self.queues = []
+        self.slots = []
+        self.locks = []
+        self.threads = []
+        self.counter = itertools.count()
+        for i in range(workers):
+            queue = Queue()
+            thread = threading.Thread(
+                target=self.work,
+                args=(i,),
+                name='shiftevent-dispatcher-{}'.format(i),
+                daemon=True
+            )
+            self.queues.append(queue)
+            self.slots.append(threading.BoundedSemaphore(queue_size))
+            self.locks.append(threading.Lock())
+            self.threads.append(thread)
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def event(self, **kwargs):
+        """
+        Event
+        Persists an event and dispatches it to be emitted in the background.
+        Accepts same arguments as EventService.event(). Queue slot is taken
+        before the event is saved, so if the queue stays full the event is
+        not persisted.
+
+        :return: shiftevent.event.Event
+        """
+        if self.closed:
+            raise x.DispatcherError('Dispatcher is closed')
+
+        object_id = kwargs.get('object_id')
+        key = object_id if object_id is not None else next(self.counter)
+        index = self.index(key)
+        self.reserve(index, kwargs)
+        try:
+            with self.locks[index]:
+                if self.closed:
+                    raise x.DispatcherError('Dispatcher is closed')
+                event = self.service.event(**kwargs)
+                self.queues[index].put(event)
+        except Exception:
+            self.slots[index].release()
+            raise
+
+        return event
+
+    def dispatch(self, event):
+        """
+        Dispatch
+        Puts saved event on the queue of its partition. Blocks when the
+        queue is full and raises if there's still no space after timeout.
+
+        :param event: shiftevent.event.Event
+        :return: None
+        """
+        if self.closed:
+            raise x.DispatcherError('Dispatcher is closed')
+
+        index = self.partition(event)
+        self.reserve(index, event)
+        with self.locks[index]:
+            if self.closed:
+                self.slots[index].release()
+                raise x.DispatcherError('Dispatcher is closed')
+            self.queues[index].put(event)
+
+    def reserve(self, index, event):
+        """
+        Reserve
+        Takes a slot in partition queue, waiting for workers to free one
+        up to timeout.
+
+        :param index: int, partition index
+        :param event: shiftevent.event.Event or dict, event being dispatched
+        :return: None
+        """
+        if not self.slots[index].acquire(timeout=self.timeout):
+            msg = 'Dispatch queue is full, failed to dispatch {}'
+            raise x.DispatchQueueFull(msg.format(event))
+
+    def partition(self, event):
+        """
+        Partition
+        Returns worker index for the event. Events without object id have
+        no ordering requirements and are spread by event id.
+
+        :param event: shiftevent.event.Event
+        :return: int
+        """
+        key = event.object_id if event.object_id is not None else event.id
+        return self.index(key)
+
+    def index(self, key):
+        """
+        Index
+        Returns worker index for partition key. Keys are stripped the way
+        validator strips object ids, so that ids stored the same always
+        land in the same partition.
+        :param key: object id or other key to spread events by
+        :return: int
+        """
+        key = str(key).strip().encode('utf-8')
+        return zlib.crc32(key) % len(self.queues)
+
+    def work(self, index):
+        """
+        Work
+        Worker loop: emits events from the queue one by one until stopped,
+        then drains whatever is left.
+
+        :param index: int, partition index
+        :return: None
+        """
+        queue = self.queues[index]
+        stopping = False
+        while True:
+            try:
+                event = queue.get(block=not stopping)
+            except Empty:
+                return
+
+            try:
+                if event is STOP:
+                    stopping = True
+                else:
+                    self.slots[index].release()
+                    self.handle(event)
+            finally:
+                queue.task_done()
+
+    def handle(self, event):
+        """
+        Handle
+        Emits a single event, reporting failures to error callback. Failed
+        events are already rolled back and dropped by the service. Errors
+        of the callback itself are logged to keep the worker running.
+
+        :param event: shiftevent.event.Event
+        :return: None
+        """
+        try:
+            self.service.emit(event)
+        except Exception as exception:
+            if not self.on_error:
+                logger.exception('Failed to emit event {}'.format(event))
+                return
+            try:
+                self.on_error(event, exception)
+            except Exception:
+                msg = 'Error callback failed for event {}'
+                logger.exception(msg.format(event))
+
+    def join(self):
+        """
+        Join
+        Blocks until all dispatched events are handled.
+        :return: None
+        """
+        for queue in self.queues:
+            queue.join()
+
+    def close(self, timeout=None):
+        """
+        Close
+        Stops accepting new events, lets workers drain their queues and
+        waits for them to finish.
+
+        :param timeout: float, seconds to wait for each worker
+        :return: None
+        """
+        if self.closed:
+            return
+
+        for index, queue in enumerate(self.queues):
+            with self.locks[index]:
+                self.closed = True
+                queue.put(STOP)
+        for thread in self.threads:
+            thread.join(timeout)
@@ -1,47 +1,106 @@
 from datetime import datetime
 from shiftevent import exceptions as x
-from shiftschema.schema import Schema
-from shiftschema import validators
-from shiftschema import filters
+from shiftevent.codecs import default_registry
 import json
-import copy
 
 
-class EventSchema(Schema):
+def __getattr__(name):
     """
-    Event schema
-    Defines filters and validators for an event
+    Module getattr
+    Loads reference EventSchema on first access: shiftschema is slow to
+    import and is not needed to validate events with EventValidator.
+    :param name: str, attribute name
+    :return: shiftevent.event_schema.EventSchema
     """
-    def schema(self):
-        self.add_property('created')
-        self.created.add_validator(validators.Required(
-            message='An event must have creation date'
-        ))
+    if name == 'EventSchema':
+        from shiftevent.event_schema import EventSchema
+        return EventSchema
+    msg = 'module {!r} has no attribute {!r}'
+    raise AttributeError(msg.format(__name__, name))
 
-        self.add_property('type')
-        self.type.add_filter(filters.Strip())
-        self.type.add_filter(filters.Uppercase())
-        self.type.add_validator(validators.Required(
-            message='An event must have a type'
-        ))
 
-        self.add_property('object_id')
-        self.object_id.add_filter(filters.Strip())
+class EventValidator:
+    """
+    Event validator
+    Precompiled fast path for event validation. Applies the same filters and
+    required checks as EventSchema directly to event attributes and returns
+    the same error messages, without constructing a schema per event.
+    EventSchema remains the reference implementation.
+    """
+
+    CREATED_REQUIRED = 'An event must have creation date'
+    TYPE_REQUIRED = 'An event must have a type'
+    AUTHOR_REQUIRED = 'An event must have an author set'
+
+    def validate(self, event):
+        """
+        Validate
+        Filters event props in place and returns validation errors in the
+        same format as schema result messages.
+
+        :param event: shiftevent.event.Event
+        :return: dict, empty if event is valid
+        """
+        errors = dict()
+
+        if not event.created:
+            errors['created'] = [self.CREATED_REQUIRED]
+
+        value = event.type
+        if type(value) is str:
+            value = value.strip().upper()
+            event.type = value
+        if not value:
+            errors['type'] = [self.TYPE_REQUIRED]
 
-        self.add_property('author')
-        self.author.add_filter(filters.Strip())
-        self.author.add_validator(validators.Required(
-            message='An event must have an author set'
-        ))
+        value = event.object_id
+        if type(value) is str:
+            event.object_id = value.strip()
+
+        value = event.author
+        if type(value) is str:
+            value = value.strip()
+            event.author = value
+        if not value:
+            errors['author'] = [self.AUTHOR_REQUIRED]
+
+        return errors
 
 
 class Event:
     """
     Event
-    Represent single atomic operation.
+    Represent single atomic operation. Uses slots for compact instances
+    and direct attribute access, payloads are validated on assignment.
+    Events loaded from the database keep raw encoded payloads and only
+    decode them on first access.
     """
-    # event props, initialized at instance level
-    props = dict()
+
+    # event props in order
+    PROPS = (
+        'id',
+        'created',
+        'type',
+        'author',
+        'object_id',
+        'version',
+        'payload',
+        'payload_rollback',
+    )
+
+    __slots__ = (
+        'id',
+        'created',
+        'type',
+        'author',
+        'object_id',
+        'version',
+        '_payload',
+        '_payload_rollback',
+        '_payload_raw',
+        '_payload_rollback_raw',
+        '_codecs',
+    )
 
     def __init__(self, *_, **kwargs):
         """
@@ -51,20 +110,21 @@ class Event:
         :param _: args, ignored
         :param kwargs: dict, key-value pairs used to populate event
         """
-        # init props
-        self.props = dict(
-            id=None,
-            created=None,
-            type=None,
-            author=None,
-            object_id=None,
-            payload=None,
-            payload_rollback=None,
-        )
+        self.id = None
+        self.created = None
+        self.type = None
+        self.author = None
+        self.object_id = None
+        self.version = None
+        self._payload = None
+        self._payload_rollback = None
+        self._payload_raw = None
+        self._payload_rollback_raw = None
+        self._codecs = None
 
         self.from_dict(kwargs)
-        if not self.props['created']:
-            self.props['created'] = datetime.utcnow()
+        if not self.created:
+            self.created = datetime.utcnow()
 
     def __repr__(self):
         """ Returns printable representation of an event """
@@ -78,32 +138,61 @@ class Event:
             self.author
         )
 
-    def __getattr__(self, item):
-        """ Overrides attribute access for getting props """
-        if item in self.props:
-            return self.props[item]
-        return object.__getattribute__(self, item)
-
-    def __setattr__(self, key, value):
-        """ Overrides attribute access for setting props """
-        if key == 'payload':
-            self.set_payload(value)
-        elif key == 'payload_rollback':
-            self.set_payload_rollback(value)
-        elif key in self.props:
-            self.props[key] = value
-            return self
-        else:
-            object.__setattr__(self, key, value)
-        return self
+    @property
+    def props(self):
+        """
+        Props
+        Returns a copy of event props as a dictionary
+        :return: dict
+        """
+        return self.to_dict()
+
+    @property
+    def payload(self):
+        """ Returns event payload, decoding raw json on first access """
+        if self._payload_raw is not None:
+            self.set_payload(self.codecs.decode(self._payload_raw))
+        return self._payload
+
+    @payload.setter
+    def payload(self, payload):
+        """ Sets event payload """
+        self.set_payload(payload)
+
+    @property
+    def payload_rollback(self):
+        """ Returns rollback payload, decoding raw json on first access """
+        if self._payload_rollback_raw is not None:
+            raw = self._payload_rollback_raw
+            self.set_payload_rollback(self.codecs.decode(raw))
+        return self._payload_rollback
+
+    @payload_rollback.setter
+    def payload_rollback(self, payload):
+        """ Sets event rollback payload """
+        self.set_payload_rollback(payload)
+
+    @property
+    def codecs(self):
+        """
+        Codecs
+        Returns payload codec registry used to decode raw payloads
+        :return: shiftevent.codecs.CodecRegistry
+        """
+        return self._codecs if self._codecs else default_registry
 
     @property
     def payload_json(self):
         """
         Payload json
-        Returns payload as a json string
+        Returns payload as a json string. Reuses raw json of an event loaded
+        from the database if payload was never accessed. Payloads stored with
+        other codecs or in binary columns are decoded and dumped.
         :return: str
         """
+        raw = self._payload_raw
+        if type(raw) is str and not self.codecs.has_header(raw):
+            return raw
         payload = self.payload if self.payload else {}
         return json.dumps(payload, ensure_ascii=False)
 
@@ -111,9 +200,14 @@ class Event:
     def payload_rollback_json(self):
         """
         Payload rollback json
-        Returns rollback payload as a json string
+        Returns rollback payload as a json string. Reuses raw json of an event
+        loaded from the database if payload was never accessed. Payloads
+        stored with other codecs or in binary columns are decoded and dumped.
         :return: str
         """
+        raw = self._payload_rollback_raw
+        if type(raw) is str and not self.codecs.has_header(raw):
+            return raw
         payload = self.payload_rollback if self.payload_rollback else {}
         return json.dumps(payload, ensure_ascii=False)
 
@@ -125,6 +219,7 @@ class Event:
         :param payload: dict or json string
         :return:
         """
+        self._payload_raw = None
         if type(payload) is str:
             try:
                 payload = json.loads(payload, encoding='utf-8')
@@ -134,7 +229,7 @@ class Event:
         if payload and type(payload) is not dict:
             msg = 'Payload must be a dictionary, got {}'
             raise x.EventError(msg.format(type(payload)))
-        self.props['payload'] = payload
+        self._payload = payload
         return self
 
     def set_payload_rollback(self, payload):
@@ -145,6 +240,7 @@ class Event:
         :param payload: dict or json string
         :return:
         """
+        self._payload_rollback_raw = None
         if type(payload) is str:
             try:
                 payload = json.loads(payload, encoding='utf-8')
@@ -154,29 +250,86 @@ class Event:
         if payload and type(payload) is not dict:
             msg = 'Payload must be a dictionary, got {}'
             raise x.EventError(msg.format(type(payload)))
-        self.props['payload_rollback'] = payload
+        self._payload_rollback = payload
         return self
 
     def to_dict(self):
         """ Returns dictionary representation of the event """
-        return copy.copy(self.props)
+        return dict(
+            id=self.id,
+            created=self.created,
+            type=self.type,
+            author=self.author,
+            object_id=self.object_id,
+            version=self.version,
+            payload=self.payload,
+            payload_rollback=self.payload_rollback,
+        )
 
-    def to_db(self):
+    def to_db(self, codecs=None):
         """
         To db
-        Returns db representation of event. Same as to dict, but payload is
-        stringified to json. Used for persistence.
+        Returns db representation of event. Same as to dict, but payloads are
+        encoded to strings. Used for persistence. Does not decode payloads
+        that were not accessed.
+        :param codecs: shiftevent.codecs.CodecRegistry, registry to encode with
         :return:
         """
-        data = self.to_dict()
-        data['payload'] = self.payload_json
-        data['payload_rollback'] = self.payload_rollback_json
-        return data
+        codecs = codecs if codecs else self.codecs
+
+        payload = self._payload_raw
+        if payload is None:
+            payload = codecs.encode(self._payload if self._payload else {})
+
+        payload_rollback = self._payload_rollback_raw
+        if payload_rollback is None:
+            payload_rollback = self._payload_rollback
+            payload_rollback = codecs.encode(
+                payload_rollback if payload_rollback else {}
+            )
+
+        return dict(
+            id=self.id,
+            created=self.created,
+            type=self.type,
+            author=self.author,
+            object_id=self.object_id,
+            version=self.version,
+            payload=payload,
+            payload_rollback=payload_rollback,
+        )
+
+    @classmethod
+    def from_db(cls, data, codecs=None):
+        """
+        From db
+        Creates event from a database row. Payloads are kept as raw strings
+        or bytes and decoded lazily on first access.
+        :param data: dict or row, event data
+        :param codecs: shiftevent.codecs.CodecRegistry, registry to decode with
+        :return: shiftevent.event.Event
+        """
+        data = dict(data)
+        payload = data.pop('payload', None)
+        payload_rollback = data.pop('payload_rollback', None)
+
+        event = cls(**data)
+        event._codecs = codecs
+        if isinstance(payload, (str, bytes)):
+            event._payload_raw = payload
+        else:
+            event.set_payload(payload)
+        if isinstance(payload_rollback, (str, bytes)):
+            event._payload_rollback_raw = payload_rollback
+        else:
+            event.set_payload_rollback(payload_rollback)
+
+        return event
 
     def from_dict(self, data):
         """ Populates itself from a dictionary """
         for prop, val in data.items():
-            if prop in self.props:
+            if prop in self.PROPS:
                 setattr(self, prop, val)
         return self
 
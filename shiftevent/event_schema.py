@@ -0,0 +1,31 @@
+from shiftschema.schema import Schema
+from shiftschema import validators
+from shiftschema import filters
+
+
+class EventSchema(Schema):
+    """
+    Event schema
+    Defines filters and validators for an event
+    """
+    def schema(self):
+        self.add_property('created')
+        self.created.add_validator(validators.Required(
+            message='An event must have creation date'
+        ))
+
+        self.add_property('type')
+        self.type.add_filter(filters.Strip())
+        self.type.add_filter(filters.Uppercase())
+        self.type.add_validator(validators.Required(
+            message='An event must have a type'
+        ))
+
+        self.add_property('object_id')
+        self.object_id.add_filter(filters.Strip())
+
+        self.add_property('author')
+        self.author.add_filter(filters.Strip())
+        self.author.add_validator(validators.Required(
+            message='An event must have an author set'
+        ))
@@ -1,37 +1,429 @@
-from inspect import isclass
-from shiftevent.event import Event, EventSchema
+from contextlib import contextmanager
+from datetime import datetime
+from inspect import isclass, iscoroutinefunction
+from shiftevent.event import Event, EventValidator
 from shiftevent import exceptions as x
-from shiftevent.default_handlers import default_handlers
 from shiftevent.handlers import BaseHandler
-from pprint import pprint as pp
+from shiftevent.codecs import CodecRegistry
+from shiftevent.cache import EventCache
+from shiftevent.metrics import BaseMetrics
+from shiftevent.snapshot import Snapshot, BaseSerializer, JsonSerializer
+from sqlalchemy import desc, asc, sql
+from sqlalchemy.exc import IntegrityError
+from time import perf_counter
 
 
-class EventService:
+class BaseEventService:
     """
-    Event service
-    Responsible for handling events
+    Base event service
+    Holds configuration shared by sync and async event services: handler
+    chains, validation, payload codecs and query builders.
     """
 
     # database instance
     db = None
 
-    # event handlers
-    handlers = None
+    # event handlers configuration
+    _handlers = None
+
+    # compiled handler chains per event type
+    chains = None
+
+    # reuse handler instances across emits
+    reuse_handlers = False
+
+    # whether service can run handlers with async handle/rollback
+    async_handlers = False
+
+    # event validator
+    validator = EventValidator()
 
     # context for handlers
     handler_context = None
 
-    def __init__(self, db, handlers=None, handler_context=None):
+    # attempts to assign next object version on concurrent writes
+    VERSION_RETRIES = 3
+
+    # max bound parameters per statement for bulk queries, by dialect
+    MAX_PARAMS = dict(
+        sqlite=999,
+        mysql=65535,
+        postgresql=32767,
+    )
+
+    # payload codecs
+    codecs = None
+
+    # cache of events by id
+    cache = None
+
+    # whether reads include archived events
+    read_archive = False
+
+    # metrics to report stage and handler timings to
+    metrics = None
+
+    def __init__(
+        self,
+        db,
+        handlers=None,
+        handler_context=None,
+        reuse_handlers=False,
+        payload_codec=None,
+        compression=None,
+        compression_threshold=1024,
+        cache=None,
+        read_archive=False,
+        metrics=None):
         """
         Initialize event service
         Accepts a database instance to operate on events and projections.
         :param db: shiftevent.db.Db, database instance
         :param handlers: dict, optional handlers configuration
         :param context: dict, context to pass to handlers
+        :param reuse_handlers: bool, instantiate handlers once and reuse them
+                               across emits, only for stateless handlers
+        :param payload_codec: str or shiftevent.codecs.BaseCodec, codec
+                              to encode payloads with, defaults to
+                              standard library json
+        :param compression: str or shiftevent.codecs.BaseCompressor, compress
+                            large payloads, requires binary payload columns
+        :param compression_threshold: int, compress payloads of this size
+                                      in bytes or larger
+        :param cache: shiftevent.cache.EventCache, cache events read by id
+        :param read_archive: bool, look up events moved to archive when
+                             reading by id, streams and history scans
+        :param metrics: shiftevent.metrics.BaseMetrics, report timings of
+                        validation, inserts, emits and every handler
         """
+        if cache is not None and not isinstance(cache, EventCache):
+            msg = 'Event cache must be an instance of EventCache'
+            raise x.ConfigurationException(msg)
+
+        if metrics is not None and not isinstance(metrics, BaseMetrics):
+            msg = 'Metrics must be an instance of BaseMetrics'
+            raise x.ConfigurationException(msg)
+
         self.db = db
-        self.handlers = handlers if handlers else default_handlers
+        self.cache = cache
+        self.metrics = metrics
+        self.read_archive = read_archive
         self.handler_context = handler_context
+        self.reuse_handlers = reuse_handlers
+        if not handlers:
+            from shiftevent.default_handlers import default_handlers
+            handlers = default_handlers
+        self.handlers = handlers
+        self.codecs = CodecRegistry(
+            default=payload_codec,
+            binary=db.binary_payloads,
+            compression=compression,
+            compression_threshold=compression_threshold
+        )
+
+    @property
+    def handlers(self):
+        """
+        Handlers
+        Returns handlers configuration
+        :return: dict
+        """
+        return self._handlers
+
+    @handlers.setter
+    def handlers(self, handlers):
+        """
+        Set handlers
+        Validates handlers configuration and compiles handler chains.
+        :param handlers: dict, event types mapped to lists of handler classes
+        :return: None
+        """
+        self.chains = self.compile_handlers(handlers)
+        self._handlers = handlers
+
+    def compile_handlers(self, handlers):
+        """
+        Compile handlers
+        Validates every handler in configuration once and builds a dispatch
+        table of handler chains per event type. Chains contain handler
+        classes, or handler instances if handlers are reused.
+
+        :param handlers: dict, event types mapped to lists of handler classes
+        :return: dict
+        """
+        chains = dict()
+        for event_type, chain in handlers.items():
+            for handler in chain:
+                if not isclass(handler):
+                    msg = 'Handler {} for {} has to be a class, got [{}]'
+                    raise x.HandlerInstantiationError(msg.format(
+                        handler,
+                        event_type,
+                        type(handler)
+                    ))
+
+                if not issubclass(handler, BaseHandler):
+                    msg = 'Handler implementations must extend BaseHandler'
+                    raise x.HandlerInstantiationError(msg)
+
+                if not handler.EVENT_TYPES:
+                    msg = 'Event types undefined for handler [{}]'
+                    raise x.MissingEventType(msg.format(handler))
+
+                is_async = iscoroutinefunction(handler.handle) \
+                    or iscoroutinefunction(handler.rollback)
+                if is_async and not self.async_handlers:
+                    msg = 'Handler {} is async, run it with AsyncEventService'
+                    raise x.HandlerInstantiationError(msg.format(handler))
+
+                if event_type not in handler.EVENT_TYPES:
+                    msg = 'Event handler {} can\'t support events of ' \
+                          'this type ({})'
+                    raise x.UnsupportedEventType(msg.format(
+                        handler,
+                        event_type
+                    ))
+
+            if self.reuse_handlers:
+                context = self.handler_context
+                chain = [handler(context=context) for handler in chain]
+            chains[event_type] = tuple(chain)
+
+        return chains
+
+    def validate_event(self, event):
+        """
+        Validate event
+        Checks that event type has handlers and runs event through the
+        validator. Will raise an exception if event is invalid.
+
+        :param event: shiftevent.event.Event
+        :return: shiftevent.event.Event
+        """
+        if event.type not in self.chains:
+            raise x.EventError('No handlers for event {}'.format(event.type))
+
+        errors = self.validator.validate(event)
+        if errors:
+            raise x.InvalidEvent(validation_errors=errors)
+
+        return event
+
+    def instrument(self, chain):
+        """
+        Instrument
+        Passes metrics to handler instances in the chain, so that they
+        report timing of each handle and rollback.
+
+        :param chain: list, handler instances
+        :return: None
+        """
+        for handler in chain:
+            handler.metrics = self.metrics
+
+    def record(self, stage, event, start):
+        """
+        Record
+        Reports duration of event processing stage to metrics.
+
+        :param stage: str, stage name: validate, insert, update or emit
+        :param event: shiftevent.event.Event
+        :param start: float, performance counter when stage started
+        :return: None
+        """
+        name = 'event_{}_seconds'.format(stage)
+        self.metrics.observe(name, perf_counter() - start, type=event.type)
+
+    def versions_query(self, object_ids):
+        """
+        Versions query
+        Builds a query selecting current version of every object.
+        :param object_ids: list of str, ids of objects
+        :return: sqlalchemy.sql.Select
+        """
+        events = self.db.tables['events']
+        query = sql.select([
+            events.c.object_id,
+            sql.func.max(events.c.version)
+        ])
+        query = query.where(events.c.object_id.in_(object_ids))
+        return query.group_by(events.c.object_id)
+
+    def stream_query(self, object_id, from_id=None, to_id=None, reverse=False,
+                     limit=None, table=None):
+        """
+        Stream query
+        Builds a query selecting events of a single object, including
+        archived events if configured.
+        See get_stream() for parameters.
+        :param table: sqlalchemy.Table, only query this table
+        :return: sqlalchemy.sql.Select
+        """
+        if table is None and self.read_archive:
+            args = (object_id, from_id, to_id, reverse, limit)
+            return self.archive_union(
+                self.stream_query(*args, table=self.db.tables['events']),
+                self.stream_query(*args, table=self.db.tables['archive']),
+                reverse,
+                limit
+            )
+
+        events = table if table is not None else self.db.tables['events']
+        query = events.select().where(events.c.object_id == str(object_id))
+        if from_id is not None:
+            query = query.where(events.c.id >= from_id)
+        if to_id is not None:
+            query = query.where(events.c.id <= to_id)
+
+        order = desc(events.c.id) if reverse else asc(events.c.id)
+        query = query.order_by(order)
+        if limit:
+            query = query.limit(limit)
+
+        return query
+
+    def page_query(self, after_id, batch_size, types=None, until=None,
+                   table=None):
+        """
+        Page query
+        Builds a query selecting next page of events after given id,
+        including archived events if configured.
+        See iter_events() for parameters.
+        :param table: sqlalchemy.Table, only query this table
+        :return: sqlalchemy.sql.Select
+        """
+        if table is None and self.read_archive:
+            args = (after_id, batch_size, types, until)
+            return self.archive_union(
+                self.page_query(*args, table=self.db.tables['events']),
+                self.page_query(*args, table=self.db.tables['archive']),
+                False,
+                batch_size
+            )
+
+        if isinstance(types, str):
+            types = [types]
+
+        events = table if table is not None else self.db.tables['events']
+        query = events.select()
+        if after_id is not None:
+            query = query.where(events.c.id > after_id)
+        if types:
+            query = query.where(events.c.type.in_(types))
+        if until:
+            query = query.where(events.c.created <= until)
+        return query.order_by(events.c.id).limit(batch_size)
+
+    def archive_union(self, query, archive_query, reverse=False, limit=None):
+        """
+        Archive union
+        Combines equivalent queries over event store and archive. Each side
+        is ordered and limited on its own, so both use their indexes.
+
+        :param query: sqlalchemy.sql.Select, query over event store
+        :param archive_query: sqlalchemy.sql.Select, query over archive
+        :param reverse: bool, order by id descending
+        :param limit: int, max number of events to select
+        :return: sqlalchemy.sql.Select
+        """
+        union = sql.union_all(
+            sql.select([query.alias('store')]),
+            sql.select([archive_query.alias('archive')]),
+        ).alias('events')
+
+        order = desc(union.c.id) if reverse else asc(union.c.id)
+        query = sql.select([union]).order_by(order)
+        if limit:
+            query = query.limit(limit)
+        return query
+
+
+class EventService(BaseEventService):
+    """
+    Event service
+    Responsible for handling events
+    """
+
+    # take snapshot every n events per object when loading state
+    snapshot_frequency = None
+
+    # serializer for snapshot state
+    snapshot_serializer = None
+
+    # profiler to run handlers under
+    profiler = None
+
+    def __init__(
+        self,
+        db,
+        handlers=None,
+        handler_context=None,
+        reuse_handlers=False,
+        snapshot_frequency=None,
+        snapshot_serializer=None,
+        payload_codec=None,
+        compression=None,
+        compression_threshold=1024,
+        cache=None,
+        read_archive=False,
+        metrics=None,
+        profiler=None):
+        """
+        Initialize event service
+        Accepts a database instance to operate on events and projections.
+        :param db: shiftevent.db.Db, database instance
+        :param handlers: dict, optional handlers configuration
+        :param context: dict, context to pass to handlers
+        :param reuse_handlers: bool, instantiate handlers once and reuse them
+                               across emits, only for stateless handlers
+        :param snapshot_frequency: int, snapshot every n events per object
+        :param snapshot_serializer: shiftevent.snapshot.BaseSerializer
+        :param payload_codec: str or shiftevent.codecs.BaseCodec, codec
+                              to encode payloads with, defaults to
+                              standard library json
+        :param compression: str or shiftevent.codecs.BaseCompressor, compress
+                            large payloads, requires binary payload columns
+        :param compression_threshold: int, compress payloads of this size
+                                      in bytes or larger
+        :param cache: shiftevent.cache.EventCache, cache events read by id
+        :param read_archive: bool, look up events moved to archive when
+                             reading by id, streams and history scans
+        :param metrics: shiftevent.metrics.BaseMetrics, report timings of
+                        validation, inserts, emits and every handler
+        :param profiler: shiftevent.profiler.HandlerProfiler, profile
+                         handlers of emitted events
+        """
+        super().__init__(
+            db=db,
+            handlers=handlers,
+            handler_context=handler_context,
+            reuse_handlers=reuse_handlers,
+            payload_codec=payload_codec,
+            compression=compression,
+            compression_threshold=compression_threshold,
+            cache=cache,
+            read_archive=read_archive,
+            metrics=metrics
+        )
+
+        if snapshot_frequency is not None and snapshot_frequency < 1:
+            msg = 'Snapshot frequency must be a positive integer, got {}'
+            raise x.ConfigurationException(msg.format(snapshot_frequency))
+        self.snapshot_frequency = snapshot_frequency
+
+        if not snapshot_serializer:
+            snapshot_serializer = JsonSerializer()
+        if not isinstance(snapshot_serializer, BaseSerializer):
+            msg = 'Snapshot serializer must extend BaseSerializer'
+            raise x.ConfigurationException(msg)
+        self.snapshot_serializer = snapshot_serializer
+
+        if profiler is not None:
+            from shiftevent.profiler import HandlerProfiler
+            if not isinstance(profiler, HandlerProfiler):
+                msg = 'Profiler must be an instance of HandlerProfiler'
+                raise x.ConfigurationException(msg)
+        self.profiler = profiler
 
     def event(
         self,
@@ -39,17 +431,23 @@ class EventService:
         author,
         object_id=None,
         payload=None,
-        payload_rollback=None):
+        payload_rollback=None,
+        expected_version=None):
         """
         Persist an event
         Creates a new event object, validates it and saves to the database.
         May throw a validation exception if some event data is invalid.
 
+        Pass expected version of the object (0 for new objects) to make
+        sure nobody else wrote to it since you have read it, otherwise
+        a concurrency exception will be raised.
+
         :param type: str, event type
         :param author:  str, author id in external system
         :param object_id: str, an id of the object being affected
         :param payload: dict, event payload
         :param payload_rollback: dict, payload to roll back an event
+        :param expected_version: int, current version of the object
         :return: shiftevent.event.Event
         """
         # create
@@ -61,46 +459,129 @@ class EventService:
             payload_rollback=payload_rollback
         )
 
-        event = self.save_event(event)
+        event = self.save_event(event, expected_version=expected_version)
         return event
 
-    def emit(self, event):
+    def publish(
+        self,
+        type,
+        author,
+        object_id=None,
+        payload=None,
+        payload_rollback=None,
+        expected_version=None):
+        """
+        Publish an event
+        Persists an event and emits it as a single unit of work: insert and
+        all handlers run in one transaction on one connection, which is
+        passed to handlers in their context as 'connection'. If a handler
+        fails, the whole transaction rolls back, so a failed event is never
+        visible to other readers. Accepts same arguments as event().
+
+        :return: shiftevent.event.Event
+        """
+        event = Event(
+            type=type,
+            author=author,
+            object_id=object_id,
+            payload=payload,
+            payload_rollback=payload_rollback
+        )
+
+        with self.unit_of_work() as conn:
+            self.save_event(event, expected_version, conn=conn)
+            return self.emit(event, conn=conn)
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Unit of work
+        Yields a connection in a transaction to save and emit events with,
+        see save_event() and emit(). Commits when the block exits and rolls
+        back on exceptions.
+
+        :return: sqlalchemy.engine.Connection
+        """
+        with self.db.engine.begin() as conn:
+
+            # pysqlite defers BEGIN until first write, breaking savepoints
+            dbapi = conn.connection
+            if conn.dialect.driver == 'pysqlite' and not dbapi.in_transaction:
+                dbapi.execute('BEGIN')
+
+            yield conn
+
+    @contextmanager
+    def transaction(self, conn=None):
+        """
+        Transaction
+        Yields a connection in a new transaction, or the given connection
+        inside a savepoint when running within a unit of work.
+
+        :param conn: sqlalchemy.engine.Connection, unit of work connection
+        :return: sqlalchemy.engine.Connection
+        """
+        if conn is None:
+            with self.db.engine.begin() as conn:
+                yield conn
+        else:
+            with conn.begin_nested():
+                yield conn
+
+    def emit(self, event, conn=None):
         """
         Emit event
-        Initialises every handler in the chain for the event and sequentially
-        executes each one.
+        Initialises every handler in the precompiled chain for the event
+        (unless handlers are reused) and sequentially executes each one.
+
+        When given a connection, handlers get it in their context as
+        'connection' and run inside a savepoint of its transaction. On
+        failure the savepoint and the event are rolled back on the same
+        connection without committing.
+
+        With a profiler configured, handlers of events picked by it run
+        under cProfile, see shiftevent.profiler.HandlerProfiler.
+
         :param event: shiftevent.events.event.Event
+        :param conn: sqlalchemy.engine.Connection, unit of work connection
         :return:
         """
-        if event.type not in self.handlers:
+        chain = self.chains.get(event.type)
+        if chain is None:
             raise x.EventError('No handlers for event {}'.format(event.type))
 
-        # trigger handlers
-        handlers = self.handlers[event.type]
-        chain = []
-        for handler in handlers:
-            if not isclass(handler):
-                msg = 'Handler {} for {} has to be a class, got [{}]'
-                raise x.HandlerInstantiationError(msg.format(
-                    handler,
-                    event.type,
-                    type(handler)
-                ))
-
-            handler = handler(context=self.handler_context)
-            if not isinstance(handler, BaseHandler):
-                msg = 'Handler implementations must extend BaseHandler'
-                raise x.HandlerInstantiationError(msg)
-
-            # append to chain if valid
-            chain.append(handler)
-
-        # all valid? run chain
+        context = self.handler_context
+        if conn is not None:
+            context = dict(context or {}, connection=conn)
+
+        # instantiate handlers
+        if not self.reuse_handlers:
+            chain = [handler(context=context) for handler in chain]
+        elif conn is not None:
+            # reused handlers hold their own context, pass them connection
+            chain = [type(handler)(context=context) for handler in chain]
+
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+            self.instrument(chain)
+
+        profiler = self.profiler
+        if profiler is not None and not profiler.should_profile(event):
+            profiler = None
+
+        savepoint = conn.begin_nested() if conn is not None else None
+
+        # run chain
         ran = []
         for handler in chain:
             try:
                 ran.append(handler)
-                handled = handler.handle_event(event)
+                if profiler is not None:
+                    method = handler.handle_event
+                    handled = profiler.run(handler, method, event)
+                else:
+                    handled = handler.handle_event(event)
                 if handled:
                     event = handled
                 else:
@@ -109,76 +590,560 @@ class EventService:
 
                 # first, reverse all handlers that ran
                 for handler in ran:
-                    handled = handler.rollback_event(event)
+                    if profiler is not None:
+                        method = handler.rollback_event
+                        handled = profiler.run(handler, method, event)
+                    else:
+                        handled = handler.rollback_event(event)
                     if handled:
                         event = handled
 
                 # drop event from the store
+                if savepoint:
+                    savepoint.rollback()
                 events = self.db.tables['events']
-                with self.db.engine.begin() as conn:
+                with self.transaction(conn) as conn:
                     conn.execute(events.delete().where(
                         events.c.id == event.id
                     ))
+                if self.cache is not None:
+                    self.cache.invalidate(event.id)
+                if metrics is not None:
+                    metrics.increment('events_failed_total', type=event.type)
 
                 # re-raise the exception
                 raise handler_exception
 
+        if savepoint:
+            savepoint.commit()
+
+        if metrics is not None:
+            self.record('emit', event, start)
+            metrics.increment('events_emitted_total', type=event.type)
+
         # return event at the end
         return event
 
-    def save_event(self, event):
+    def save_event(self, event, expected_version=None, conn=None):
         """
         Save event
         Validates and persist event object. This should only get run
         to persist and event after all the handlers ran.
 
+        New events of an object get next version number of that object.
+        No locks are taken: a concurrent write of the same version is
+        detected by unique (object_id, version) constraint and retried,
+        unless expected version was given, in which case it is reported
+        with a concurrency exception.
+
+        Pass a connection to save within its transaction (unit of work),
+        each attempt then runs in a savepoint.
+
         :param event: shiftevent.event.Event
+        :param expected_version: int, current version of the object
+        :param conn: sqlalchemy.engine.Connection, unit of work connection
         :return: shiftevent.event.Event
         """
-        if event.type not in self.handlers:
-            raise x.EventError('No handlers for event {}'.format(event.type))
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
 
         # validate
-        schema = EventSchema()
-        ok = schema.process(event)
-        if not ok:
-            raise x.InvalidEvent(validation_errors=ok.get_messages())
+        self.validate_event(event)
+        if metrics is not None:
+            self.record('validate', event, start)
+            start = perf_counter()
 
-        # and save
+        # update
         events = self.db.tables['events']
-        with self.db.engine.begin() as conn:
+        if event.id:
+            with self.transaction(conn) as conn:
+                data = event.to_db(self.codecs)
+                del data['id']
+                query = events.update().where(events.c.id == event.id)
+                conn.execute(query.values(**data))
+            if self.cache is not None:
+                self.cache.invalidate(event.id)
+            if metrics is not None:
+                self.record('update', event, start)
+            return event
 
-            data = event.to_db()
-            del data['id']
+        # insert
+        if expected_version is not None and event.object_id is None:
+            msg = 'Expected version requires event to have an object id'
+            raise x.EventError(msg)
 
-            # insert
-            if not event.id:
-                result = conn.execute(events.insert(), **data)
-                event.id = result.inserted_primary_key[0]
+        attempts = self.VERSION_RETRIES if expected_version is None else 1
+        for _ in range(attempts):
+            try:
+                with self.transaction(conn) as tx:
+                    if event.object_id is not None:
+                        version = self.get_version(event.object_id, tx)
+                        if expected_version is not None \
+                                and version != expected_version:
+                            raise x.ConcurrencyError(
+                                object_id=event.object_id,
+                                expected_version=expected_version,
+                                actual_version=version
+                            )
+                        event.version = version + 1
 
-            # update
-            else:
-                query = events.update().where(events.c.id == event.id)
-                result = conn.execute(query.values(**data))
+                    data = event.to_db(self.codecs)
+                    del data['id']
+                    result = tx.execute(events.insert(), **data)
+                    event.id = result.inserted_primary_key[0]
+                if metrics is not None:
+                    self.record('insert', event, start)
+                    metrics.increment('events_saved_total', type=event.type)
+                return event
+            except IntegrityError:
+                if not self.version_taken(event, conn):
+                    raise
 
-        return event
+        raise x.ConcurrencyError(
+            object_id=event.object_id,
+            expected_version=expected_version,
+            actual_version=self.get_version(event.object_id, conn)
+        )
+
+    def save_events(self, events, batch_size=500):
+        """
+        Save events
+        Bulk-inserts an iterable of new events. Events are validated and
+        written in batches, each batch in a single transaction using
+        multi-row inserts. Every saved event gets its id assigned. Note that
+        batches are committed independently, so if a later batch fails,
+        earlier batches remain persisted.
+
+        :param events: iterable of shiftevent.event.Event or dicts
+        :param batch_size: int, number of events per transaction
+        :return: list, ids of inserted events
+        """
+        if batch_size < 1:
+            msg = 'Batch size must be a positive integer, got {}'
+            raise x.ConfigurationException(msg.format(batch_size))
+
+        ids = []
+        batch = []
+        for event in events:
+            if isinstance(event, dict):
+                event = Event(**event)
+            if event.id:
+                msg = 'Bulk save only inserts new events, got {}'
+                raise x.EventError(msg.format(event))
+
+            self.validate_event(event)
+            batch.append(event)
+            if len(batch) >= batch_size:
+                ids.extend(self.insert_batch(batch))
+                batch = []
+
+        if batch:
+            ids.extend(self.insert_batch(batch))
+
+        return ids
+
+    def insert_batch(self, batch):
+        """
+        Insert batch
+        Inserts a batch of validated events in a single transaction and
+        assigns ids and object versions to them. Uses multi-row inserts
+        chunked to stay within dialect parameter limits. PostgreSQL gets ids
+        back via RETURNING, SQLite and MySQL derive them from the last row
+        id, since a single multi-row insert gets consecutive ids on these
+        backends. Other dialects fall back to one insert per event. The
+        batch is retried if a concurrent writer takes one of the versions.
+
+        :param batch: list of shiftevent.event.Event
+        :return: list, ids of inserted events
+        """
+        events = self.db.tables['events']
+        for _ in range(self.VERSION_RETRIES):
+            ids = []
+            try:
+                with self.db.engine.begin() as conn:
+                    object_ids = set(e.object_id for e in batch)
+                    object_ids.discard(None)
+                    versions = self.get_versions(object_ids, conn)
+
+                    rows = []
+                    for event in batch:
+                        if event.object_id is not None:
+                            object_id = str(event.object_id)
+                            versions[object_id] += 1
+                            event.version = versions[object_id]
+                        data = event.to_db(self.codecs)
+                        del data['id']
+                        rows.append(data)
+
+                    dialect = conn.dialect.name
+                    if dialect not in self.MAX_PARAMS:
+                        for data in rows:
+                            result = conn.execute(events.insert(), **data)
+                            ids.append(result.inserted_primary_key[0])
+                    else:
+                        chunk_size = self.MAX_PARAMS[dialect] // len(rows[0])
+                        for i in range(0, len(rows), chunk_size):
+                            chunk = rows[i:i + chunk_size]
+                            ids.extend(self.insert_chunk(conn, chunk))
+                break
+            except IntegrityError:
+                if not any(self.version_taken(e) for e in batch):
+                    raise
+        else:
+            msg = 'Failed to save batch due to concurrent writes'
+            raise x.ConcurrencyError(msg)
+
+        for event, id in zip(batch, ids):
+            event.id = id
+
+        return ids
+
+    def insert_chunk(self, conn, chunk):
+        """
+        Insert chunk
+        Inserts a list of rows with a single multi-row insert statement
+        and returns generated ids.
+
+        :param conn: sqlalchemy.engine.Connection
+        :param chunk: list of dicts, rows to insert
+        :return: list, ids of inserted rows
+        """
+        events = self.db.tables['events']
+        query = events.insert().values(chunk)
+        if conn.dialect.name == 'postgresql':
+            result = conn.execute(query.returning(events.c.id))
+            return [row[0] for row in result]
+
+        result = conn.execute(query)
+        if conn.dialect.name == 'mysql':
+            first = result.lastrowid
+        else:
+            first = result.lastrowid - len(chunk) + 1
+        return list(range(first, first + len(chunk)))
+
+    def get_version(self, object_id, conn=None):
+        """
+        Get version
+        Returns current version of an object, which is the version of its
+        latest event, or 0 if there are no events.
+
+        :param object_id: str, id of the object
+        :param conn: sqlalchemy.engine.Connection, optional connection to use
+        :return: int
+        """
+        return self.get_versions([object_id], conn)[str(object_id)]
+
+    def get_versions(self, object_ids, conn=None):
+        """
+        Get versions
+        Returns current versions of multiple objects.
+
+        :param object_ids: iterable, ids of objects
+        :param conn: sqlalchemy.engine.Connection, optional connection to use
+        :return: dict, object id to version
+        """
+        object_ids = [str(object_id) for object_id in object_ids]
+        versions = dict.fromkeys(object_ids, 0)
+        if not object_ids:
+            return versions
+
+        if not conn:
+            with self.db.engine.begin() as conn:
+                return self.get_versions(object_ids, conn)
+
+        chunk_size = self.MAX_PARAMS.get(conn.dialect.name, 999)
+        for i in range(0, len(object_ids), chunk_size):
+            query = self.versions_query(object_ids[i:i + chunk_size])
+            for object_id, version in conn.execute(query):
+                versions[object_id] = version or 0
+
+        return versions
+
+    def version_taken(self, event, conn=None):
+        """
+        Version taken
+        Checks if the version assigned to an event that failed to insert
+        has since been written by someone else.
+
+        :param event: shiftevent.event.Event
+        :param conn: sqlalchemy.engine.Connection, optional
+        :return: bool
+        """
+        if event.object_id is None or not event.version:
+            return False
+        return self.get_version(event.object_id, conn) >= event.version
 
     def get_event(self, id):
         """
         Get event
-        Returns event found by unique id.
+        Returns event found by unique id. Reads through event cache
+        if configured.
         :param id: int, event id
         :return: shiftevent.event.Event
         """
+        if self.cache is not None:
+            data = self.cache.get(id)
+            if data:
+                return Event.from_db(data, self.codecs)
+
         event = None
-        events = self.db.tables['events']
+        tables = [self.db.tables['events']]
+        if self.read_archive:
+            tables.append(self.db.tables['archive'])
+
         with self.db.engine.begin() as conn:
-            select = events.select().where(events.c.id == id)
-            data = conn.execute(select).fetchone()
+            data = None
+            for events in tables:
+                select = events.select().where(events.c.id == id)
+                data = conn.execute(select).fetchone()
+                if data:
+                    break
             if data:
-                event = Event(**data)
+                event = Event.from_db(data, self.codecs)
+                if self.cache is not None:
+                    self.cache.put(id, data)
         return event
 
+    def get_events(self, ids):
+        """
+        Get events
+        Returns events found by ids in the order ids were given, with None
+        in place of events that don't exist. Events are taken from cache
+        if configured and the rest is fetched with as few IN queries as
+        dialect parameter limits allow.
+
+        :param ids: iterable, event ids
+        :return: list of shiftevent.event.Event or None
+        """
+        ids = list(ids)
+        rows = dict()
+        if self.cache is not None:
+            for id in set(ids):
+                data = self.cache.get(id)
+                if data:
+                    rows[id] = data
+
+        tables = [self.db.tables['events']]
+        if self.read_archive:
+            tables.append(self.db.tables['archive'])
+
+        for events in tables:
+            missing = [id for id in set(ids) if id not in rows]
+            if not missing:
+                break
+
+            with self.db.engine.begin() as conn:
+                chunk_size = self.MAX_PARAMS.get(conn.dialect.name, 999)
+                for i in range(0, len(missing), chunk_size):
+                    chunk = missing[i:i + chunk_size]
+                    query = events.select().where(events.c.id.in_(chunk))
+                    for data in conn.execute(query):
+                        data = dict(data)
+                        rows[data['id']] = data
+                        if self.cache is not None:
+                            self.cache.put(data['id'], data)
+
+        return [
+            Event.from_db(rows[id], self.codecs) if id in rows else None
+            for id in ids
+        ]
+
+    def query(self):
+        """
+        Query
+        Returns a query builder to filter, count and page through events.
+        :return: shiftevent.query.EventQuery
+        """
+        from shiftevent.query import EventQuery
+        return EventQuery(self)
+
+    def get_stream(self, object_id, from_id=None, to_id=None, reverse=False,
+                   limit=None):
+        """
+        Get stream
+        Returns events for a single object ordered by id. Backed by composite
+        (object_id, id) index, so this is an index range scan. Pass reverse
+        flag with a limit to get latest N events of an object, newest first.
+
+        :param object_id: str, object id to get events for
+        :param from_id: int, only return events starting from this id
+        :param to_id: int, only return events up to and including this id
+        :param reverse: bool, return newest events first
+        :param limit: int, maximum number of events to return
+        :return: list of shiftevent.event.Event
+        """
+        query = self.stream_query(object_id, from_id, to_id, reverse, limit)
+        with self.db.engine.begin() as conn:
+            rows = conn.execute(query)
+            return [Event.from_db(row, self.codecs) for row in rows]
+
+    def save_snapshot(self, object_id, state, event_id):
+        """
+        Save snapshot
+        Persists object state as of certain event.
+
+        :param object_id: str, id of the object
+        :param state: object state, must be supported by serializer
+        :param event_id: int, id of the last event included in state
+        :return: shiftevent.snapshot.Snapshot
+        """
+        snapshot = Snapshot(
+            object_id=str(object_id),
+            event_id=event_id,
+            state=state
+        )
+
+        snapshots = self.db.tables['snapshots']
+        with self.db.engine.begin() as conn:
+            result = conn.execute(
+                snapshots.insert(),
+                created=snapshot.created,
+                object_id=snapshot.object_id,
+                event_id=snapshot.event_id,
+                state=self.snapshot_serializer.serialize(state)
+            )
+            snapshot.id = result.inserted_primary_key[0]
+
+        return snapshot
+
+    def get_snapshot(self, object_id, before_id=None):
+        """
+        Get snapshot
+        Returns latest snapshot of an object, optionally taken at or before
+        a given event id.
+
+        :param object_id: str, id of the object
+        :param before_id: int, latest event id snapshot can include
+        :return: shiftevent.snapshot.Snapshot or None
+        """
+        snapshots = self.db.tables['snapshots']
+        query = snapshots.select().where(
+            snapshots.c.object_id == str(object_id)
+        )
+        if before_id is not None:
+            query = query.where(snapshots.c.event_id <= before_id)
+        query = query.order_by(desc(snapshots.c.event_id)).limit(1)
+
+        with self.db.engine.begin() as conn:
+            data = conn.execute(query).fetchone()
+
+        if not data:
+            return None
+
+        data = dict(data)
+        data['state'] = self.snapshot_serializer.deserialize(data['state'])
+        return Snapshot(**data)
+
+    def load_snapshot(self, object_id):
+        """
+        Load snapshot
+        Returns latest snapshot of an object along with the tail of events
+        that happened after it. If there is no snapshot, returns full
+        event stream of the object.
+
+        :param object_id: str, id of the object
+        :return: tuple, (shiftevent.snapshot.Snapshot or None, list of events)
+        """
+        snapshot = self.get_snapshot(object_id)
+        from_id = snapshot.event_id + 1 if snapshot else None
+        return snapshot, self.get_stream(object_id, from_id=from_id)
+
+    def load_state(self, object_id, reducer, initial=None):
+        """
+        Load state
+        Rebuilds object state from latest snapshot and events after it by
+        applying reducer to every event. If snapshot frequency is configured
+        and the tail is at least that long, saves a fresh snapshot.
+
+        :param object_id: str, id of the object
+        :param reducer: callable, accepts state and event, returns new state
+        :param initial: initial state to use when there is no snapshot
+        :return: object state
+        """
+        snapshot, events = self.load_snapshot(object_id)
+        state = snapshot.state if snapshot else initial
+        for event in events:
+            state = reducer(state, event)
+
+        frequency = self.snapshot_frequency
+        if frequency and events and len(events) >= frequency:
+            try:
+                self.save_snapshot(object_id, state, events[-1].id)
+            except IntegrityError:
+                pass  # concurrent loader saved this snapshot
+
+        return state
+
+    def get_checkpoint(self, name):
+        """
+        Get checkpoint
+        Returns id of the last event processed by a named consumer.
+
+        :param name: str, consumer name, like subscription or replay
+        :return: int or None
+        """
+        checkpoints = self.db.tables['checkpoints']
+        query = checkpoints.select().where(checkpoints.c.name == name)
+        with self.db.engine.begin() as conn:
+            data = conn.execute(query).fetchone()
+        return data['event_id'] if data else None
+
+    def save_checkpoint(self, name, event_id):
+        """
+        Save checkpoint
+        Persists id of the last event processed by a named consumer.
+
+        :param name: str, consumer name, like subscription or replay
+        :param event_id: int, last processed event id
+        :return: None
+        """
+        checkpoints = self.db.tables['checkpoints']
+        data = dict(event_id=event_id, updated=datetime.utcnow())
+        with self.db.engine.begin() as conn:
+            query = checkpoints.update().where(checkpoints.c.name == name)
+            result = conn.execute(query.values(**data))
+            if not result.rowcount:
+                try:
+                    conn.execute(checkpoints.insert(), name=name, **data)
+                except IntegrityError:
+                    msg = 'Checkpoint [{}] is saved concurrently'
+                    raise x.EventError(msg.format(name))
+
+    def iter_events(self, after_id=None, batch_size=1000, types=None,
+                    until=None):
+        """
+        Iterate events
+        Returns a generator over stored events in id order. Reads the store
+        page by page using keyset pagination on primary key rather than
+        offsets, and streams results with server-side cursors where the
+        dialect supports them, so memory use stays constant regardless
+        of the size of the store.
+
+        :param after_id: int, only return events with greater ids
+        :param batch_size: int, number of events to fetch per query
+        :param types: str or list, only return events of these types
+        :param until: datetime, only return events created up to this time
+        :return: generator of shiftevent.event.Event
+        """
+        if batch_size < 1:
+            msg = 'Batch size must be a positive integer, got {}'
+            raise x.ConfigurationException(msg.format(batch_size))
+
+        last = after_id
+        while True:
+            query = self.page_query(last, batch_size, types, until)
+            fetched = 0
+            with self.db.engine.connect() as conn:
+                conn = conn.execution_options(stream_results=True)
+                for row in conn.execute(query):
+                    fetched += 1
+                    last = row['id']
+                    yield Event.from_db(row, self.codecs)
+
+            if fetched < batch_size:
+                break
+
 
 
 
@@ -45,4 +45,30 @@ class InvalidEvent(EventException, RuntimeError):
         super().__init__(*args, **kwargs)
 
 
+class ConcurrencyError(EventException, RuntimeError):
+    """ Raised when an object was modified by a concurrent writer """
+    def __init__(
+        self,
+        *args,
+        object_id=None,
+        expected_version=None,
+        actual_version=None,
+        **kwargs):
+        self.object_id = object_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+        if not args:
+            msg = 'Object [{}] was modified concurrently: expected version ' \
+                  '[{}], got [{}]'
+            args = (msg.format(object_id, expected_version, actual_version),)
+        super().__init__(*args, **kwargs)
+
+
+class DispatcherError(EventException, RuntimeError):
+    """ Raised when dispatching events in the background fails """
+    pass
+
 
+class DispatchQueueFull(DispatcherError):
+    """ Raised when dispatch queue stays full for longer than timeout """
+    pass
@@ -1,6 +1,28 @@
 from .base import BaseHandler
-from .dummy1 import Dummy1
-from .dummy2 import Dummy2
-from .dummy3 import Dummy3
-from .dummy4 import Dummy4
-from .no_types import NoTypes
+
+# dummy handlers, imported on first access
+dummies = dict(
+    Dummy1='.dummy1',
+    Dummy2='.dummy2',
+    Dummy3='.dummy3',
+    Dummy4='.dummy4',
+    NoTypes='.no_types',
+)
+
+
+def __getattr__(name):
+    """
+    Module getattr
+    Imports dummy handlers lazily, they are only needed for testing and
+    as default handlers configuration.
+    :param name: str, attribute name
+    :return: shiftevent.handlers.BaseHandler
+    """
+    if name not in dummies:
+        msg = 'module {!r} has no attribute {!r}'
+        raise AttributeError(msg.format(__name__, name))
+
+    from importlib import import_module
+    value = getattr(import_module(dummies[name], __name__), name)
+    globals()[name] = value
+    return value
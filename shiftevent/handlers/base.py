@@ -1,4 +1,6 @@
 import abc
+from inspect import isawaitable
+from time import perf_counter
 from shiftevent import exceptions as x
 
 
@@ -16,6 +18,9 @@ class BaseHandler(metaclass=abc.ABCMeta):
     # handler context
     context = None
 
+    # metrics to report handler timings to, set by event service
+    metrics = None
+
     def __init__(self, context=None):
         """
         Initializes the handler and gets all required service injected
@@ -57,7 +62,9 @@ class BaseHandler(metaclass=abc.ABCMeta):
             raise x.ProcessingUnsavedEvent(msg.format(event))
 
         self.check(event)
-        return self.handle(event)
+        if self.metrics is None:
+            return self.handle(event)
+        return self.measure('handle', self.handle, event)
 
     def rollback_event(self, event):
         """
@@ -74,7 +81,76 @@ class BaseHandler(metaclass=abc.ABCMeta):
             raise x.ProcessingUnsavedEvent(msg.format(event))
 
         self.check(event)
-        return self.rollback(event)
+        if self.metrics is None:
+            return self.rollback(event)
+        return self.measure('rollback', self.rollback, event)
+
+    def measure(self, action, method, event):
+        """
+        Measure
+        Runs handler method and reports its duration, and failure if it
+        raises, to metrics. Results of async methods are measured when
+        awaited.
+
+        :param action: str, handle or rollback
+        :param method: callable, handler method to run
+        :param event: shiftevent.event.Event
+        :return: shiftevent.event.Event or awaitable
+        """
+        cls = type(self)
+        labels = dict(
+            type=event.type,
+            handler='{}.{}'.format(cls.__module__, cls.__name__),
+            action=action,
+        )
+
+        start = perf_counter()
+        try:
+            result = method(event)
+        except Exception:
+            self.record(start, labels, failed=True)
+            raise
+
+        if isawaitable(result):
+            return self.measure_async(result, start, labels)
+
+        self.record(start, labels)
+        return result
+
+    async def measure_async(self, awaitable, start, labels):
+        """
+        Measure async
+        Awaits result of async handler method and reports its duration.
+
+        :param awaitable: awaitable, result of handler method
+        :param start: float, performance counter when method was called
+        :param labels: dict, metric labels
+        :return: shiftevent.event.Event
+        """
+        try:
+            result = await awaitable
+        except Exception:
+            self.record(start, labels, failed=True)
+            raise
+
+        self.record(start, labels)
+        return result
+
+    def record(self, start, labels, failed=False):
+        """
+        Record
+        Reports handler duration and failure to metrics.
+
+        :param start: float, performance counter when method was called
+        :param labels: dict, metric labels
+        :param failed: bool, whether handler method raised
+        :return: None
+        """
+        duration = perf_counter() - start
+        self.metrics.observe('handler_seconds', duration, **labels)
+        self.metrics.increment('handler_calls_total', **labels)
+        if failed:
+            self.metrics.increment('handler_errors_total', **labels)
 
     @abc.abstractmethod
     def handle(self, event):
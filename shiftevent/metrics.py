@@ -0,0 +1,236 @@
+import abc
+import os
+import threading
+from bisect import bisect_left
+
+
+class BaseMetrics(metaclass=abc.ABCMeta):
+    """
+    Base metrics
+    Receives measurements from instrumented event services and handlers.
+    Implement this to feed your own metrics system. Metric names are
+    plain strings, labels are passed as keyword arguments.
+    """
+
+    @abc.abstractmethod
+    def increment(self, name, value=1, **labels):
+        """
+        Increment counter
+        :param name: str, metric name
+        :param value: int, value to add
+        :param labels: str, metric labels
+        :return: None
+        """
+        raise NotImplemented('Implement me in your concrete metrics')
+
+    @abc.abstractmethod
+    def observe(self, name, value, **labels):
+        """
+        Observe
+        Records a measurement, usually duration in seconds.
+        :param name: str, metric name
+        :param value: float, measured value
+        :param labels: str, metric labels
+        :return: None
+        """
+        raise NotImplemented('Implement me in your concrete metrics')
+
+
+class MetricsRegistry(BaseMetrics):
+    """
+    Metrics registry
+    In-process metrics storage with counters and bucketed histograms,
+    one series per metric name and set of labels. Safe to share between
+    threads.
+    """
+
+    # default histogram buckets, seconds
+    BUCKETS = (
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+        0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+    )
+
+    def __init__(self, buckets=None):
+        """
+        Initialize registry
+        :param buckets: tuple, upper bounds of histogram buckets
+        """
+        self.buckets = tuple(sorted(buckets)) if buckets else self.BUCKETS
+        self.counters = dict()
+        self.histograms = dict()
+        self.lock = threading.Lock()
+
+    def key(self, name, labels):
+        """
+        Key
+        Returns series key for metric name and labels.
+        :param name: str, metric name
+        :param labels: dict, metric labels
+        :return: tuple
+        """
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        """ Increment counter """
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """ Observe value in a histogram """
+        key = self.key(name, labels)
+        bucket = bisect_left(self.buckets, value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self.histograms[key] = histogram
+            histogram[0][bucket] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def counter(self, name, **labels):
+        """
+        Counter
+        Returns current counter value.
+        :param name: str, metric name
+        :param labels: str, metric labels
+        :return: int
+        """
+        return self.counters.get(self.key(name, labels), 0)
+
+    def histogram(self, name, **labels):
+        """
+        Histogram
+        Returns histogram summary: count, sum and cumulative bucket counts.
+        :param name: str, metric name
+        :param labels: str, metric labels
+        :return: dict or None
+        """
+        histogram = self.histograms.get(self.key(name, labels))
+        if histogram is None:
+            return None
+
+        buckets = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), histogram[0]):
+            total += count
+            buckets.append((bound, total))
+        return dict(count=histogram[2], sum=histogram[1], buckets=buckets)
+
+    def reset(self):
+        """
+        Reset
+        Drops all collected metrics.
+        :return: None
+        """
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class PrometheusExporter:
+    """
+    Prometheus exporter
+    Renders metrics registry in Prometheus text exposition format, to be
+    served from an endpoint or written to a file picked up by node
+    exporter textfile collector.
+    """
+
+    def __init__(self, registry, prefix='shiftevent'):
+        """
+        Initialize exporter
+        :param registry: shiftevent.metrics.MetricsRegistry
+        :param prefix: str, prefix for metric names
+        """
+        self.registry = registry
+        self.prefix = prefix
+
+    def name(self, name):
+        """ Returns prefixed metric name """
+        return '{}_{}'.format(self.prefix, name) if self.prefix else name
+
+    def labels(self, labels, extra=None):
+        """
+        Labels
+        Renders labels, escaping values.
+        :param labels: tuple, label name and value pairs
+        :param extra: tuple, additional label pair
+        :return: str
+        """
+        labels = list(labels)
+        if extra:
+            labels.append(extra)
+        if not labels:
+            return ''
+
+        rendered = []
+        for label, value in labels:
+            value = str(value).replace('\\', '\\\\')
+            value = value.replace('"', '\\"').replace('\n', '\\n')
+            rendered.append('{}="{}"'.format(label, value))
+        return '{' + ','.join(rendered) + '}'
+
+    def render(self):
+        """
+        Render
+        Returns metrics in Prometheus text format.
+        :return: str
+        """
+        registry = self.registry
+        with registry.lock:
+            counters = sorted(registry.counters.items())
+            histograms = sorted(
+                (key, [list(value[0]), value[1], value[2]])
+                for key, value in registry.histograms.items()
+            )
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            name = self.name(name)
+            if name not in typed:
+                lines.append('# TYPE {} counter'.format(name))
+                typed.add(name)
+            lines.append('{}{} {}'.format(name, self.labels(labels), value))
+
+        bounds = registry.buckets + (float('inf'),)
+        for (name, labels), (counts, total, count) in histograms:
+            name = self.name(name)
+            if name not in typed:
+                lines.append('# TYPE {} histogram'.format(name))
+                typed.add(name)
+
+            cumulative = 0
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('{}_bucket{} {}'.format(
+                    name,
+                    self.labels(labels, ('le', le)),
+                    cumulative
+                ))
+            labels = self.labels(labels)
+            lines.append('{}_sum{} {}'.format(name, labels, repr(total)))
+            lines.append('{}_count{} {}'.format(name, labels, count))
+
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def write(self, path):
+        """
+        Write
+        Atomically writes metrics to a file.
+        :param path: str, file path
+        :return: None
+        """
+        import tempfile
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w') as file:
+                file.write(self.render())
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
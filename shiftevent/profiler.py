@@ -0,0 +1,196 @@
+import cProfile
+import os
+import pstats
+import random
+import threading
+from shiftevent import exceptions as x
+
+# sort keys for profile summaries
+SORT_KEYS = ('cumulative', 'tottime', 'calls')
+
+# held while a handler is profiled, only one profile can be active
+PROFILING = threading.Lock()
+
+
+class HandlerProfiler:
+    """
+    Handler profiler
+    Runs event handlers under cProfile when switched on for event type or
+    picked by sampling, and aggregates stats per handler class. Collected
+    stats can be dumped to pstats files, one per handler, to be inspected
+    with pstats, snakeviz or summarized with the profile command.
+
+    Profiling slows handlers down considerably, so in production keep
+    sample rate low or restrict profiling to event types being looked at.
+
+    Only one profile can be active in a process at a time, so handlers
+    running while another one is profiled, in this or another thread, or
+    while some other profiler is active, run without profiling.
+    """
+
+    def __init__(self, types=None, sample_rate=1.0, seed=None):
+        """
+        Initialize profiler
+        :param types: list, event types to profile, all types by default
+        :param sample_rate: float, fraction of emits to profile, 0 to 1
+        :param seed: int, random seed for sampling
+        """
+        if not 0 < sample_rate <= 1:
+            msg = 'Sample rate must be within (0, 1], got {}'
+            raise x.ConfigurationException(msg.format(sample_rate))
+
+        self.types = frozenset(types) if types is not None else None
+        self.sample_rate = sample_rate
+        self.random = random.Random(seed)
+        self.stats = dict()
+        self.calls = dict()
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        """ Returns printable representation of a profiler """
+        types = sorted(self.types) if self.types is not None else 'all'
+        msg = '<HandlerProfiler types=[{}] sample_rate=[{}]>'
+        return msg.format(types, self.sample_rate)
+
+    def should_profile(self, event):
+        """
+        Should profile
+        Decides whether emit of the event gets profiled.
+        :param event: shiftevent.event.Event
+        :return: bool
+        """
+        if self.types is not None and event.type not in self.types:
+            return False
+        if self.sample_rate >= 1:
+            return True
+        with self.lock:
+            return self.random.random() < self.sample_rate
+
+    def run(self, handler, method, event):
+        """
+        Run
+        Runs handler method under profiler and adds collected stats to
+        stats of handler class. Handlers emitting events of their own are
+        profiled as a whole, nested handlers are not profiled separately.
+        Runs handler without profiling if another profile is active.
+
+        :param handler: shiftevent.handlers.BaseHandler
+        :param method: callable, bound handler method to run
+        :param event: shiftevent.event.Event
+        :return: shiftevent.event.Event
+        """
+        if not PROFILING.acquire(blocking=False):
+            return method(event)
+
+        try:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                return method(event)
+
+            try:
+                return method(event)
+            finally:
+                profile.disable()
+                cls = type(handler)
+                name = '{}.{}'.format(cls.__module__, cls.__name__)
+                self.collect(name, profile)
+        finally:
+            PROFILING.release()
+
+    def collect(self, name, profile):
+        """
+        Collect
+        Aggregates profile into stats of a handler.
+        :param name: str, handler name
+        :param profile: cProfile.Profile
+        :return: None
+        """
+        with self.lock:
+            if name in self.stats:
+                self.stats[name].add(profile)
+            else:
+                self.stats[name] = pstats.Stats(profile)
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def dump(self, directory):
+        """
+        Dump
+        Writes aggregated stats to pstats files named after handlers.
+        :param directory: str, directory to write to, created if missing
+        :return: list, paths of written files
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        with self.lock:
+            for name, stats in sorted(self.stats.items()):
+                path = os.path.join(directory, name + '.pstats')
+                stats.dump_stats(path)
+                paths.append(path)
+        return paths
+
+    def reset(self):
+        """
+        Reset
+        Drops all collected stats.
+        :return: None
+        """
+        with self.lock:
+            self.stats.clear()
+            self.calls.clear()
+
+
+def hottest(stats, limit=10, sort='cumulative'):
+    """
+    Hottest
+    Returns functions handler spent most time in.
+    :param stats: pstats.Stats
+    :param limit: int, number of functions to return
+    :param sort: str, one of SORT_KEYS
+    :return: list of dicts
+    """
+    if sort not in SORT_KEYS:
+        msg = 'Profile can only be sorted by {}, got [{}]'
+        raise x.ConfigurationException(msg.format(SORT_KEYS, sort))
+
+    rows = []
+    for (path, line, function), item in stats.stats.items():
+        primitive, calls, tottime, cumtime = item[:4]
+        rows.append(dict(
+            function='{}:{}({})'.format(path, line, function),
+            calls=calls,
+            tottime=tottime,
+            cumtime=cumtime,
+        ))
+
+    key = dict(cumulative='cumtime', tottime='tottime', calls='calls')[sort]
+    rows.sort(key=lambda row: row[key], reverse=True)
+    return rows[:limit]
+
+
+def summarize(path, limit=10, sort='cumulative'):
+    """
+    Summarize
+    Loads handler stats dumped by profiler and returns hottest functions
+    of every handler.
+    :param path: str, pstats file or directory of them
+    :param limit: int, number of functions per handler
+    :param sort: str, one of SORT_KEYS
+    :return: dict, handler name to list of hottest functions
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.endswith('.pstats')
+        )
+    else:
+        files = [path]
+
+    summary = dict()
+    for file in files:
+        name = os.path.basename(file)
+        if name.endswith('.pstats'):
+            name = name[:-len('.pstats')]
+        summary[name] = hottest(pstats.Stats(file), limit, sort)
+    return summary
@@ -0,0 +1,248 @@
+from shiftevent.event import Event
+from shiftevent import exceptions as x
+from sqlalchemy import sql
+
+
+class EventQuery:
+    """
+    Event query
+    Builds queries over the event store with filters by type, author,
+    object and creation date, ordering, counting and keyset pagination.
+    Filters map directly onto indexed columns: type and author filters
+    combined with date ranges are served by (type, created) and
+    (author, created) indexes, object filters by (object_id, id), and
+    pages are always ordered by an indexed key with id as a tiebreaker,
+    so that no page needs an offset scan. Query methods return the query
+    itself for chaining.
+
+    When the service reads the archive, the same query runs over event
+    store and archive, each ordered and limited on its own, and results
+    are merged.
+    """
+
+    # columns events can be ordered by
+    ORDERS = ('id', 'created')
+
+    def __init__(self, service):
+        """
+        Initialize query
+        :param service: shiftevent.event_service.EventService
+        """
+        self.service = service
+        self.table = service.db.tables['events']
+        self.archive = service.db.tables['archive']
+        self.filters = []
+        self.order = 'id'
+        self.reverse = False
+
+    def __repr__(self):
+        """ Returns printable representation of a query """
+        return '<EventQuery {}>'.format(self.select())
+
+    def type(self, *types):
+        """
+        Type
+        Only select events of given types. Types are normalized the way
+        validator stores them.
+        :param types: str, event types
+        :return: shiftevent.query.EventQuery
+        """
+        types = [str(type).strip().upper() for type in types]
+        self.filters.append(lambda table: table.c.type.in_(types))
+        return self
+
+    def author(self, *authors):
+        """
+        Author
+        Only select events by given authors.
+        :param authors: str, author ids
+        :return: shiftevent.query.EventQuery
+        """
+        authors = [str(author) for author in authors]
+        self.filters.append(lambda table: table.c.author.in_(authors))
+        return self
+
+    def object_id(self, *object_ids):
+        """
+        Object id
+        Only select events of given objects.
+        :param object_ids: str, object ids
+        :return: shiftevent.query.EventQuery
+        """
+        object_ids = [str(object_id) for object_id in object_ids]
+        self.filters.append(
+            lambda table: table.c.object_id.in_(object_ids)
+        )
+        return self
+
+    def created(self, since=None, until=None):
+        """
+        Created
+        Only select events created within date range, inclusive.
+        :param since: datetime, earliest creation date
+        :param until: datetime, latest creation date
+        :return: shiftevent.query.EventQuery
+        """
+        if since is not None:
+            self.filters.append(lambda table: table.c.created >= since)
+        if until is not None:
+            self.filters.append(lambda table: table.c.created <= until)
+        return self
+
+    def order_by(self, order='id', reverse=False):
+        """
+        Order by
+        Sets events order. Events with the same creation date are ordered
+        by id.
+        :param order: str, id or created
+        :param reverse: bool, newest events first
+        :return: shiftevent.query.EventQuery
+        """
+        if order not in self.ORDERS:
+            msg = 'Events can only be ordered by {}, got [{}]'
+            raise x.ConfigurationException(msg.format(self.ORDERS, order))
+
+        self.order = order
+        self.reverse = reverse
+        return self
+
+    def where(self, query, after=None, table=None):
+        """
+        Where
+        Applies filters to a query, optionally restricting it to events
+        following given event in current order (keyset pagination).
+        :param query: sqlalchemy.sql.Select
+        :param after: shiftevent.event.Event, last event of previous page
+        :param table: sqlalchemy.Table, table queried, defaults to events
+        :return: sqlalchemy.sql.Select
+        """
+        table = table if table is not None else self.table
+        filters = [filter(table) for filter in self.filters]
+        if after is not None:
+            id = table.c.id
+            created = table.c.created
+            if self.order == 'id' and self.reverse:
+                filters.append(id < after.id)
+            elif self.order == 'id':
+                filters.append(id > after.id)
+            elif self.reverse:
+                filters.append(sql.or_(
+                    created < after.created,
+                    sql.and_(created == after.created, id < after.id)
+                ))
+            else:
+                filters.append(sql.or_(
+                    created > after.created,
+                    sql.and_(created == after.created, id > after.id)
+                ))
+
+        return query.where(sql.and_(*filters)) if filters else query
+
+    def columns(self, selectable):
+        """
+        Columns
+        Returns columns to order selected events by.
+        :param selectable: sqlalchemy.Table or alias, events selected
+        :return: list
+        """
+        columns = [selectable.c.id]
+        if self.order == 'created':
+            columns.insert(0, selectable.c.created)
+        if self.reverse:
+            columns = [sql.desc(column) for column in columns]
+        return columns
+
+    def select(self, after=None, limit=None, table=None):
+        """
+        Select
+        Builds select statement for current filters and order, over event
+        store and archive if the service reads it.
+        :param after: shiftevent.event.Event, last event of previous page
+        :param limit: int, max number of events to select
+        :param table: sqlalchemy.Table, only query this table
+        :return: sqlalchemy.sql.Select
+        """
+        if table is None and self.service.read_archive:
+            union = sql.union_all(
+                sql.select([self.select(after, limit, self.table).alias()]),
+                sql.select([self.select(after, limit, self.archive).alias()]),
+            ).alias('events')
+            query = sql.select([union]).order_by(*self.columns(union))
+            return query.limit(limit) if limit else query
+
+        table = table if table is not None else self.table
+        query = self.where(table.select(), after, table)
+        query = query.order_by(*self.columns(table))
+        if limit:
+            query = query.limit(limit)
+        return query
+
+    def count(self):
+        """
+        Count
+        Returns number of events matching filters, archived events
+        included if the service reads archive.
+        :return: int
+        """
+        tables = [self.table]
+        if self.service.read_archive:
+            tables.append(self.archive)
+
+        count = 0
+        with self.service.db.engine.connect() as conn:
+            for table in tables:
+                query = sql.select([sql.func.count(table.c.id)])
+                count += conn.execute(self.where(query, table=table)).scalar()
+        return count
+
+    def all(self, limit=None):
+        """
+        All
+        Returns events matching filters in current order.
+        :param limit: int, max number of events to return
+        :return: list of shiftevent.event.Event
+        """
+        return self.page(limit, after=None)
+
+    def first(self):
+        """
+        First
+        Returns first event matching filters in current order.
+        :return: shiftevent.event.Event or None
+        """
+        events = self.page(1)
+        return events[0] if events else None
+
+    def page(self, size, after=None):
+        """
+        Page
+        Returns a page of events following given event. Pass last event
+        of a page to get the next one.
+        :param size: int, page size
+        :param after: shiftevent.event.Event, last event of previous page
+        :return: list of shiftevent.event.Event
+        """
+        codecs = self.service.codecs
+        query = self.select(after, size)
+        with self.service.db.engine.connect() as conn:
+            return [Event.from_db(row, codecs) for row in conn.execute(query)]
+
+    def iter(self, batch_size=1000):
+        """
+        Iter
+        Returns a generator over all events matching filters, fetched page
+        by page.
+        :param batch_size: int, number of events to fetch per query
+        :return: generator of shiftevent.event.Event
+        """
+        if batch_size < 1:
+            msg = 'Batch size must be a positive integer, got {}'
+            raise x.ConfigurationException(msg.format(batch_size))
+
+        after = None
+        while True:
+            events = self.page(batch_size, after)
+            yield from events
+            if len(events) < batch_size:
+                break
+            after = events[-1]
@@ -0,0 +1,255 @@
+import os
+from inspect import isclass
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from shiftevent.event import Event
+from shiftevent.handlers import BaseHandler
+from shiftevent import exceptions as x
+from sqlalchemy import sql
+
+# handler chains, context and codecs of a worker process
+worker = dict()
+
+
+def init_worker(chains, context, codecs):
+    """
+    Init worker
+    Stores replay configuration in worker process once, so that it is not
+    sent along with every partition.
+
+    :param chains: dict, event types mapped to tuples of handler classes
+    :param context: dict, context to pass to handlers
+    :param codecs: shiftevent.codecs.CodecRegistry
+    :return: None
+    """
+    worker.update(chains=chains, context=context, codecs=codecs)
+
+
+def replay_partition(rows):
+    """
+    Replay partition
+    Entry point for worker processes, see replay_rows().
+    :param rows: list of dicts, event rows in id order
+    :return: int, number of events replayed
+    """
+    return replay_rows(rows, **worker)
+
+
+def replay_rows(rows, chains, context, codecs):
+    """
+    Replay rows
+    Feeds events to their handler chains in order. Handlers are
+    instantiated once per partition. As with emit, a handler returning
+    nothing skips the rest of the chain.
+
+    :param rows: list of dicts, event rows in id order
+    :param chains: dict, event types mapped to tuples of handler classes
+    :param context: dict, context to pass to handlers
+    :param codecs: shiftevent.codecs.CodecRegistry
+    :return: int, number of events replayed
+    """
+    instances = dict()
+    for row in rows:
+        event = Event.from_db(row, codecs)
+        for handler in chains[event.type]:
+            if handler not in instances:
+                instances[handler] = handler(context=context)
+            handled = instances[handler].handle_event(event)
+            if not handled:
+                break
+            event = handled
+
+    return len(rows)
+
+
+class Replay:
+    """
+    Replay
+    Rebuilds projections by replaying stored events through a set of
+    handlers. Events are streamed from the store in batches and each batch
+    is partitioned by object id across a pool of worker processes, so all
+    events of an object are replayed by one worker in id order. Next batch
+    is read while current one is being replayed. Progress is checkpointed
+    after every batch, so an interrupted replay can resume where it left
+    off, replaying at most one batch again.
+    """
+
+    def __init__(
+        self,
+        service,
+        handlers,
+        name=None,
+        workers=None,
+        batch_size=1000,
+        handler_context=None,
+        progress=None):
+        """
+        Initialize replay
+        :param service: shiftevent.event_service.EventService
+        :param handlers: list of handler classes to replay events through,
+                         must be importable to be sent to worker processes
+        :param name: str, checkpoint name to resume from, no resume if None
+        :param workers: int, number of processes, defaults to cpu count,
+                        0 to replay in current process
+        :param batch_size: int, number of events to read per query
+        :param handler_context: dict, context to pass to handlers, must be
+                                picklable to be sent to worker processes
+        :param progress: callable, accepts replayed events count, total
+                         events count and last replayed event id
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 0 or batch_size < 1:
+            msg = 'Replay needs a positive batch size and worker count'
+            raise x.ConfigurationException(msg)
+
+        chains = dict()
+        for handler in handlers:
+            if not isclass(handler) or not issubclass(handler, BaseHandler):
+                msg = 'Handler implementations must extend BaseHandler'
+                raise x.HandlerInstantiationError(msg)
+            if not handler.EVENT_TYPES:
+                msg = 'Event types undefined for handler [{}]'
+                raise x.MissingEventType(msg.format(handler))
+            for event_type in handler.EVENT_TYPES:
+                chains.setdefault(event_type, []).append(handler)
+
+        # validate with the same rules as event service handlers
+        service.compile_handlers(chains)
+
+        self.service = service
+        self.chains = {t: tuple(chain) for t, chain in chains.items()}
+        self.name = name
+        self.workers = workers
+        self.batch_size = batch_size
+        self.handler_context = handler_context
+        self.progress = progress
+
+    def __repr__(self):
+        """ Returns printable representation of a replay """
+        repr = '<Replay name=[{}] workers=[{}] batch_size=[{}]>'
+        return repr.format(self.name, self.workers, self.batch_size)
+
+    @property
+    def types(self):
+        """
+        Types
+        Returns event types handled by replay handlers
+        :return: list
+        """
+        return sorted(self.chains.keys())
+
+    def count(self, after_id=None):
+        """
+        Count
+        Returns number of events to replay after given id, archived events
+        included if the service reads archive.
+        :param after_id: int, count events with greater ids
+        :return: int
+        """
+        tables = [self.service.db.tables['events']]
+        if self.service.read_archive:
+            tables.append(self.service.db.tables['archive'])
+
+        count = 0
+        with self.service.db.engine.connect() as conn:
+            for table in tables:
+                query = sql.select([sql.func.count(table.c.id)])
+                query = query.where(table.c.type.in_(self.types))
+                if after_id is not None:
+                    query = query.where(table.c.id > after_id)
+                count += conn.execute(query).scalar()
+        return count
+
+    def fetch(self, after_id):
+        """
+        Fetch
+        Reads next batch of event rows after given id.
+        :param after_id: int, last id of previous batch
+        :return: list of dicts
+        """
+        query = self.service.page_query(after_id, self.batch_size, self.types)
+        with self.service.db.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(query)]
+
+    def partition(self, rows):
+        """
+        Partition
+        Splits batch of rows into per-worker lists by object id, keeping
+        id order. Events without object id are spread by event id.
+
+        :param rows: list of dicts, event rows in id order
+        :return: list of non-empty lists
+        """
+        partitions = [[] for _ in range(max(self.workers, 1))]
+        for row in rows:
+            key = row['object_id']
+            key = key if key is not None else row['id']
+            index = zlib.crc32(str(key).encode('utf-8')) % len(partitions)
+            partitions[index].append(row)
+        return [partition for partition in partitions if partition]
+
+    def run(self, from_id=None):
+        """
+        Run
+        Replays events after checkpoint, or after given id, up to the end
+        of the store. Stops at first handler failure without checkpointing
+        the failed batch.
+
+        :param from_id: int, replay events after this id, ignoring
+                        checkpoint
+        :return: int, number of events replayed
+        """
+        position = from_id
+        if position is None and self.name:
+            position = self.service.get_checkpoint(self.name)
+
+        total = self.count(position) if self.progress else None
+        replayed = 0
+
+        pool = None
+        if self.workers:
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=init_worker,
+                initargs=(
+                    self.chains,
+                    self.handler_context,
+                    self.service.codecs
+                )
+            )
+
+        try:
+            batch = self.fetch(position)
+            while batch:
+                futures = []
+                if pool:
+                    for rows in self.partition(batch):
+                        futures.append(pool.submit(replay_partition, rows))
+                else:
+                    replay_rows(
+                        batch,
+                        self.chains,
+                        self.handler_context,
+                        self.service.codecs
+                    )
+
+                # read ahead while workers replay current batch
+                last = batch[-1]['id']
+                more = len(batch) == self.batch_size
+                upcoming = self.fetch(last) if more else []
+
+                for future in futures:
+                    future.result()
+
+                replayed += len(batch)
+                if self.name:
+                    self.service.save_checkpoint(self.name, last)
+                if self.progress:
+                    self.progress(replayed, total, last)
+                batch = upcoming
+        finally:
+            if pool:
+                pool.shutdown()
+
+        return replayed
@@ -0,0 +1,94 @@
+import abc
+import json
+import pickle
+from datetime import datetime
+
+
+class Snapshot:
+    """
+    Snapshot
+    Represents state of an object at a certain event. Allows loading
+    an object by replaying only events that happened after the snapshot.
+    """
+
+    def __init__(
+        self,
+        object_id,
+        event_id,
+        state=None,
+        created=None,
+        id=None):
+        """
+        Instantiate snapshot
+        :param object_id: str, id of the object
+        :param event_id: int, id of the last event included in state
+        :param state: object state
+        :param created: datetime, creation date
+        :param id: int, snapshot id
+        """
+        self.id = id
+        self.object_id = object_id
+        self.event_id = event_id
+        self.state = state
+        self.created = created if created else datetime.utcnow()
+
+    def __repr__(self):
+        """ Returns printable representation of a snapshot """
+        repr = '<Snapshot id=[{}] object_id=[{}] event_id=[{}]>'
+        return repr.format(self.id, self.object_id, self.event_id)
+
+
+class BaseSerializer(metaclass=abc.ABCMeta):
+    """
+    Base snapshot serializer
+    Converts object state to bytes for persistence and back. Implement this
+    to store state in your own format.
+    """
+
+    @abc.abstractmethod
+    def serialize(self, state):
+        """
+        Serialize state
+        :param state: object state
+        :return: bytes
+        """
+        raise NotImplemented('Implement me in your concrete serializer')
+
+    @abc.abstractmethod
+    def deserialize(self, data):
+        """
+        Deserialize state
+        :param data: bytes
+        :return: object state
+        """
+        raise NotImplemented('Implement me in your concrete serializer')
+
+
+class JsonSerializer(BaseSerializer):
+    """
+    Json serializer
+    Default serializer, stores state as utf-8 encoded json.
+    """
+
+    def serialize(self, state):
+        """ Serialize state """
+        return json.dumps(state, ensure_ascii=False).encode('utf-8')
+
+    def deserialize(self, data):
+        """ Deserialize state """
+        return json.loads(data.decode('utf-8'))
+
+
+class PickleSerializer(BaseSerializer):
+    """
+    Pickle serializer
+    Stores arbitrary python objects. Only use with trusted databases.
+    """
+
+    def serialize(self, state):
+        """ Serialize state """
+        return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def deserialize(self, data):
+        """ Deserialize state """
+        return pickle.loads(data)
@@ -0,0 +1,332 @@
+import time
+from sqlalchemy import sql
+from shiftevent.event import Event
+from shiftevent import exceptions as x
+
+
+class Subscription:
+    """
+    Subscription
+    Follows the event store from a persisted checkpoint, handing new events
+    to a callback in id order. Events are read in batches and checkpoint
+    is committed every few events rather than after each one, so after a
+    crash some events may be delivered again: callbacks must be idempotent
+    (at-least-once delivery). When there are no new events polling backs
+    off exponentially up to max interval and resets as soon as events
+    arrive.
+
+    Ids are assigned when events are written but become visible when their
+    transactions commit, so on MySQL and PostgreSQL an event can show up
+    after events with higher ids were delivered. Missing ids within the
+    last batch size of ids in the store are therefore remembered as gaps
+    and re-read on every poll for gap timeout seconds, late events are
+    delivered as soon as they appear, out of id order. Checkpoint does not
+    move past an open gap. Older missing ids are taken for deleted or
+    archived events, and at most batch size gaps are kept, the newest
+    ones. Events committed later than gap timeout after the gap was seen,
+    or further than batch size ids behind the head, are skipped, so set
+    gap timeout above your longest write transaction. Gaps left by rolled
+    back transactions just expire.
+    """
+
+    # max id ranges open gaps are re-read in
+    GAP_RANGES = 10
+
+    def __init__(
+        self,
+        service,
+        name,
+        callback,
+        types=None,
+        batch_size=100,
+        checkpoint_every=100,
+        min_interval=0.1,
+        max_interval=5.0,
+        backoff=2.0,
+        gap_timeout=10.0):
+        """
+        Initialize subscription
+        :param service: shiftevent.event_service.EventService
+        :param name: str, unique subscription name to checkpoint under
+        :param callback: callable, accepts a single event
+        :param types: str or list, only deliver events of these types
+        :param batch_size: int, number of events to read per query
+        :param checkpoint_every: int, commit checkpoint after this many
+                                 events delivered
+        :param min_interval: float, seconds to wait when first idle
+        :param max_interval: float, max seconds to wait between polls
+        :param backoff: float, idle interval multiplier
+        :param gap_timeout: float, seconds to wait for events missing
+                            between delivered ids, 0 to not wait
+        """
+        if batch_size < 1 or checkpoint_every < 1:
+            msg = 'Batch size and checkpoint frequency must be positive'
+            raise x.ConfigurationException(msg)
+        if min_interval <= 0 or max_interval < min_interval or backoff < 1:
+            msg = 'Invalid subscription polling intervals'
+            raise x.ConfigurationException(msg)
+        if gap_timeout < 0:
+            msg = 'Gap timeout can not be negative'
+            raise x.ConfigurationException(msg)
+
+        self.service = service
+        self.name = name
+        self.callback = callback
+        self.types = types
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.gap_timeout = gap_timeout
+
+        self.interval = min_interval
+        self.position = self.get_checkpoint()
+        self.committed = self.position
+        self.gaps = dict()
+
+    def __repr__(self):
+        """ Returns printable representation of a subscription """
+        repr = '<Subscription name=[{}] position=[{}]>'
+        return repr.format(self.name, self.position)
+
+    @property
+    def pending(self):
+        """
+        Pending
+        Returns whether there are delivered events not yet checkpointed
+        :return: bool
+        """
+        return self.checkpoint != self.committed
+
+    @property
+    def checkpoint(self):
+        """
+        Checkpoint
+        Returns position safe to resume from: last delivered id, or the
+        id before the first open gap.
+        :return: int or None
+        """
+        if not self.gaps:
+            return self.position
+        return min(self.position or 0, min(self.gaps) - 1)
+
+    def get_checkpoint(self):
+        """
+        Get checkpoint
+        Returns id of the last event committed for this subscription.
+        :return: int or None
+        """
+        return self.service.get_checkpoint(self.name)
+
+    def commit(self):
+        """
+        Commit
+        Persists current position as subscription checkpoint.
+        :return: None
+        """
+        if not self.pending:
+            return
+
+        checkpoint = self.checkpoint
+        self.service.save_checkpoint(self.name, checkpoint)
+        self.committed = checkpoint
+
+    def fetch(self, query):
+        """
+        Fetch
+        Executes a query and returns all rows.
+        :param query: sqlalchemy.sql.Select
+        :return: list
+        """
+        with self.service.db.engine.connect() as conn:
+            return conn.execute(query).fetchall()
+
+    def find_gaps(self, rows, now):
+        """
+        Find gaps
+        Remembers ids missing before and between polled events, looking
+        only at last batch size of ids in the store. When filtering by
+        type, ids of other events are looked up so that they are not taken
+        for gaps. Keeps the newest gaps if there are too many.
+
+        :param rows: list, polled event rows
+        :param now: float, monotonic time of the poll
+        :return: None
+        """
+        previous = self.position or 0
+        ids = [row['id'] for row in rows]
+        if ids[-1] - previous == len(ids):
+            return
+
+        events = self.service.db.tables['events']
+        head = self.fetch(sql.select([sql.func.max(events.c.id)]))[0][0]
+        start = max(previous, (head or 0) - self.batch_size)
+        if ids[-1] <= start:
+            return
+
+        if self.types:
+            query = sql.select([events.c.id])
+            query = query.where(events.c.id > start)
+            query = query.where(events.c.id <= ids[-1])
+            ids = [row['id'] for row in self.fetch(query)]
+
+        missing = set(range(start + 1, ids[-1])).difference(ids)
+        for id in missing:
+            self.gaps.setdefault(id, now)
+        if len(self.gaps) > self.batch_size:
+            newest = sorted(self.gaps)[-self.batch_size:]
+            self.gaps = {id: self.gaps[id] for id in newest}
+
+    def gap_ranges(self):
+        """
+        Gap ranges
+        Merges open gaps into a few id ranges, joining closest ranges
+        until there are at most GAP_RANGES of them.
+        :return: list of [first id, last id] lists
+        """
+        ids = sorted(self.gaps)
+        ranges = [[ids[0], ids[0]]]
+        for id in ids[1:]:
+            if id == ranges[-1][1] + 1:
+                ranges[-1][1] = id
+            else:
+                ranges.append([id, id])
+
+        while len(ranges) > self.GAP_RANGES:
+            i = min(
+                range(len(ranges) - 1),
+                key=lambda i: ranges[i + 1][0] - ranges[i][1]
+            )
+            ranges[i][1] = ranges.pop(i + 1)[1]
+        return ranges
+
+    def gap_query(self):
+        """
+        Gap query
+        Builds a query selecting events in id ranges of open gaps. Ranges
+        may include delivered events, filter them out by id.
+        :return: sqlalchemy.sql.Select
+        """
+        events = self.service.db.tables['events']
+        query = events.select().where(sql.or_(*[
+            events.c.id.between(first, last)
+            for first, last in self.gap_ranges()
+        ]))
+        types = self.types
+        if isinstance(types, str):
+            types = [types]
+        if types:
+            query = query.where(events.c.type.in_(types))
+        return query.order_by(events.c.id)
+
+    def poll(self):
+        """
+        Poll
+        Delivers events that appeared in open gaps, then reads one batch
+        of events after current position and delivers them to callback.
+        Commits checkpoint every so many events, and before re-raising if
+        callback fails, so that delivered events are not delivered again.
+
+        :return: int, number of events delivered
+        """
+        now = time.monotonic()
+        self.gaps = {
+            id: seen for id, seen in self.gaps.items()
+            if now - seen < self.gap_timeout
+        }
+        late = []
+        if self.gaps:
+            late = self.fetch(self.gap_query())
+            late = [row for row in late if row['id'] in self.gaps]
+        rows = self.fetch(self.service.page_query(
+            self.position,
+            self.batch_size,
+            self.types
+        ))
+        if rows and self.gap_timeout:
+            self.find_gaps(rows, now)
+
+        codecs = self.service.codecs
+        delivered = 0
+        try:
+            for row in late + rows:
+                self.callback(Event.from_db(row, codecs))
+                if row['id'] in self.gaps:
+                    del self.gaps[row['id']]
+                else:
+                    self.position = row['id']
+                delivered += 1
+                if delivered % self.checkpoint_every == 0:
+                    self.commit()
+        except Exception:
+            position = self.position or 0
+            self.gaps = {
+                id: seen for id, seen in self.gaps.items() if id < position
+            }
+            self.commit()
+            raise
+
+        return delivered
+
+    def catch_up(self):
+        """
+        Catch up
+        Delivers all events up to the end of the store and commits
+        checkpoint.
+
+        :return: int, number of events delivered
+        """
+        delivered = 0
+        while True:
+            polled = self.poll()
+            delivered += polled
+            if polled < self.batch_size:
+                break
+
+        self.commit()
+        return delivered
+
+    def next_interval(self, delivered):
+        """
+        Next interval
+        Returns seconds to wait before next poll: none while there are
+        events to catch up on, growing exponentially while idle.
+
+        :param delivered: int, number of events delivered by last poll
+        :return: float
+        """
+        if delivered >= self.batch_size:
+            self.interval = self.min_interval
+            return 0
+        if delivered:
+            self.interval = self.min_interval
+            return self.interval
+
+        interval = self.interval
+        self.interval = min(self.interval * self.backoff, self.max_interval)
+        return interval
+
+    def run(self, stop=None):
+        """
+        Run
+        Follows the store until stopped. Commits checkpoint whenever it
+        goes idle and on exit.
+
+        :param stop: threading.Event, set it to stop the subscription
+        :return: None
+        """
+        try:
+            while not (stop and stop.is_set()):
+                delivered = self.poll()
+                interval = self.next_interval(delivered)
+                if not interval:
+                    continue
+
+                self.commit()
+                if stop:
+                    stop.wait(interval)
+                else:
+                    time.sleep(interval)
+        finally:
+            self.commit()
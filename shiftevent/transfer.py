@@ -0,0 +1,440 @@
+import gzip
+import io
+import json
+import os
+import time
+from datetime import datetime
+from shiftevent import exceptions as x
+from shiftevent.codecs import load
+from sqlalchemy import sql
+
+# supported compressions
+COMPRESSIONS = ('gzip', 'zstd', 'none')
+
+# compression detected from file extension
+EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+}
+
+
+def get_compression(path, compression=None):
+    """
+    Get compression
+    Validates compression or detects it from file extension.
+    :param path: str, file path
+    :param compression: str, one of COMPRESSIONS, detect if None
+    :return: str
+    """
+    if compression is None:
+        extension = os.path.splitext(path)[1].lower()
+        compression = EXTENSIONS.get(extension, 'none')
+
+    if compression not in COMPRESSIONS:
+        msg = 'Compression must be one of {}, got [{}]'
+        raise x.ConfigurationException(msg.format(COMPRESSIONS, compression))
+
+    if compression == 'zstd' and load('zstandard') is None:
+        msg = 'Zstd compression requires zstandard to be installed'
+        raise x.ConfigurationException(msg)
+
+    return compression
+
+
+def read_lines(path, compression=None):
+    """
+    Read lines
+    Returns a generator over lines of a possibly compressed file. Files
+    made of several concatenated gzip members or zstd frames are read
+    as a whole.
+    :param path: str, file path
+    :param compression: str, one of COMPRESSIONS, detect if None
+    :return: generator of str
+    """
+    compression = get_compression(path, compression)
+    with open(path, 'rb') as raw:
+        if compression == 'gzip':
+            stream = gzip.GzipFile(fileobj=raw)
+        elif compression == 'zstd':
+            decompressor = load('zstandard').ZstdDecompressor()
+            stream = decompressor.stream_reader(raw, read_across_frames=True)
+            stream = io.BufferedReader(stream)
+        else:
+            stream = raw
+
+        for line in io.TextIOWrapper(stream, encoding='utf-8'):
+            if line.strip():
+                yield line
+
+
+def throughput(events, started, path):
+    """
+    Throughput
+    Returns transfer statistics.
+    :param events: int, events transferred
+    :param started: float, performance counter when transfer started
+    :param path: str, file transferred to or from
+    :return: dict
+    """
+    seconds = time.perf_counter() - started
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    return dict(
+        events=events,
+        seconds=seconds,
+        bytes=size,
+        events_per_sec=events / seconds if seconds else 0.0,
+        bytes_per_sec=size / seconds if seconds else 0.0,
+    )
+
+
+class Exporter:
+    """
+    Exporter
+    Streams event store to a newline-delimited json file, one event per
+    line in id order, with payloads decoded so that the file does not
+    depend on codecs of the source store. Archived events are exported
+    along with the store, whether or not the service reads the archive,
+    so that the file holds complete history. Events are read with keyset
+    pagination, and every page is written as a separate gzip member or
+    zstd frame, so memory use stays constant and the file stays valid
+    after each page.
+
+    Progress is saved to a checkpoint file next to the export after every
+    page. An interrupted export can be resumed: the file is truncated to
+    the last complete page and export continues after its last event.
+    """
+
+    def __init__(self, service, batch_size=1000):
+        """
+        Initialize exporter
+        :param service: shiftevent.event_service.EventService
+        :param batch_size: int, number of events per page
+        """
+        if batch_size < 1:
+            msg = 'Batch size must be a positive integer, got {}'
+            raise x.ConfigurationException(msg.format(batch_size))
+
+        self.service = service
+        self.batch_size = batch_size
+
+    def __repr__(self):
+        """ Returns printable representation of an exporter """
+        return '<Exporter batch_size=[{}]>'.format(self.batch_size)
+
+    def line(self, row):
+        """
+        Line
+        Serializes event row to a json line. Missing payloads are exported
+        as null.
+        :param row: sqlalchemy row, event data
+        :return: str
+        """
+        data = dict(
+            id=row['id'],
+            created=row['created'].isoformat(),
+            type=row['type'],
+            author=row['author'],
+            object_id=row['object_id'],
+            version=row['version'],
+            payload=self.decode(row['payload']),
+            payload_rollback=self.decode(row['payload_rollback']),
+        )
+        return json.dumps(data, separators=(',', ':')) + '\n'
+
+    def decode(self, data):
+        """
+        Decode
+        Decodes stored payload, payloads left empty stay none.
+        :param data: str or bytes, encoded payload
+        :return: dict or None
+        """
+        if data is None:
+            return None
+        return self.service.codecs.decode(data)
+
+    def has_archive(self):
+        """
+        Has archive
+        Checks whether archive table exists in the source database.
+        :return: bool
+        """
+        engine = self.service.db.engine
+        name = self.service.db.tables['archive'].name
+        with engine.connect() as conn:
+            return engine.dialect.has_table(conn, name)
+
+    def query(self, after_id, types=None, archive=True):
+        """
+        Query
+        Builds a query selecting next page of events from event store and
+        archive.
+        :param after_id: int, only select events with greater ids
+        :param types: str or list, only select events of these types
+        :param archive: bool, include archived events
+        :return: sqlalchemy.sql.Select
+        """
+        tables = self.service.db.tables
+        args = (after_id, self.batch_size, types)
+        query = self.service.page_query(*args, table=tables['events'])
+        if not archive:
+            return query
+
+        archive_query = self.service.page_query(*args, table=tables['archive'])
+        return self.service.archive_union(
+            query,
+            archive_query,
+            False,
+            self.batch_size
+        )
+
+    def compress(self, data, compression):
+        """
+        Compress
+        Compresses a page of lines into a self-contained gzip member or
+        zstd frame.
+        :param data: bytes, encoded lines
+        :param compression: str, one of COMPRESSIONS
+        :return: bytes
+        """
+        if compression == 'gzip':
+            return gzip.compress(data)
+        if compression == 'zstd':
+            return load('zstandard').ZstdCompressor().compress(data)
+        return data
+
+    def load_checkpoint(self, path):
+        """
+        Load checkpoint
+        Returns progress of an interrupted export.
+        :param path: str, checkpoint file path
+        :return: dict or None
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path) as file:
+            return json.load(file)
+
+    def save_checkpoint(self, path, checkpoint):
+        """
+        Save checkpoint
+        Atomically writes export progress.
+        :param path: str, checkpoint file path
+        :param checkpoint: dict, last exported id and file offset
+        :return: None
+        """
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as file:
+            json.dump(checkpoint, file)
+        os.replace(tmp, path)
+
+    def export(self, path, compression=None, types=None, resume=False,
+               progress=None):
+        """
+        Export
+        Writes events to a file, or resumes an interrupted export to it.
+
+        :param path: str, file to export to
+        :param compression: str, one of COMPRESSIONS, detect from extension
+                            if None
+        :param types: str or list, only export events of these types
+        :param resume: bool, resume interrupted export
+        :param progress: callable, accepts number of events exported so
+                         far and last exported id
+        :return: dict, throughput statistics
+        """
+        compression = get_compression(path, compression)
+        checkpoint_path = path + '.checkpoint'
+        checkpoint = dict(last_id=None, offset=0, events=0)
+        if resume:
+            saved = self.load_checkpoint(checkpoint_path)
+            if saved is None and os.path.exists(path):
+                msg = 'Nothing to resume: export to {} has completed'
+                raise x.EventError(msg.format(path))
+            checkpoint = saved or checkpoint
+
+        started = time.perf_counter()
+        archive = self.has_archive()
+        exported = 0
+        mode = 'r+b' if checkpoint['offset'] else 'wb'
+        with open(path, mode) as file:
+            file.seek(checkpoint['offset'])
+            file.truncate()
+            while True:
+                query = self.query(checkpoint['last_id'], types, archive)
+                with self.service.db.engine.connect() as conn:
+                    rows = conn.execute(query).fetchall()
+                if not rows:
+                    break
+
+                data = ''.join(self.line(row) for row in rows)
+                data = self.compress(data.encode('utf-8'), compression)
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+
+                exported += len(rows)
+                checkpoint = dict(
+                    last_id=rows[-1]['id'],
+                    offset=checkpoint['offset'] + len(data),
+                    events=checkpoint['events'] + len(rows),
+                )
+                self.save_checkpoint(checkpoint_path, checkpoint)
+                if progress:
+                    progress(checkpoint['events'], checkpoint['last_id'])
+                if len(rows) < self.batch_size:
+                    break
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        stats = throughput(exported, started, path)
+        stats['total'] = checkpoint['events']
+        stats['last_id'] = checkpoint['last_id']
+        return stats
+
+
+class Importer:
+    """
+    Importer
+    Bulk-loads events exported by Exporter into event store, preserving
+    their ids and versions. Events are inserted in large batches, each in
+    its own transaction with a single executemany, and payloads are
+    re-encoded with codecs of the target store. Handlers are not run and
+    events are not validated, the export is trusted to come from another
+    event store. Archived events are loaded into the store as well, run
+    the archiver afterwards to move them back to archive.
+
+    As ids are preserved and files are ordered by id, an interrupted
+    import is resumed by skipping events already present in the store.
+    """
+
+    def __init__(self, service, batch_size=5000):
+        """
+        Initialize importer
+        :param service: shiftevent.event_service.EventService
+        :param batch_size: int, number of events per transaction
+        """
+        if batch_size < 1:
+            msg = 'Batch size must be a positive integer, got {}'
+            raise x.ConfigurationException(msg.format(batch_size))
+
+        self.service = service
+        self.batch_size = batch_size
+
+    def __repr__(self):
+        """ Returns printable representation of an importer """
+        return '<Importer batch_size=[{}]>'.format(self.batch_size)
+
+    def row(self, line):
+        """
+        Row
+        Parses json line into event row to insert.
+        :param line: str, json line
+        :return: dict
+        """
+        codecs = self.service.codecs
+        data = json.loads(line)
+        created = data['created']
+        try:
+            created = datetime.strptime(created, '%Y-%m-%dT%H:%M:%S.%f')
+        except ValueError:
+            created = datetime.strptime(created, '%Y-%m-%dT%H:%M:%S')
+
+        return dict(
+            id=data['id'],
+            created=created,
+            type=data['type'],
+            author=data['author'],
+            object_id=data['object_id'],
+            version=data['version'],
+            payload=codecs.encode(data['payload'] or {}),
+            payload_rollback=codecs.encode(data['payload_rollback'] or {}),
+        )
+
+    def last_id(self):
+        """
+        Last id
+        Returns id of the last event in the store.
+        :return: int or None
+        """
+        events = self.service.db.tables['events']
+        query = sql.select([sql.func.max(events.c.id)])
+        with self.service.db.engine.connect() as conn:
+            return conn.execute(query).scalar()
+
+    def insert(self, rows):
+        """
+        Insert
+        Inserts a batch of rows with preserved ids in one transaction.
+        :param rows: list of dicts
+        :return: None
+        """
+        events = self.service.db.tables['events']
+        with self.service.db.engine.begin() as conn:
+            conn.execute(events.insert(), rows)
+
+    def reset_sequence(self):
+        """
+        Reset sequence
+        Moves id sequence past imported ids on postgresql, where inserting
+        explicit ids does not advance it. Other backends advance their
+        auto increment counters on their own.
+        :return: None
+        """
+        events = self.service.db.tables['events']
+        with self.service.db.engine.begin() as conn:
+            if conn.dialect.name != 'postgresql':
+                return
+            query = 'SELECT setval(pg_get_serial_sequence(:table, \'id\'), ' \
+                    'COALESCE(MAX(id), 0) + 1, false) FROM {}'
+            conn.execute(
+                sql.text(query.format(events.name)),
+                table=events.name
+            )
+
+    def import_events(self, path, compression=None, resume=False,
+                      progress=None):
+        """
+        Import events
+        Loads events from a file, or resumes an interrupted import of it.
+
+        :param path: str, file to import from
+        :param compression: str, one of COMPRESSIONS, detect from extension
+                            if None
+        :param resume: bool, skip events already in the store
+        :param progress: callable, accepts number of events imported so
+                         far and last imported id
+        :return: dict, throughput statistics
+        """
+        skip_id = self.last_id() if resume else None
+        started = time.perf_counter()
+        imported = 0
+        last_id = skip_id
+        batch = []
+        for line in read_lines(path, compression):
+            row = self.row(line)
+            if skip_id is not None and row['id'] <= skip_id:
+                continue
+
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.insert(batch)
+                imported += len(batch)
+                last_id = batch[-1]['id']
+                batch = []
+                if progress:
+                    progress(imported, last_id)
+
+        if batch:
+            self.insert(batch)
+            imported += len(batch)
+            last_id = batch[-1]['id']
+            if progress:
+                progress(imported, last_id)
+
+        self.reset_sequence()
+        stats = throughput(imported, started, path)
+        stats['last_id'] = last_id
+        return stats
@@ -0,0 +1,116 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.dialects import mysql, postgresql
+from shiftevent import exceptions as x
+from shiftevent.archive import Archiver
+from shiftevent.db_tables import define_tables
+from shiftevent.event import Event
+from shiftevent.event_service import EventService
+
+
+@attr('event', 'archive')
+class ArchiverTest(BaseTestCase):
+
+    start = datetime(2020, 1, 1)
+
+    def populate(self, service):
+        """ Write 10 events a day apart for two objects and no object """
+        for i in range(10):
+            service.save_event(Event(
+                type='DUMMY_EVENT',
+                author=1,
+                object_id=[1, 2, None][i % 3],
+                created=self.start + timedelta(days=i),
+                payload={'i': i}
+            ))
+
+    def archived(self):
+        """ Get ids of archived events """
+        archive = self.db.tables['archive']
+        with self.db.engine.connect() as conn:
+            rows = conn.execute(archive.select().order_by(archive.c.id))
+            return [row['id'] for row in rows]
+
+    def test_instantiating_archiver(self):
+        """ Instantiating archiver """
+        archiver = Archiver(EventService(db=self.db))
+        self.assertIsInstance(archiver, Archiver)
+        self.assertFalse(archiver.partitioned)
+        with self.assertRaises(x.ConfigurationException):
+            Archiver(EventService(db=self.db), batch_size=0)
+
+    def test_archive_old_events_in_batches(self):
+        """ Archiving events older than cutoff in batches """
+        service = EventService(db=self.db)
+        self.populate(service)
+        progress = []
+        archiver = Archiver(service, batch_size=2)
+        cutoff = self.start + timedelta(days=8)
+        archived = archiver.archive(cutoff, progress=progress.append)
+        self.assertEquals(7, archived)
+        self.assertEquals([2, 4, 6, 7], progress)
+
+        # latest event of object 2 stays in store
+        self.assertEquals([1, 2, 3, 4, 5, 6, 7], self.archived())
+        self.assertEquals([8, 9, 10], [e.id for e in service.iter_events()])
+        self.assertEquals(0, archiver.archive(cutoff))
+
+    def test_archive_limited_number_of_batches(self):
+        """ Archiving limited number of batches """
+        service = EventService(db=self.db)
+        self.populate(service)
+        archiver = Archiver(service, batch_size=2)
+        cutoff = self.start + timedelta(days=8)
+        self.assertEquals(4, archiver.archive(cutoff, max_batches=2))
+        self.assertEquals(4, len(self.archived()))
+
+    def test_versions_continue_after_archiving(self):
+        """ Object versions continue after archiving """
+        service = EventService(db=self.db)
+        self.populate(service)
+        Archiver(service).archive(self.start + timedelta(days=30))
+        event = service.event(type='DUMMY_EVENT', author=1, object_id=1)
+        self.assertEquals(5, event.version)
+
+    def test_read_archived_events(self):
+        """ Reading archived events transparently """
+        service = EventService(db=self.db)
+        self.populate(service)
+        Archiver(service).archive(self.start + timedelta(days=8))
+        self.assertIsNone(service.get_event(1))
+
+        service = EventService(db=self.db, read_archive=True)
+        self.assertEquals({'i': 0}, service.get_event(1).payload)
+        events = service.get_events([10, 1, 123, 4])
+        self.assertEquals([10, 1, None, 4], [e and e.id for e in events])
+
+        stream = service.get_stream(1)
+        self.assertEquals([1, 4, 7, 10], [e.id for e in stream])
+        stream = service.get_stream(1, reverse=True, limit=3)
+        self.assertEquals([10, 7, 4], [e.id for e in stream])
+
+        ids = [e.id for e in service.iter_events(batch_size=3)]
+        self.assertEquals(list(range(1, 11)), ids)
+
+    def test_declare_native_partitioning(self):
+        """ Declaring native archive partitioning per dialect """
+        dialects = dict(
+            postgresql=(postgresql.dialect(), 'PARTITION BY RANGE (created)'),
+            mysql=(mysql.dialect(), 'PARTITION BY HASH (YEAR(created))'),
+        )
+        for name, (dialect, partitioning) in dialects.items():
+            tables = define_tables(
+                MetaData(),
+                dialect=name,
+                partition_archive=True
+            )
+            ddl = str(CreateTable(tables['archive']).compile(dialect=dialect))
+            self.assertIn(partitioning, ddl)
+            self.assertIn('PRIMARY KEY (id, created)', ddl)
+
+            ddl = str(CreateTable(tables['events']).compile(dialect=dialect))
+            self.assertNotIn('PARTITION', ddl)
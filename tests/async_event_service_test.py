@@ -0,0 +1,183 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+from unittest import skipIf
+
+import asyncio
+from shiftevent import exceptions as x
+from shiftevent.db import Db
+from shiftevent.event import Event
+from shiftevent.handlers import BaseHandler
+from shiftevent.handlers import Dummy1
+from shiftevent.async_event_service import AsyncEventService
+from shiftevent.event_service import EventService
+
+try:
+    import aiosqlite
+    from sqlalchemy.ext import asyncio as sa_asyncio
+except ImportError:
+    sa_asyncio = None
+
+
+class AsyncHandler(BaseHandler):
+    """ Async handler used for testing """
+    EVENT_TYPES = ('DUMMY_EVENT',)
+
+    async def handle(self, event):
+        await asyncio.sleep(0)
+        payload = event.payload
+        payload['async_handler'] = 'processed'
+        event.payload = payload
+        return event
+
+    async def rollback(self, event):
+        await asyncio.sleep(0)
+        payload = event.payload
+        payload['async_handler'] = 'rolled back'
+        event.payload = payload
+        return event
+
+
+class FailingHandler(Dummy1):
+    """ Handler that always fails """
+    def handle(self, event):
+        raise Exception('Handler exception')
+
+
+@attr('event', 'service', 'async')
+@skipIf(not sa_asyncio, 'requires SQLAlchemy 1.4 and aiosqlite')
+class AsyncEventServiceTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = Db(
+            self.db_url,
+            async_db_url='sqlite+aiosqlite:///{}'.format(self.db_path)
+        )
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.run_async(self.db.async_engine.dispose())
+        self.loop.close()
+        super().tearDown()
+
+    def run_async(self, coroutine):
+        """ Run coroutine to completion """
+        return self.loop.run_until_complete(coroutine)
+
+    def test_create_async_event_service(self):
+        """ Creating async event service """
+        service = AsyncEventService(db=self.db)
+        self.assertIsInstance(service, AsyncEventService)
+
+    def test_raise_when_async_engine_not_configured(self):
+        """ Raise when async engine is not configured """
+        service = AsyncEventService(db=Db(self.db_url))
+        with self.assertRaises(x.ConfigurationException):
+            self.run_async(service.get_event(1))
+
+    def test_sync_service_rejects_async_handlers(self):
+        """ Sync event service rejects async handlers """
+        with self.assertRaises(x.HandlerInstantiationError) as cm:
+            EventService(db=self.db, handlers=dict(DUMMY_EVENT=[AsyncHandler]))
+        self.assertIn('AsyncEventService', str(cm.exception))
+
+    def test_create_and_get_event(self):
+        """ Creating and getting events """
+        service = AsyncEventService(db=self.db)
+        event = self.run_async(service.event(
+            type='DUMMY_EVENT',
+            object_id=123,
+            author=456,
+            payload={'what': 'IS THIS'},
+        ))
+        self.assertEquals(1, event.id)
+        self.assertEquals(1, event.version)
+
+        found = self.run_async(service.get_event(event.id))
+        self.assertIsInstance(found, Event)
+        self.assertEquals({'what': 'IS THIS'}, found.payload)
+        self.assertIsNone(self.run_async(service.get_event(123)))
+
+    def test_get_events_by_ids(self):
+        """ Getting multiple events by ids in given order """
+        service = AsyncEventService(db=self.db)
+        for i in range(3):
+            self.run_async(service.event(type='DUMMY_EVENT', author=1))
+
+        events = self.run_async(service.get_events([3, 123, 1]))
+        self.assertEquals(3, events[0].id)
+        self.assertIsNone(events[1])
+        self.assertEquals(1, events[2].id)
+
+    def test_raise_on_version_conflict(self):
+        """ Raise concurrency error when object version changed """
+        service = AsyncEventService(db=self.db)
+        event = dict(type='DUMMY_EVENT', author=1, object_id=123)
+        self.run_async(service.event(expected_version=0, **event))
+        with self.assertRaises(x.ConcurrencyError):
+            self.run_async(service.event(expected_version=0, **event))
+
+    def test_concurrent_writes(self):
+        """ Writing events concurrently """
+        service = AsyncEventService(db=self.db)
+
+        async def write():
+            writes = [service.event(
+                type='DUMMY_EVENT',
+                author=1,
+                object_id=i
+            ) for i in range(50)]
+            return await asyncio.gather(*writes)
+
+        events = self.run_async(write())
+        self.assertEquals(50, len(set(e.id for e in events)))
+
+    def test_emit_runs_sync_and_async_handlers(self):
+        """ Emitting event runs sync and async handlers """
+        service = AsyncEventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[Dummy1, AsyncHandler])
+        )
+        event = self.run_async(service.event(
+            type='DUMMY_EVENT',
+            author=1,
+            payload={'a': 'b'}
+        ))
+        event = self.run_async(service.emit(event))
+        self.assertEquals('processed', event.payload['dummy_handler1'])
+        self.assertEquals('processed', event.payload['async_handler'])
+
+    def test_rollback_handlers_on_exception(self):
+        """ Rolling back handlers and dropping event on failure """
+        service = AsyncEventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[AsyncHandler, FailingHandler])
+        )
+        event = self.run_async(service.event(
+            type='DUMMY_EVENT',
+            author=1,
+            payload={'a': 'b'}
+        ))
+        with self.assertRaises(Exception) as cm:
+            self.run_async(service.emit(event))
+        self.assertIn('Handler exception', str(cm.exception))
+        self.assertEquals('rolled back', event.payload['async_handler'])
+        self.assertIsNone(self.run_async(service.get_event(event.id)))
+
+    def test_get_stream_and_iterate_events(self):
+        """ Getting object streams and iterating over events """
+        service = AsyncEventService(db=self.db)
+        for i in range(10):
+            self.run_async(service.event(
+                type='DUMMY_EVENT',
+                author=1,
+                object_id='one' if i % 2 else 'two'
+            ))
+
+        stream = service.get_stream('one', reverse=True, limit=2)
+        stream = self.run_async(stream)
+        self.assertEquals([10, 8], [e.id for e in stream])
+
+        async def collect():
+            return [e.id async for e in service.iter_events(batch_size=3)]
+        self.assertEquals(list(range(1, 11)), self.run_async(collect()))
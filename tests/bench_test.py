@@ -0,0 +1,38 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+from shiftevent import bench
+
+
+@attr('bench')
+class BenchTest(BaseTestCase):
+
+    def test_summarize_durations(self):
+        """ Summarizing durations with percentiles """
+        stats = bench.summarize([i / 1000000 for i in range(100, 0, -1)])
+        self.assertEquals(100, stats['count'])
+        self.assertAlmostEqual(50, stats['p50'])
+        self.assertAlmostEqual(90, stats['p90'])
+        self.assertAlmostEqual(99, stats['p99'])
+        self.assertAlmostEqual(100, stats['max'])
+        self.assertAlmostEqual(50.5, stats['mean'])
+
+    def test_run_benchmarks(self):
+        """ Running benchmark suite """
+        results = bench.run(['sqlite-memory'], count=20, handlers=2)
+        self.assertEquals(20, results['meta']['events'])
+        stats = results['results']['sqlite-memory']
+        self.assertEquals(set(bench.BENCHMARKS), set(stats.keys()))
+        for name in bench.BENCHMARKS:
+            self.assertEquals(20, stats[name]['count'])
+            self.assertGreater(stats[name]['ops_per_sec'], 0)
+
+    def test_compare_with_baseline(self):
+        """ Finding regressions against baseline """
+        def results(ops):
+            return dict(results=dict(db=dict(append=dict(ops_per_sec=ops))))
+
+        self.assertEquals([], bench.compare(results(95), results(100)))
+        regressions = bench.compare(results(80), results(100))
+        self.assertEquals([('db', 'append', 100, 80)], regressions)
+        self.assertEquals([], bench.compare(results(80), dict()))
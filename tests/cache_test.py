@@ -0,0 +1,83 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+from shiftevent import exceptions as x
+from shiftevent.cache import EventCache
+
+
+@attr('event', 'cache')
+class EventCacheTest(BaseTestCase):
+
+    def row(self, id, payload='{}'):
+        """ Create event row """
+        return dict(id=id, type='DUMMY_EVENT', payload=payload)
+
+    def test_instantiating_cache(self):
+        """ Instantiating event cache """
+        cache = EventCache()
+        self.assertIsInstance(cache, EventCache)
+        self.assertEquals(0, len(cache))
+
+    def test_raise_without_bounds(self):
+        """ Raise when cache is not bounded """
+        with self.assertRaises(x.ConfigurationException):
+            EventCache(max_size=None)
+
+    def test_put_and_get_rows(self):
+        """ Putting and getting cached rows """
+        cache = EventCache()
+        cache.put(1, self.row(1))
+        self.assertIn(1, cache)
+        self.assertEquals(self.row(1), cache.get(1))
+        self.assertIsNone(cache.get(2))
+
+    def test_evict_least_recently_used_by_size(self):
+        """ Evicting least recently used rows over max size """
+        cache = EventCache(max_size=2)
+        cache.put(1, self.row(1))
+        cache.put(2, self.row(2))
+        cache.get(1)
+        cache.put(3, self.row(3))
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertIn(3, cache)
+        self.assertEquals(1, cache.stats()['evictions'])
+
+    def test_evict_by_memory(self):
+        """ Evicting rows over max memory """
+        size = EventCache().measure(self.row(1, 'x' * 1000))
+        cache = EventCache(max_size=None, max_bytes=size * 2)
+        for id in range(1, 4):
+            cache.put(id, self.row(id, 'x' * 1000))
+        self.assertEquals(2, len(cache))
+        self.assertNotIn(1, cache)
+        self.assertEquals(size * 2, cache.stats()['bytes'])
+
+        cache.put(4, self.row(4, 'x' * size * 2))
+        self.assertNotIn(4, cache)
+
+    def test_invalidate_and_clear(self):
+        """ Invalidating and clearing cached rows """
+        cache = EventCache()
+        cache.put(1, self.row(1))
+        cache.put(2, self.row(2))
+        cache.invalidate(1)
+        cache.invalidate(123)
+        self.assertNotIn(1, cache)
+        cache.clear()
+        self.assertEquals(0, len(cache))
+        self.assertEquals(0, cache.stats()['bytes'])
+
+    def test_hit_and_miss_stats(self):
+        """ Collecting hit and miss statistics """
+        cache = EventCache()
+        cache.put(1, self.row(1))
+        cache.get(1)
+        cache.get(1)
+        cache.get(2)
+        cache.get(1)
+        stats = cache.stats()
+        self.assertEquals(3, stats['hits'])
+        self.assertEquals(1, stats['misses'])
+        self.assertEquals(0.75, stats['hit_rate'])
+        self.assertEquals(1, stats['size'])
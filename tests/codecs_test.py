@@ -0,0 +1,208 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+from unittest import skipIf
+
+from shiftevent import codecs
+from shiftevent.codecs import CodecRegistry
+from shiftevent.codecs import BaseCodec
+from shiftevent.codecs import JsonCodec
+from shiftevent import exceptions as x
+import json
+import pickle
+
+
+class ReverseCodec(BaseCodec):
+    """ Custom codec used for testing """
+    name = 'reverse'
+    header = 'rev'
+
+    def encode(self, payload):
+        return json.dumps(payload)[::-1]
+
+    def decode(self, data):
+        return json.loads(data[::-1])
+
+
+@attr('codecs')
+class CodecsTest(BaseTestCase):
+
+    payload = dict(body='I am the payload 😂', items=[1, 2, 3])
+
+    def test_instantiating_registry(self):
+        """ Instantiating codec registry """
+        registry = CodecRegistry()
+        self.assertIsInstance(registry, CodecRegistry)
+        self.assertIn('json', registry.codecs)
+
+    def test_default_codec_is_standard_json(self):
+        """ Registry defaults to standard library json """
+        registry = CodecRegistry()
+        self.assertIsInstance(registry.default, JsonCodec)
+        self.assertIsInstance(registry.json, JsonCodec)
+
+    def test_default_codec_keeps_json_behaviour(self):
+        """ Default codec encodes non-string keys and big integers """
+        registry = CodecRegistry()
+        self.assertEquals('{"1": "a"}', registry.encode({1: 'a'}))
+        big = {'big': 123456789012345678901234567890}
+        self.assertEquals(big, registry.decode(registry.encode(big)))
+
+    def test_raise_on_payload_codec_can_not_encode(self):
+        """ Raise event error when payload can not be encoded """
+        with self.assertRaises(x.EventError) as cm:
+            CodecRegistry().encode({'a': object()})
+        self.assertIn('Failed to encode payload', str(cm.exception))
+
+    @skipIf(not codecs.orjson, 'orjson is not installed')
+    def test_fast_json_codec_configured_explicitly(self):
+        """ Using orjson when configured explicitly """
+        registry = CodecRegistry(default='orjson')
+        self.assertEquals('orjson', registry.json.name)
+        self.assertEquals('{"1":"a"}', registry.encode({1: 'a'}))
+        with self.assertRaises(x.EventError):
+            registry.encode({'big': 123456789012345678901234567890})
+
+    def test_can_set_default_codec_by_name(self):
+        """ Setting default codec by name """
+        registry = CodecRegistry(default='json')
+        self.assertIsInstance(registry.default, JsonCodec)
+
+    def test_raise_on_unavailable_codec(self):
+        """ Raise when requesting codec that is not available """
+        with self.assertRaises(x.ConfigurationException):
+            CodecRegistry(default='nonexistent')
+
+    def test_raise_on_registering_bad_codec(self):
+        """ Raise when registering codec not extending base """
+        with self.assertRaises(x.ConfigurationException):
+            CodecRegistry().register(object())
+
+    def test_json_payloads_have_no_header(self):
+        """ Json codecs write plain json readable by any json codec """
+        registry = CodecRegistry(default='json')
+        data = registry.encode(self.payload)
+        self.assertEquals(self.payload, json.loads(data))
+        self.assertFalse(registry.has_header(data))
+        self.assertEquals(self.payload, registry.decode(data))
+
+    def test_custom_codec_writes_header(self):
+        """ Custom codecs write header and are used to decode """
+        registry = CodecRegistry(default=ReverseCodec())
+        data = registry.encode(self.payload)
+        self.assertTrue(data.startswith('rev:'))
+        self.assertTrue(registry.has_header(data))
+        self.assertEquals(self.payload, registry.decode(data))
+
+    @skipIf(not codecs.msgpack, 'msgpack is not installed')
+    def test_msgpack_codec(self):
+        """ Encoding payloads with msgpack """
+        registry = CodecRegistry(default='msgpack')
+        data = registry.encode(self.payload)
+        self.assertTrue(type(data) is str)
+        self.assertTrue(data.startswith('msgpack:'))
+        self.assertEquals(self.payload, registry.decode(data))
+
+    def test_decode_rows_written_with_different_codecs(self):
+        """ Decoding payloads written by different codecs side by side """
+        registry = CodecRegistry(default='json')
+        registry.register(ReverseCodec())
+        rows = [
+            json.dumps(self.payload),
+            registry.encode(self.payload, codec=registry.get('reverse')),
+        ]
+        for row in rows:
+            self.assertEquals(self.payload, registry.decode(row))
+
+    def test_raise_on_unknown_codec_header(self):
+        """ Raise when decoding payload with unknown codec header """
+        with self.assertRaises(x.EventError) as cm:
+            CodecRegistry().decode('unknown:data')
+        self.assertIn('unknown codec', str(cm.exception))
+
+    def test_raise_on_invalid_payload(self):
+        """ Raise when payload can not be decoded """
+        with self.assertRaises(x.EventError) as cm:
+            CodecRegistry().decode('not-a-json-string')
+        self.assertIn('Failed to decode payload string', str(cm.exception))
+
+    def test_encode_to_bytes_for_binary_columns(self):
+        """ Encoding payloads to bytes for binary payload columns """
+        registry = CodecRegistry(binary=True)
+        data = registry.encode(self.payload)
+        self.assertTrue(type(data) is bytes)
+        self.assertEquals(self.payload, registry.decode(data))
+
+    def test_raise_on_compression_without_binary_columns(self):
+        """ Raise when enabling compression for text payload columns """
+        with self.assertRaises(x.ConfigurationException) as cm:
+            CodecRegistry(compression='zlib')
+        self.assertIn('requires binary payload columns', str(cm.exception))
+
+    def test_compress_payloads_above_threshold(self):
+        """ Compressing payloads above size threshold """
+        registry = CodecRegistry(
+            binary=True,
+            compression='zlib',
+            compression_threshold=100
+        )
+
+        small = registry.encode(self.payload)
+        self.assertTrue(small.startswith(b'{'))
+
+        payload = dict(items=[self.payload] * 100)
+        data = registry.encode(payload)
+        self.assertTrue(data.startswith(b'\x00zlib:'))
+        self.assertLess(len(data), len(json.dumps(payload)) / 10)
+        self.assertEquals(payload, registry.decode(data))
+        self.assertEquals(self.payload, registry.decode(small))
+
+    @skipIf(not codecs.zstandard, 'zstandard is not installed')
+    def test_zstd_compression(self):
+        """ Compressing payloads with zstd """
+        registry = CodecRegistry(
+            binary=True,
+            compression='zstd',
+            compression_threshold=0
+        )
+        data = registry.encode(self.payload)
+        self.assertTrue(data.startswith(b'\x00zstd:'))
+        self.assertEquals(self.payload, registry.decode(data))
+
+    @skipIf(not codecs.msgpack, 'msgpack is not installed')
+    @skipIf(not codecs.zstandard, 'zstandard is not installed')
+    def test_register_builtins_on_first_use(self):
+        """ Registering built-in codecs when payloads need them """
+        registry = CodecRegistry(binary=True)
+        self.assertEquals(['json'], list(registry.codecs.keys()))
+        self.assertEquals([b'zlib'], list(registry.compressors.keys()))
+
+        data = CodecRegistry(
+            default='msgpack',
+            binary=True,
+            compression='zstd',
+            compression_threshold=0
+        ).encode(self.payload)
+        self.assertEquals(self.payload, registry.decode(data))
+        self.assertIn('msgpack', registry.codecs)
+        self.assertIn(b'zstd', registry.compressors)
+
+    def test_pickle_registry(self):
+        """ Pickling registry to pass it to worker processes """
+        registry = CodecRegistry(
+            default='msgpack' if codecs.msgpack else 'json',
+            binary=True,
+            compression='zstd' if codecs.zstandard else 'zlib',
+            compression_threshold=0
+        )
+
+        data = registry.encode(self.payload)
+        restored = pickle.loads(pickle.dumps(registry))
+        self.assertEquals(sorted(registry.codecs), sorted(restored.codecs))
+        self.assertEquals(self.payload, restored.decode(data))
+        self.assertEquals(data, restored.encode(self.payload))
+
+    def test_raise_on_unknown_compressor(self):
+        """ Raise when decompressing with unknown compressor """
+        with self.assertRaises(x.EventError) as cm:
+            CodecRegistry(binary=True).decode(b'\x00lzma:data')
+        self.assertIn('unknown compressor', str(cm.exception))
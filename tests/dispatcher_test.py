@@ -0,0 +1,180 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+import threading
+from shiftevent import exceptions as x
+from shiftevent.dispatcher import Dispatcher
+from shiftevent.event_service import EventService
+from shiftevent.handlers import BaseHandler
+
+
+class RecordingHandler(BaseHandler):
+    """ Records handled events in context, optionally waiting for a go """
+    EVENT_TYPES = ('DUMMY_EVENT',)
+
+    def handle(self, event):
+        go = self.context.get('go')
+        if go:
+            go.wait()
+        if event.payload.get('fail'):
+            raise Exception('Handler exception')
+        with self.context['lock']:
+            self.context['handled'].append(event)
+        return event
+
+    def rollback(self, event):
+        return event
+
+
+@attr('event', 'dispatcher')
+class DispatcherTest(BaseTestCase):
+
+    def service(self, **context):
+        """ Create event service with recording handler """
+        context.update(handled=[], lock=threading.Lock())
+        return EventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[RecordingHandler]),
+            handler_context=context
+        )
+
+    def test_instantiating_dispatcher(self):
+        """ Instantiating dispatcher """
+        with Dispatcher(self.service()) as dispatcher:
+            self.assertIsInstance(dispatcher, Dispatcher)
+            self.assertEquals(4, len(dispatcher.threads))
+
+    def test_raise_on_bad_config(self):
+        """ Raise on invalid dispatcher configuration """
+        with self.assertRaises(x.ConfigurationException):
+            Dispatcher(self.service(), workers=0)
+
+    def test_handles_events_in_background(self):
+        """ Dispatcher persists events and handles them in background """
+        service = self.service()
+        with Dispatcher(service) as dispatcher:
+            event = dispatcher.event(type='DUMMY_EVENT', author=1, payload={})
+            self.assertIsNotNone(event.id)
+            dispatcher.join()
+        handled = service.handler_context['handled']
+        self.assertEquals([event.id], [e.id for e in handled])
+
+    def test_keeps_order_per_object(self):
+        """ Events of one object are handled in order """
+        service = self.service()
+        with Dispatcher(service, workers=3) as dispatcher:
+            for i in range(60):
+                dispatcher.event(
+                    type='DUMMY_EVENT',
+                    author=1,
+                    object_id=i % 6,
+                    payload={}
+                )
+
+        handled = service.handler_context['handled']
+        self.assertEquals(60, len(handled))
+        for object_id in range(6):
+            ids = [e.id for e in handled if e.object_id == str(object_id)]
+            self.assertEquals(sorted(ids), ids)
+
+    def test_raise_when_queue_full(self):
+        """ Raise when queue stays full for longer than timeout """
+        go = threading.Event()
+        service = self.service(go=go)
+        dispatcher = Dispatcher(
+            service,
+            workers=1,
+            queue_size=1,
+            timeout=0.01
+        )
+
+        dispatched = 0
+        with self.assertRaises(x.DispatchQueueFull):
+            for _ in range(3):
+                dispatcher.event(type='DUMMY_EVENT', author=1, payload={})
+                dispatched += 1
+
+        self.assertEquals(dispatched, len(list(service.iter_events())))
+        go.set()
+        dispatcher.close()
+        handled = service.handler_context['handled']
+        self.assertEquals(dispatched, len(handled))
+
+    def test_keeps_order_per_object_with_concurrent_producers(self):
+        """ Events of one object from many producers are handled in order """
+        service = self.service()
+        with Dispatcher(service, workers=2) as dispatcher:
+            def produce():
+                for _ in range(20):
+                    dispatcher.event(
+                        type='DUMMY_EVENT',
+                        author=1,
+                        object_id=1,
+                        payload={}
+                    )
+
+            producers = [threading.Thread(target=produce) for _ in range(4)]
+            for producer in producers:
+                producer.start()
+            for producer in producers:
+                producer.join()
+
+        ids = [e.id for e in service.handler_context['handled']]
+        self.assertEquals(80, len(ids))
+        self.assertEquals(sorted(ids), ids)
+
+    def test_partition_by_stripped_object_id(self):
+        """ Object ids stored the same land in the same partition """
+        with Dispatcher(self.service(), workers=16) as dispatcher:
+            for object_id in range(20):
+                padded = ' {} '.format(object_id)
+                index = dispatcher.index(object_id)
+                self.assertEquals(index, dispatcher.index(padded))
+
+    def test_drain_on_close(self):
+        """ Closing dispatcher drains queued events """
+        go = threading.Event()
+        service = self.service(go=go)
+        dispatcher = Dispatcher(service, workers=2)
+        for i in range(10):
+            dispatcher.event(type='DUMMY_EVENT', author=1, payload={})
+
+        go.set()
+        dispatcher.close()
+        self.assertEquals(10, len(service.handler_context['handled']))
+        with self.assertRaises(x.DispatcherError):
+            dispatcher.event(type='DUMMY_EVENT', author=1, payload={})
+
+    def test_report_handler_errors(self):
+        """ Handler errors are reported to error callback """
+        errors = []
+        service = self.service()
+        on_error = lambda event, exception: errors.append(event)
+        with Dispatcher(service, on_error=on_error) as dispatcher:
+            event = dispatcher.event(
+                type='DUMMY_EVENT',
+                author=1,
+                payload={'fail': True}
+            )
+
+        self.assertEquals([event], errors)
+        self.assertIsNone(service.get_event(event.id))
+
+    def test_keep_working_when_error_callback_fails(self):
+        """ Worker survives exceptions raised by error callback """
+        service = self.service()
+
+        def on_error(event, exception):
+            raise Exception('Callback exception')
+
+        with Dispatcher(service, workers=1, on_error=on_error) as dispatcher:
+            dispatcher.event(
+                type='DUMMY_EVENT',
+                author=1,
+                payload={'fail': True}
+            )
+            event = dispatcher.event(type='DUMMY_EVENT', author=1, payload={})
+            dispatcher.join()
+
+        handled = service.handler_context['handled']
+        self.assertEquals([event.id], [e.id for e in handled])
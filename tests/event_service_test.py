@@ -4,16 +4,49 @@ from unittest.mock import MagicMock
 
 from pprint import pprint as pp
 from inspect import isclass
+from datetime import datetime
+import json
 from shiftevent import exceptions as x
 from shiftevent.event_service import EventService
+from shiftevent.db import Db
 from shiftevent.event import Event
+from shiftevent.codecs import JsonCodec
+from shiftevent.cache import EventCache
 from shiftevent.handlers import Dummy1
 from shiftevent.handlers import Dummy2
 from shiftevent.handlers import Dummy3
 from shiftevent.handlers import Dummy4
+from shiftevent.handlers import NoTypes
+from shiftevent.handlers import BaseHandler
 from pprint import pprint as pp
 
 
+class ConnectionHandler(BaseHandler):
+    """ Writes a snapshot through unit of work connection """
+    EVENT_TYPES = ('DUMMY_EVENT',)
+
+    def handle(self, event):
+        conn = self.context['connection']
+        events = self.context['db'].tables['events']
+        snapshots = self.context['db'].tables['snapshots']
+        found = conn.execute(
+            events.select().where(events.c.id == event.id)
+        ).fetchone()
+        conn.execute(
+            snapshots.insert(),
+            created=datetime.utcnow(),
+            object_id=event.object_id,
+            event_id=found['id'],
+            state=b'{}'
+        )
+        if event.payload.get('fail'):
+            raise Exception('Handler exception')
+        return event
+
+    def rollback(self, event):
+        return event
+
+
 @attr('event', 'service')
 class EventServiceTest(BaseTestCase):
 
@@ -53,6 +86,78 @@ class EventServiceTest(BaseTestCase):
         self.assertEquals(payload, event.payload)
         self.assertEquals(payload_rollback, event.payload_rollback)
 
+    def test_events_get_object_versions(self):
+        """ Creating events assigns incremental object versions """
+        service = EventService(db=self.db)
+        event = service.event(type='DUMMY_EVENT', author=1)
+        self.assertIsNone(event.version)
+
+        for version in range(1, 4):
+            event = service.event(type='DUMMY_EVENT', author=1, object_id=123)
+            self.assertEquals(version, event.version)
+
+        self.assertEquals(3, service.get_version(123))
+        self.assertEquals(0, service.get_version(456))
+        self.assertEquals(3, service.get_event(event.id).version)
+
+    def test_create_event_with_expected_version(self):
+        """ Creating event with expected object version """
+        service = EventService(db=self.db)
+        event = dict(type='DUMMY_EVENT', author=1, object_id=123)
+        service.event(expected_version=0, **event)
+        event = service.event(expected_version=1, **event)
+        self.assertEquals(2, event.version)
+
+    def test_raise_on_version_conflict(self):
+        """ Raise concurrency error when object version changed """
+        service = EventService(db=self.db)
+        event = dict(type='DUMMY_EVENT', author=1, object_id=123)
+        service.event(expected_version=0, **event)
+        with self.assertRaises(x.ConcurrencyError) as cm:
+            service.event(expected_version=0, **event)
+        self.assertEquals(0, cm.exception.expected_version)
+        self.assertEquals(1, cm.exception.actual_version)
+
+    def test_raise_on_expected_version_without_object_id(self):
+        """ Raise when expecting version of an event without object id """
+        service = EventService(db=self.db)
+        with self.assertRaises(x.EventError):
+            service.event(type='DUMMY_EVENT', author=1, expected_version=0)
+
+    def test_unique_object_versions_enforced(self):
+        """ Database rejects duplicate object versions """
+        service = EventService(db=self.db)
+        event = service.event(type='DUMMY_EVENT', author=1, object_id=123)
+        duplicate = Event(type='DUMMY_EVENT', author=1, object_id=123)
+
+        # simulate a writer that has read the version before the first one
+        service.get_version = MagicMock(side_effect=[0, 1, 1])
+        with self.assertRaises(x.ConcurrencyError):
+            service.save_event(duplicate, expected_version=0)
+
+    def test_retry_version_conflicts_without_expected_version(self):
+        """ Version conflicts are retried when no version is expected """
+        service = EventService(db=self.db)
+        service.event(type='DUMMY_EVENT', author=1, object_id=123)
+
+        service.get_version = MagicMock(side_effect=[0, 1, 1])
+        event = Event(type='DUMMY_EVENT', author=1, object_id=123)
+        service.save_event(event)
+        self.assertEquals(2, event.version)
+
+    def test_bulk_save_assigns_object_versions(self):
+        """ Bulk saving events assigns object versions """
+        service = EventService(db=self.db)
+        service.event(type='DUMMY_EVENT', author=1, object_id=1)
+        events = [
+            Event(type='DUMMY_EVENT', author=1, object_id=1),
+            Event(type='DUMMY_EVENT', author=1, object_id=2),
+            Event(type='DUMMY_EVENT', author=1, object_id=1),
+            Event(type='DUMMY_EVENT', author=1),
+        ]
+        service.save_events(events)
+        self.assertEquals([2, 1, 3, None], [e.version for e in events])
+
     def test_raise_on_missing_handler_when_creating_an_event(self):
         """ Raise exception on missing event handler when creating an event"""
         service = EventService(db=self.db)
@@ -141,6 +246,124 @@ class EventServiceTest(BaseTestCase):
             service.save_event(event)
         self.assertIn('author', cm.exception.validation_errors)
 
+    def test_bulk_save_events(self):
+        """ Bulk saving events in batches """
+        service = EventService(db=self.db)
+        events = []
+        for i in range(25):
+            events.append(Event(
+                type='DUMMY_EVENT',
+                object_id=i,
+                author=456,
+                payload={'number': i},
+            ))
+
+        ids = service.save_events(events, batch_size=10)
+        self.assertEquals(list(range(1, 26)), ids)
+        for event, id in zip(events, ids):
+            self.assertEquals(id, event.id)
+            found = service.get_event(id)
+            self.assertEquals(event.payload, found.payload)
+            self.assertEquals(str(event.object_id), found.object_id)
+
+    def test_bulk_save_events_from_dicts(self):
+        """ Bulk saving events from dictionaries """
+        service = EventService(db=self.db)
+        events = (dict(type='DUMMY_EVENT', author=456) for _ in range(3))
+        ids = service.save_events(events)
+        self.assertEquals([1, 2, 3], ids)
+        self.assertEquals('DUMMY_EVENT', service.get_event(3).type)
+
+    def test_bulk_save_validates_events(self):
+        """ Bulk saving raises on invalid events """
+        service = EventService(db=self.db)
+        events = [
+            Event(type='DUMMY_EVENT', author=456),
+            Event(type='DUMMY_EVENT'),
+        ]
+        with self.assertRaises(x.InvalidEvent) as cm:
+            service.save_events(events)
+        self.assertIn('author', cm.exception.validation_errors)
+        self.assertIsNone(service.get_event(1))
+
+    def test_bulk_save_raises_on_saved_events(self):
+        """ Bulk saving raises on events that already have ids """
+        service = EventService(db=self.db)
+        event = Event(id=123, type='DUMMY_EVENT', author=456)
+        with self.assertRaises(x.EventError) as cm:
+            service.save_events([event])
+        self.assertIn('only inserts new events', str(cm.exception))
+
+    def test_bulk_save_raises_on_bad_batch_size(self):
+        """ Bulk saving raises on invalid batch size """
+        service = EventService(db=self.db)
+        with self.assertRaises(x.ConfigurationException):
+            service.save_events([], batch_size=0)
+
+    def test_save_and_load_event_with_payload_codec(self):
+        """ Saving and loading events with configured payload codec """
+        class Codec(JsonCodec):
+            name = 'custom'
+            header = 'custom'
+
+        service = EventService(db=self.db, payload_codec='json')
+        event = service.event(type='DUMMY_EVENT', author=1, payload={'a': 1})
+
+        service = EventService(db=self.db, payload_codec=Codec())
+        other = service.event(type='DUMMY_EVENT', author=1, payload={'b': 2})
+
+        events = self.db.tables['events']
+        with self.db.engine.begin() as conn:
+            rows = conn.execute(events.select().order_by(events.c.id))
+            payloads = [row['payload'] for row in rows]
+        self.assertEquals('{"a": 1}', payloads[0])
+        self.assertEquals('custom:{"b": 2}', payloads[1])
+
+        self.assertEquals({'a': 1}, service.get_event(event.id).payload)
+        self.assertEquals({'b': 2}, service.get_event(other.id).payload)
+
+    def test_save_and_load_compressed_payloads(self):
+        """ Saving and loading events with compressed payloads """
+        db = Db('sqlite://', binary_payloads=True)
+        db.meta.create_all()
+        service = EventService(
+            db=db,
+            compression='zlib',
+            compression_threshold=100
+        )
+
+        payload = dict(items=[dict(body='I am the payload 😂')] * 100)
+        event = service.event(type='DUMMY_EVENT', author=1, payload=payload)
+
+        events = db.tables['events']
+        with db.engine.begin() as conn:
+            row = conn.execute(events.select()).fetchone()
+        self.assertTrue(row['payload'].startswith(b'\x00zlib:'))
+        self.assertTrue(row['payload_rollback'].startswith(b'{'))
+
+        event = service.get_event(event.id)
+        self.assertEquals(payload, event.payload)
+        self.assertEquals(dict(), event.payload_rollback)
+
+    def test_payload_json_from_binary_compressed_store(self):
+        """ Getting payload json of events from binary compressed store """
+        db = Db('sqlite://', binary_payloads=True)
+        db.meta.create_all()
+        service = EventService(
+            db=db,
+            compression='zlib',
+            compression_threshold=100
+        )
+
+        payload = dict(items=[dict(body='I am the payload')] * 100)
+        event = service.event(type='DUMMY_EVENT', author=1, payload=payload)
+
+        event = service.get_event(event.id)
+        self.assertTrue(type(event.payload_json) is str)
+        self.assertEquals(payload, json.loads(event.payload_json))
+        self.assertTrue(type(event.payload_rollback_json) is str)
+        self.assertEquals('{}', event.payload_rollback_json)
+
     def test_get_event_by_id(self):
         """ Getting event by id"""
         service = EventService(db=self.db)
@@ -156,6 +379,222 @@ class EventServiceTest(BaseTestCase):
         self.assertIsInstance(event, Event)
         self.assertEquals(id, event.id)
 
+    def test_get_events_by_ids(self):
+        """ Getting multiple events by ids in given order """
+        service = EventService(db=self.db)
+        for i in range(5):
+            service.event(type='DUMMY_EVENT', author=1, payload={'i': i})
+
+        events = service.get_events([4, 123, 2, 4])
+        self.assertEquals(4, len(events))
+        self.assertEquals(4, events[0].id)
+        self.assertIsNone(events[1])
+        self.assertEquals({'i': 1}, events[2].payload)
+        self.assertEquals(4, events[3].id)
+        self.assertIsNot(events[0], events[3])
+        self.assertEquals([], service.get_events([]))
+
+    def test_get_events_in_chunks(self):
+        """ Getting events in chunks under dialect parameter limit """
+        service = EventService(db=self.db)
+        service.save_events([
+            dict(type='DUMMY_EVENT', author=1) for _ in range(10)
+        ])
+        service.MAX_PARAMS = dict(sqlite=3)
+        ids = list(range(12, 0, -1))
+        events = service.get_events(ids)
+        self.assertEquals([None, None], events[:2])
+        self.assertEquals(ids[2:], [e.id for e in events[2:]])
+
+    def test_get_events_uses_cache(self):
+        """ Getting multiple events reads through cache """
+        service = EventService(db=self.db, cache=EventCache())
+        for i in range(3):
+            service.event(type='DUMMY_EVENT', author=1, payload={})
+
+        service.get_event(1)
+        service.get_events([1, 2, 3])
+        self.assertEquals(1, service.cache.stats()['hits'])
+        self.assertEquals(3, len(service.cache))
+
+        service.get_events([1, 2, 3])
+        self.assertEquals(4, service.cache.stats()['hits'])
+
+    def test_raise_on_bad_cache(self):
+        """ Raise when event cache is not an EventCache """
+        with self.assertRaises(x.ConfigurationException):
+            EventService(db=self.db, cache=dict())
+
+    def test_get_event_reads_through_cache(self):
+        """ Getting events by id reads through cache """
+        service = EventService(db=self.db, cache=EventCache())
+        event = service.event(
+            type='DUMMY_EVENT',
+            object_id=123,
+            author=456,
+            payload={'what': 'IS THIS'}
+        )
+
+        first = service.get_event(event.id)
+        second = service.get_event(event.id)
+        self.assertIsNot(first, second)
+        self.assertEquals({'what': 'IS THIS'}, second.payload)
+        self.assertIsNone(service.get_event(123))
+
+        stats = service.cache.stats()
+        self.assertEquals(1, stats['hits'])
+        self.assertEquals(2, stats['misses'])
+
+    def test_cache_invalidated_on_update(self):
+        """ Updating event invalidates cached event """
+        service = EventService(db=self.db, cache=EventCache())
+        event = service.event(type='DUMMY_EVENT', author=456, payload={})
+        service.get_event(event.id)
+
+        event.payload = {'updated': True}
+        service.save_event(event)
+        found = service.get_event(event.id)
+        self.assertEquals({'updated': True}, found.payload)
+
+    def test_cache_invalidated_when_emit_fails(self):
+        """ Dropping failed event invalidates cached event """
+        service = EventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[ConnectionHandler]),
+            handler_context=dict(db=self.db),
+            cache=EventCache()
+        )
+        event = service.event(
+            type='DUMMY_EVENT',
+            author=456,
+            payload={'fail': True}
+        )
+        service.get_event(event.id)
+        self.assertIn(event.id, service.cache)
+
+        with service.unit_of_work() as conn:
+            with self.assertRaises(Exception):
+                service.emit(event, conn=conn)
+        self.assertNotIn(event.id, service.cache)
+        self.assertIsNone(service.get_event(event.id))
+
+    def test_iterate_over_events(self):
+        """ Iterating over events in batches """
+        service = EventService(db=self.db)
+        events = [dict(type='DUMMY_EVENT', author=456) for _ in range(25)]
+        service.save_events(events)
+
+        result = service.iter_events(batch_size=10)
+        self.assertEquals(list(range(1, 26)), [e.id for e in result])
+
+        result = service.iter_events(after_id=20, batch_size=10)
+        self.assertEquals(list(range(21, 26)), [e.id for e in result])
+
+    def test_iterate_over_events_of_type(self):
+        """ Iterating over events of certain types """
+        class Other(Dummy1):
+            EVENT_TYPES = ('OTHER_EVENT',)
+
+        service = EventService(db=self.db)
+        service.handlers = dict(service.handlers, OTHER_EVENT=[Other])
+        for i in range(10):
+            type = 'DUMMY_EVENT' if i % 2 else 'OTHER_EVENT'
+            service.event(type=type, author=456)
+
+        result = list(service.iter_events(batch_size=2, types='DUMMY_EVENT'))
+        self.assertEquals([2, 4, 6, 8, 10], [e.id for e in result])
+
+    def test_iterate_over_events_until_date(self):
+        """ Iterating over events created up to a date """
+        service = EventService(db=self.db)
+        events = [
+            Event(type='DUMMY_EVENT', author=1, created=datetime(2019, 1, 1)),
+            Event(type='DUMMY_EVENT', author=1, created=datetime(2019, 1, 2)),
+            Event(type='DUMMY_EVENT', author=1, created=datetime(2019, 1, 3)),
+        ]
+        service.save_events(events)
+        result = service.iter_events(until=datetime(2019, 1, 2))
+        self.assertEquals([1, 2], [e.id for e in result])
+
+    def test_get_object_event_stream(self):
+        """ Getting event stream for an object """
+        service = EventService(db=self.db)
+        events = []
+        for i in range(10):
+            events.append(dict(
+                type='DUMMY_EVENT',
+                author=1,
+                object_id='one' if i % 2 else 'two'
+            ))
+        service.save_events(events)
+
+        stream = service.get_stream('one')
+        self.assertEquals([2, 4, 6, 8, 10], [e.id for e in stream])
+
+        stream = service.get_stream('one', from_id=4, to_id=8)
+        self.assertEquals([4, 6, 8], [e.id for e in stream])
+
+    def test_get_latest_object_events(self):
+        """ Getting latest events for an object in reverse order """
+        service = EventService(db=self.db)
+        events = [dict(type='DUMMY_EVENT', author=1, object_id=123)] * 5
+        service.save_events(events)
+
+        stream = service.get_stream(123, reverse=True, limit=2)
+        self.assertEquals([5, 4], [e.id for e in stream])
+
+    def test_raise_on_bad_snapshot_config(self):
+        """ Raise on invalid snapshot configuration """
+        with self.assertRaises(x.ConfigurationException):
+            EventService(db=self.db, snapshot_frequency=0)
+        with self.assertRaises(x.ConfigurationException):
+            EventService(db=self.db, snapshot_serializer=object())
+
+    def test_save_and_get_snapshot(self):
+        """ Saving and getting latest object snapshot """
+        service = EventService(db=self.db)
+        self.assertIsNone(service.get_snapshot(123))
+
+        service.save_snapshot(123, {'count': 1}, event_id=1)
+        service.save_snapshot(123, {'count': 2}, event_id=5)
+        service.save_snapshot(456, {'count': 3}, event_id=6)
+
+        snapshot = service.get_snapshot(123)
+        self.assertEquals(5, snapshot.event_id)
+        self.assertEquals({'count': 2}, snapshot.state)
+
+        snapshot = service.get_snapshot(123, before_id=4)
+        self.assertEquals(1, snapshot.event_id)
+
+    def test_load_snapshot_with_tail_events(self):
+        """ Loading latest snapshot with events after it """
+        service = EventService(db=self.db)
+        event = dict(type='DUMMY_EVENT', author=1, object_id=1)
+        service.save_events([event] * 5)
+        service.save_snapshot(1, {'count': 3}, event_id=3)
+
+        snapshot, events = service.load_snapshot(1)
+        self.assertEquals(3, snapshot.event_id)
+        self.assertEquals([4, 5], [e.id for e in events])
+
+    def test_load_state_takes_snapshots(self):
+        """ Loading state takes snapshot every n events """
+        service = EventService(db=self.db, snapshot_frequency=3)
+        reducer = lambda state, event: state + 1
+        event = dict(type='DUMMY_EVENT', author=1, object_id=1)
+
+        service.save_events([event] * 2)
+        self.assertEquals(2, service.load_state(1, reducer, initial=0))
+        self.assertIsNone(service.get_snapshot(1))
+
+        service.save_events([event] * 2)
+        self.assertEquals(4, service.load_state(1, reducer, initial=0))
+        self.assertEquals(4, service.get_snapshot(1).event_id)
+
+        service.save_events([event])
+        self.assertEquals(5, service.load_state(1, reducer, initial=0))
+        self.assertEquals(4, service.get_snapshot(1).event_id)
+
     def test_instantiate_handler(self):
         """ Instantiating handler """
         handler_definitions = dict(DUMMY_EVENT=[Dummy1])
@@ -173,10 +612,8 @@ class EventServiceTest(BaseTestCase):
     def test_raise_when_handler_not_defined_as_a_class(self):
         """ Raise an error when handler is not a class """
         handler_definitions = dict(DUMMY_EVENT=[Dummy1()])
-        service = EventService(db=self.db, handlers=handler_definitions)
-        event = Event(type='DUMMY_EVENT', id=123, payload=dict(some='payload'))
         with self.assertRaises(x.HandlerInstantiationError) as cm:
-            service.emit(event)
+            EventService(db=self.db, handlers=handler_definitions)
         self.assertIn('has to be a class, got', str(cm.exception))
 
     def test_raise_when_handler_doesnt_inherit_from_base(self):
@@ -189,15 +626,52 @@ class EventServiceTest(BaseTestCase):
                 pass
 
         handler_definitions = dict(DUMMY_EVENT=[Handler])
-        service = EventService(db=self.db, handlers=handler_definitions)
-        event = Event(type='DUMMY_EVENT', id=123, payload=dict(some='payload'))
         with self.assertRaises(x.HandlerInstantiationError) as cm:
-            service.emit(event)
+            EventService(db=self.db, handlers=handler_definitions)
         self.assertIn(
             'Handler implementations must extend BaseHandler',
             str(cm.exception)
         )
 
+    def test_raise_when_handler_doesnt_define_event_types(self):
+        """ Raise error when handler does not define event types """
+        handler_definitions = dict(DUMMY_EVENT=[NoTypes])
+        with self.assertRaises(x.MissingEventType):
+            EventService(db=self.db, handlers=handler_definitions)
+
+    def test_raise_when_handler_doesnt_support_event_type(self):
+        """ Raise error when handler does not support configured type """
+        handler_definitions = dict(OTHER_EVENT=[Dummy1])
+        with self.assertRaises(x.UnsupportedEventType):
+            EventService(db=self.db, handlers=handler_definitions)
+
+    def test_handler_chains_compiled_when_setting_handlers(self):
+        """ Setting handlers compiles handler chains """
+        service = EventService(db=self.db)
+        service.handlers = dict(DUMMY_EVENT=[Dummy2])
+        self.assertEquals((Dummy2,), service.chains['DUMMY_EVENT'])
+        with self.assertRaises(x.HandlerInstantiationError):
+            service.handlers = dict(DUMMY_EVENT=[Dummy2()])
+
+    def test_reuse_handler_instances(self):
+        """ Reusing handler instances across emits """
+        context = dict(dependency='Some dependency')
+        service = EventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[Dummy1]),
+            handler_context=context,
+            reuse_handlers=True
+        )
+        handler = service.chains['DUMMY_EVENT'][0]
+        self.assertIsInstance(handler, Dummy1)
+        self.assertEquals(context, handler.context)
+
+        for _ in range(2):
+            event = Event(type='DUMMY_EVENT', id=123, payload=dict(a=1))
+            event = service.emit(event)
+            self.assertIn('dummy_handler1', event.payload)
+        self.assertIs(handler, service.chains['DUMMY_EVENT'][0])
+
     def test_raise_on_missing_handler_when_emitting_an_event(self):
         """ Raise exception on missing event handler when emitting an event"""
         service = EventService(db=self.db)
@@ -230,8 +704,11 @@ class EventServiceTest(BaseTestCase):
         handler.__init__ = MagicMock(return_value=None)
 
         context = dict(dependency='Some dependency')
-        service = EventService(db=self.db, handler_context=context)
-        service.handlers['DUMMY_EVENT'].append(handler)
+        service = EventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[Dummy1, handler]),
+            handler_context=context
+        )
 
         event = service.event(
             type='DUMMY_EVENT',
@@ -243,6 +720,75 @@ class EventServiceTest(BaseTestCase):
         service.emit(event)
         handler.__init__.assert_called_with(context=context)
 
+    def test_publish_event_in_single_transaction(self):
+        """ Publishing saves and emits event on a single connection """
+        service = EventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[Dummy1, ConnectionHandler]),
+            handler_context=dict(db=self.db)
+        )
+        event = service.publish(
+            type='DUMMY_EVENT',
+            object_id=123,
+            author=456,
+            payload={'what': 'IS THIS'},
+            expected_version=0
+        )
+        self.assertEquals('processed', event.payload['dummy_handler1'])
+        self.assertEquals(1, service.get_event(event.id).version)
+        self.assertEquals(event.id, service.get_snapshot(123).event_id)
+        self.assertNotIn('connection', service.handler_context)
+
+    def test_publish_rolls_back_everything_on_failure(self):
+        """ Failed publish leaves no event or handler writes behind """
+        service = EventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[ConnectionHandler]),
+            handler_context=dict(db=self.db)
+        )
+        with self.assertRaises(Exception) as cm:
+            service.publish(
+                type='DUMMY_EVENT',
+                object_id=123,
+                author=456,
+                payload={'fail': True}
+            )
+        self.assertIn('Handler exception', str(cm.exception))
+        self.assertEquals([], service.get_stream(123))
+        self.assertIsNone(service.get_snapshot(123))
+
+    def test_publish_raises_on_version_conflict(self):
+        """ Publishing raises concurrency error on version conflict """
+        service = EventService(db=self.db)
+        event = dict(type='DUMMY_EVENT', object_id=123, author=456)
+        service.publish(expected_version=0, payload={'a': 'b'}, **event)
+        with self.assertRaises(x.ConcurrencyError):
+            service.publish(expected_version=0, payload={'a': 'b'}, **event)
+        self.assertEquals(1, service.get_version(123))
+
+    def test_emit_within_transaction_rolls_back_to_savepoint(self):
+        """ Emitting within transaction rolls back to savepoint on failure """
+        service = EventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[ConnectionHandler]),
+            handler_context=dict(db=self.db)
+        )
+        with service.unit_of_work() as conn:
+            ok = Event(type='DUMMY_EVENT', object_id=1, author=1, payload={})
+            service.save_event(ok, conn=conn)
+            service.emit(ok, conn=conn)
+
+            failed = Event(type='DUMMY_EVENT', object_id=2, author=1)
+            failed.payload = {'fail': True}
+            service.save_event(failed, conn=conn)
+            with self.assertRaises(Exception):
+                service.emit(failed, conn=conn)
+
+        self.assertIsNotNone(service.get_event(ok.id))
+        self.assertIsNotNone(service.get_snapshot(1))
+        self.assertIsNone(service.get_event(failed.id))
+        self.assertIsNone(service.get_snapshot(2))
+
     def test_rollback_handlers_on_exception(self):
         """ Rollback applied handlers on handler exceptions """
 
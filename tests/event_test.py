@@ -38,8 +38,19 @@ class EventTest(BaseTestCase):
         event = Event()
         event.created = dt
         self.assertEquals(dt, event.props['created'])
-        event.props = 'something'
-        self.assertEquals('something', event.props)
+
+    def test_can_not_set_undefined_props(self):
+        """ Events use slots and do not accept arbitrary attributes """
+        event = Event()
+        with self.assertRaises(AttributeError):
+            event.something = 'else'
+        self.assertFalse(hasattr(event, '__dict__'))
+
+    def test_populating_event_ignores_unknown_props(self):
+        """ Populating event from dict ignores unknown props """
+        event = Event(type='TEST', something='else')
+        self.assertEquals('TEST', event.type)
+        self.assertFalse(hasattr(event, 'something'))
 
     def test_can_check_for_attribute_presence(self):
         """ Can use hasattr to check for prop existence"""
@@ -126,3 +137,49 @@ class EventTest(BaseTestCase):
         event = Event(payload_rollback=data)
         self.assertTrue(type(event.payload_rollback_json) is str)
         self.assertEquals(data, event.payload_rollback_json)
+
+    def test_create_event_from_db_with_lazy_payloads(self):
+        """ Events created from db rows decode payloads on first access """
+        payload = json.dumps(dict(some='payload'))
+        event = Event.from_db(dict(
+            id=1,
+            type='TEST',
+            payload=payload,
+            payload_rollback=payload
+        ))
+        self.assertEquals('TEST', event.type)
+        self.assertIsNone(event._payload)
+        self.assertIsNone(event._payload_rollback)
+
+        self.assertEquals(dict(some='payload'), event.payload)
+        self.assertEquals(dict(some='payload'), event.payload_rollback)
+        self.assertIsNone(event._payload_raw)
+        self.assertIsNone(event._payload_rollback_raw)
+
+    def test_db_representation_reuses_untouched_raw_payloads(self):
+        """ Db representation reuses raw json of payloads never accessed """
+        payload = '{"some":    "payload"}'
+        event = Event.from_db(dict(id=1, payload=payload))
+        self.assertIs(payload, event.to_db()['payload'])
+        self.assertIsNone(event._payload)
+
+    def test_db_representation_encodes_accessed_payloads(self):
+        """ Payloads accessed after loading are encoded again """
+        event = Event.from_db(dict(id=1, payload='{"some": "payload"}'))
+        event.payload['some'] = 'changed'
+        data = json.loads(event.to_db()['payload'])
+        self.assertEquals('changed', data['some'])
+
+    def test_setting_payload_replaces_raw_payload(self):
+        """ Setting payload replaces raw json payload """
+        event = Event.from_db(dict(id=1, payload='{"some": "payload"}'))
+        event.payload = dict(other='payload')
+        self.assertEquals(dict(other='payload'), event.payload)
+        self.assertIn('other', event.payload_json)
+
+    def test_raise_when_fails_to_decode_raw_payload_on_access(self):
+        """ Raise when lazily decoded payload is invalid """
+        event = Event.from_db(dict(id=1, payload='not-a-json-string'))
+        with self.assertRaises(x.EventError) as cm:
+            event.payload
+        self.assertIn('Failed to decode payload string', str(cm.exception))
@@ -0,0 +1,67 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+from shiftevent.event import Event
+from shiftevent.event import EventSchema
+from shiftevent.event import EventValidator
+from datetime import datetime
+import itertools
+
+
+@attr('event', 'validator')
+class EventValidatorTest(BaseTestCase):
+    """
+    Event validator test
+    Checks that precompiled validator is equivalent to reference schema.
+    """
+
+    values = [None, '', '   ', ' value ', 'Value', 0, 123, False, True]
+
+    def test_instantiating_validator(self):
+        """ Instantiating event validator """
+        validator = EventValidator()
+        self.assertIsInstance(validator, EventValidator)
+
+    def test_valid_event_passes(self):
+        """ Valid event passes validation """
+        event = Event(type='DUMMY_EVENT', author=123)
+        self.assertEquals(dict(), EventValidator().validate(event))
+
+    def test_filters_event_props(self):
+        """ Validator strips and uppercases event props """
+        event = Event(type=' dummy_event ', author=' me ', object_id=' 1 ')
+        EventValidator().validate(event)
+        self.assertEquals('DUMMY_EVENT', event.type)
+        self.assertEquals('me', event.author)
+        self.assertEquals('1', event.object_id)
+
+    def test_returns_required_errors(self):
+        """ Validator returns errors for missing props """
+        event = Event()
+        event.created = None
+        errors = EventValidator().validate(event)
+        self.assertIn('created', errors)
+        self.assertIn('type', errors)
+        self.assertIn('author', errors)
+
+    def test_equivalent_to_schema(self):
+        """ Validator is equivalent to reference schema """
+        created = [None, datetime(2019, 1, 1)]
+        combinations = itertools.product(
+            created,
+            self.values,
+            self.values,
+            self.values
+        )
+        for created, type, author, object_id in combinations:
+            data = dict(type=type, author=author, object_id=object_id)
+            reference = Event(**data)
+            reference.created = created
+            event = Event(**data)
+            event.created = created
+
+            expected = EventSchema().process(reference).get_messages()
+            errors = EventValidator().validate(event)
+
+            self.assertEquals(expected, errors, msg=data)
+            self.assertEquals(reference.to_dict(), event.to_dict(), msg=data)
@@ -0,0 +1,75 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+import os
+import subprocess
+import sys
+
+
+@attr('import')
+class ImportTimeTest(BaseTestCase):
+    """
+    Import time test
+    Guards cold start of short-lived jobs: measures imports with
+    python -X importtime in a fresh interpreter and checks that heavy
+    dependencies are only loaded when used.
+    """
+
+    # caps on cumulative import time, microseconds
+    CAPS = {
+        'shiftevent': 50000,
+        'shiftevent.cli.cli': 250000,
+    }
+
+    def import_times(self, module):
+        """ Import module in a fresh interpreter and return import times """
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+            env=env,
+            cwd=root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True
+        )
+
+        times = dict()
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line.split('|')
+            times[name.strip()] = int(cumulative)
+        return times
+
+    def test_package_import_is_lazy(self):
+        """ Importing package does not load dependencies """
+        times = self.import_times('shiftevent')
+        self.assertNotIn('sqlalchemy', times)
+        self.assertNotIn('shiftschema', times)
+        self.assertNotIn('shiftevent.event_service', times)
+        self.assertLess(times['shiftevent'], self.CAPS['shiftevent'])
+
+    def test_event_service_import_is_lazy(self):
+        """ Importing event service does not load unused modules """
+        times = self.import_times('shiftevent.event_service')
+        self.assertIn('sqlalchemy', times)
+        self.assertNotIn('shiftschema', times)
+        self.assertNotIn('sqlalchemy.dialects.mysql', times)
+        self.assertNotIn('shiftevent.default_handlers', times)
+        self.assertNotIn('shiftevent.handlers.dummy1', times)
+        self.assertNotIn('shiftevent.profiler', times)
+        self.assertNotIn('shiftevent.query', times)
+        self.assertNotIn('orjson', times)
+        self.assertNotIn('ujson', times)
+        self.assertNotIn('msgpack', times)
+        self.assertNotIn('zstandard', times)
+
+    def test_cli_import_is_lazy(self):
+        """ Importing console does not load services """
+        times = self.import_times('shiftevent.cli.cli')
+        self.assertNotIn('sqlalchemy', times)
+        self.assertNotIn('shiftevent.event_service', times)
+        cap = self.CAPS['shiftevent.cli.cli']
+        self.assertLess(times['shiftevent.cli.cli'], cap)
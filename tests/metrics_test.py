@@ -0,0 +1,179 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+import os
+import tempfile
+from shiftevent import exceptions as x
+from shiftevent.event_service import EventService
+from shiftevent.handlers import BaseHandler
+from shiftevent.handlers import Dummy1
+from shiftevent.metrics import MetricsRegistry, PrometheusExporter
+
+
+class Failing(Dummy1):
+    """ Handler that always fails """
+
+    def handle(self, event):
+        raise Exception('Handler exception')
+
+
+@attr('event', 'metrics')
+class MetricsTest(BaseTestCase):
+
+    def test_increment_counters(self):
+        """ Incrementing counters per labels """
+        metrics = MetricsRegistry()
+        metrics.increment('events_total', type='ONE')
+        metrics.increment('events_total', 2, type='ONE')
+        metrics.increment('events_total', type='TWO')
+        self.assertEquals(3, metrics.counter('events_total', type='ONE'))
+        self.assertEquals(1, metrics.counter('events_total', type='TWO'))
+        self.assertEquals(0, metrics.counter('events_total', type='NONE'))
+
+    def test_observe_histograms(self):
+        """ Observing values in histogram buckets """
+        metrics = MetricsRegistry(buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 5):
+            metrics.observe('duration', value, type='ONE')
+
+        histogram = metrics.histogram('duration', type='ONE')
+        self.assertEquals(4, histogram['count'])
+        self.assertAlmostEqual(5.65, histogram['sum'])
+        expected = [(0.1, 2), (1, 3), (float('inf'), 4)]
+        self.assertEquals(expected, histogram['buckets'])
+        self.assertIsNone(metrics.histogram('duration', type='TWO'))
+
+        metrics.reset()
+        self.assertIsNone(metrics.histogram('duration', type='ONE'))
+
+    def test_export_prometheus_text(self):
+        """ Exporting metrics in prometheus text format """
+        metrics = MetricsRegistry(buckets=(0.5,))
+        metrics.increment('events_total', type='SAY "HI"')
+        metrics.observe('duration', 0.25, type='ONE')
+
+        text = PrometheusExporter(metrics).render()
+        self.assertIn('# TYPE shiftevent_events_total counter', text)
+        self.assertIn('shiftevent_events_total{type="SAY \\"HI\\""} 1', text)
+        self.assertIn('# TYPE shiftevent_duration histogram', text)
+        bucket = 'shiftevent_duration_bucket{{type="ONE",le="{}"}} 1'
+        self.assertIn(bucket.format('0.5'), text)
+        self.assertIn(bucket.format('+Inf'), text)
+        self.assertIn('shiftevent_duration_sum{type="ONE"} 0.25', text)
+        self.assertIn('shiftevent_duration_count{type="ONE"} 1', text)
+        self.assertEquals('', PrometheusExporter(MetricsRegistry()).render())
+
+    def test_write_prometheus_file(self):
+        """ Writing metrics to a file """
+        metrics = MetricsRegistry()
+        metrics.increment('events_total')
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            PrometheusExporter(metrics, prefix=None).write(path)
+            with open(path) as file:
+                self.assertEquals('events_total 1', file.read().split('\n')[1])
+        finally:
+            os.remove(path)
+
+    def test_raise_on_bad_metrics(self):
+        """ Raise when service metrics do not extend BaseMetrics """
+        with self.assertRaises(x.ConfigurationException):
+            EventService(db=self.db, metrics=dict())
+
+    def test_handlers_report_nothing_without_metrics(self):
+        """ Handlers skip instrumentation when metrics are disabled """
+        service = EventService(db=self.db)
+        event = service.event(type='DUMMY_EVENT', author=1, payload={})
+        service.emit(event)
+        self.assertIsNone(BaseHandler.metrics)
+
+    def test_service_reports_stages_and_handlers(self):
+        """ Event service reports timings of stages and handlers """
+        metrics = MetricsRegistry()
+        handlers = dict(DUMMY_EVENT=[Dummy1])
+        service = EventService(db=self.db, handlers=handlers, metrics=metrics)
+        event = service.event(type='DUMMY_EVENT', author=1, payload={})
+        service.emit(event)
+        service.save_event(event)
+
+        for stage in ('validate', 'insert', 'update', 'emit'):
+            name = 'event_{}_seconds'.format(stage)
+            histogram = metrics.histogram(name, type='DUMMY_EVENT')
+            self.assertIsNotNone(histogram, name)
+
+        self.assertEquals(2, metrics.histogram(
+            'event_validate_seconds',
+            type='DUMMY_EVENT'
+        )['count'])
+        self.assertEquals(1, metrics.counter(
+            'events_saved_total',
+            type='DUMMY_EVENT'
+        ))
+        self.assertEquals(1, metrics.counter(
+            'events_emitted_total',
+            type='DUMMY_EVENT'
+        ))
+
+        labels = dict(
+            type='DUMMY_EVENT',
+            handler='shiftevent.handlers.dummy1.Dummy1',
+            action='handle'
+        )
+        self.assertEquals(1, metrics.histogram('handler_seconds', **labels)[
+            'count'
+        ])
+        self.assertEquals(1, metrics.counter('handler_calls_total', **labels))
+
+    def test_service_reports_failures_and_rollbacks(self):
+        """ Event service reports failed emits and handler rollbacks """
+        metrics = MetricsRegistry()
+        handlers = dict(DUMMY_EVENT=[Dummy1, Failing])
+        service = EventService(db=self.db, handlers=handlers, metrics=metrics)
+        event = service.event(type='DUMMY_EVENT', author=1, payload={})
+        with self.assertRaises(Exception):
+            service.emit(event)
+
+        self.assertEquals(1, metrics.counter(
+            'events_failed_total',
+            type='DUMMY_EVENT'
+        ))
+        self.assertEquals(0, metrics.counter(
+            'events_emitted_total',
+            type='DUMMY_EVENT'
+        ))
+        failing = dict(
+            type='DUMMY_EVENT',
+            handler='{}.Failing'.format(__name__),
+            action='handle'
+        )
+        errors = metrics.counter('handler_errors_total', **failing)
+        self.assertEquals(1, errors)
+        rollback = dict(
+            type='DUMMY_EVENT',
+            handler='shiftevent.handlers.dummy1.Dummy1',
+            action='rollback'
+        )
+        calls = metrics.counter('handler_calls_total', **rollback)
+        self.assertEquals(1, calls)
+
+    def test_reused_handlers_report_timings(self):
+        """ Reused handler instances report timings """
+        metrics = MetricsRegistry()
+        service = EventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[Dummy1]),
+            reuse_handlers=True,
+            metrics=metrics
+        )
+        for _ in range(3):
+            event = service.event(type='DUMMY_EVENT', author=1, payload={})
+            service.emit(event)
+
+        histogram = metrics.histogram(
+            'handler_seconds',
+            type='DUMMY_EVENT',
+            handler='shiftevent.handlers.dummy1.Dummy1',
+            action='handle'
+        )
+        self.assertEquals(3, histogram['count'])
@@ -0,0 +1,130 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+from shiftevent import exceptions as x
+from shiftevent import profiler as profiling
+from shiftevent.event_service import EventService
+from shiftevent.handlers import BaseHandler
+from shiftevent.profiler import HandlerProfiler, hottest, summarize
+
+
+class First(BaseHandler):
+    """ First profiled handler """
+    EVENT_TYPES = ('DUMMY_EVENT',)
+
+    def handle(self, event):
+        return event
+
+    def rollback(self, event):
+        return event
+
+
+class Second(First):
+    """ Second profiled handler """
+    pass
+
+
+@attr('event', 'profiler')
+class HandlerProfilerTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().tearDown()
+
+    def service(self, profiler):
+        """ Create event service with profiler """
+        handlers = dict(DUMMY_EVENT=[First, Second])
+        return EventService(db=self.db, handlers=handlers, profiler=profiler)
+
+    def emit(self, service, count=1):
+        """ Emit dummy events """
+        for _ in range(count):
+            event = service.event(type='DUMMY_EVENT', author=1, payload={})
+            service.emit(event)
+
+    def test_raise_on_bad_config(self):
+        """ Raise on bad profiler config """
+        with self.assertRaises(x.ConfigurationException):
+            HandlerProfiler(sample_rate=0)
+        with self.assertRaises(x.ConfigurationException):
+            self.service(profiler=dict())
+
+    def test_profile_handlers(self):
+        """ Profiling every handler in chain """
+        profiler = HandlerProfiler()
+        self.emit(self.service(profiler), count=3)
+
+        first = '{}.First'.format(__name__)
+        second = '{}.Second'.format(__name__)
+        self.assertEquals({first, second}, set(profiler.stats.keys()))
+        self.assertEquals(3, profiler.calls[first])
+
+        rows = hottest(profiler.stats[first])
+        functions = [row['function'] for row in rows]
+        self.assertTrue(any('(handle)' in f for f in functions))
+
+    def test_profile_selected_types(self):
+        """ Profiling only selected event types """
+        profiler = HandlerProfiler(types=['OTHER_EVENT'])
+        self.emit(self.service(profiler))
+        self.assertEquals({}, profiler.stats)
+
+    def test_sample_emits(self):
+        """ Profiling a sampled fraction of emits """
+        profiler = HandlerProfiler(sample_rate=0.5, seed=1)
+        self.emit(self.service(profiler), count=20)
+        calls = profiler.calls['{}.First'.format(__name__)]
+        self.assertGreater(calls, 0)
+        self.assertLess(calls, 20)
+
+    def test_skip_profiling_when_another_profile_is_active(self):
+        """ Running handlers unprofiled while another profile is active """
+        profiler = HandlerProfiler()
+        service = self.service(profiler)
+        with profiling.PROFILING:
+            self.emit(service)
+        self.assertEquals({}, profiler.stats)
+        self.assertEquals(1, len(list(service.iter_events())))
+
+        self.emit(service)
+        self.assertEquals(1, profiler.calls['{}.First'.format(__name__)])
+
+    def test_skip_profiling_when_profiler_can_not_start(self):
+        """ Running handlers unprofiled when profiler fails to start """
+        profiler = HandlerProfiler()
+        service = self.service(profiler)
+        error = ValueError('Another profiling tool is already active')
+        with mock.patch.object(profiling.cProfile, 'Profile') as profile:
+            profile.return_value.enable.side_effect = error
+            self.emit(service)
+        self.assertEquals({}, profiler.stats)
+        self.assertEquals(1, len(list(service.iter_events())))
+
+        self.emit(service)
+        self.assertEquals(1, profiler.calls['{}.First'.format(__name__)])
+
+    def test_dump_and_summarize_stats(self):
+        """ Dumping stats to pstats files and summarizing them """
+        profiler = HandlerProfiler()
+        self.emit(self.service(profiler))
+
+        paths = profiler.dump(self.directory)
+        self.assertEquals(2, len(paths))
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        summary = summarize(self.directory, limit=3, sort='tottime')
+        self.assertIn('{}.First'.format(__name__), summary)
+        rows = summary['{}.Second'.format(__name__)]
+        self.assertEquals(3, len(rows))
+        self.assertGreaterEqual(rows[0]['tottime'], rows[-1]['tottime'])
+
+        with self.assertRaises(x.ConfigurationException):
+            summarize(paths[0], sort='bad')
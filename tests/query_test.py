@@ -0,0 +1,136 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+from datetime import datetime, timedelta
+from shiftevent import exceptions as x
+from shiftevent.event import Event
+from shiftevent.event_service import EventService
+from shiftevent.handlers import Dummy1
+from shiftevent.query import EventQuery
+
+
+class Other(Dummy1):
+    """ Handler for other event type """
+    EVENT_TYPES = ('OTHER_EVENT',)
+
+
+@attr('event', 'query')
+class EventQueryTest(BaseTestCase):
+
+    start = datetime(2020, 1, 1)
+
+    def service(self):
+        """ Create event service with some events """
+        service = EventService(
+            db=self.db,
+            handlers=dict(DUMMY_EVENT=[Dummy1], OTHER_EVENT=[Other])
+        )
+        for i in range(12):
+            service.save_event(Event(
+                type='DUMMY_EVENT' if i % 3 else 'OTHER_EVENT',
+                author=i % 2 + 1,
+                object_id=i % 4,
+                created=self.start + timedelta(days=i // 2)
+            ))
+        return service
+
+    def test_create_query(self):
+        """ Creating query from event service """
+        query = EventService(db=self.db).query()
+        self.assertIsInstance(query, EventQuery)
+        self.assertIn('ORDER BY', repr(query))
+
+    def test_filter_events(self):
+        """ Filtering events by type, author, object and date """
+        service = self.service()
+        self.assertEquals(12, service.query().count())
+        self.assertEquals(4, service.query().type('OTHER_EVENT').count())
+        self.assertEquals(6, service.query().author(1).count())
+        self.assertEquals(6, service.query().object_id(1, 2).count())
+
+        query = service.query().created(
+            since=self.start + timedelta(days=1),
+            until=self.start + timedelta(days=2)
+        )
+        self.assertEquals([3, 4, 5, 6], [e.id for e in query.all()])
+
+        query = service.query().type('DUMMY_EVENT').author(1).object_id(2)
+        self.assertEquals([3, 11], [e.id for e in query.all()])
+
+    def test_order_events(self):
+        """ Ordering events """
+        service = self.service()
+        query = service.query().type('OTHER_EVENT')
+        self.assertEquals([1, 4, 7, 10], [e.id for e in query.all()])
+
+        query.order_by('created', reverse=True)
+        self.assertEquals([10, 7, 4, 1], [e.id for e in query.all()])
+        self.assertEquals(10, query.first().id)
+        self.assertEquals([10, 7], [e.id for e in query.all(limit=2)])
+
+        with self.assertRaises(x.ConfigurationException):
+            query.order_by('author')
+
+    def test_keyset_pagination(self):
+        """ Paging through events with keyset pagination """
+        service = self.service()
+        for order in ('id', 'created'):
+            for reverse in (False, True):
+                query = service.query().order_by(order, reverse)
+                first = query.page(5)
+                second = query.page(5, after=first[-1])
+                third = query.page(5, after=second[-1])
+                ids = [e.id for e in first + second + third]
+                self.assertEquals(sorted(ids, reverse=reverse), ids)
+                self.assertEquals(2, len(third))
+
+        query = service.query().author(2).order_by('created')
+        ids = [e.id for e in query.iter(batch_size=2)]
+        self.assertEquals([2, 4, 6, 8, 10, 12], ids)
+
+    def test_date_queries_use_composite_indexes(self):
+        """ Type and author date range queries use composite indexes """
+        service = self.service()
+        for filter, index in (('type', 'type_created'),
+                              ('author', 'author_created')):
+            query = getattr(service.query(), filter)('1')
+            query = query.created(since=self.start).select()
+            compiled = query.compile(
+                dialect=self.db.engine.dialect,
+                compile_kwargs=dict(literal_binds=True)
+            )
+            with self.db.engine.connect() as conn:
+                plan = conn.execute('EXPLAIN QUERY PLAN {}'.format(compiled))
+                plan = ' '.join(str(row) for row in plan)
+            self.assertIn('ix_event_store_' + index, plan)
+
+    def test_normalize_types(self):
+        """ Filtering by type normalizes types like validator """
+        service = self.service()
+        self.assertEquals(4, service.query().type(' other_event ').count())
+
+    def test_query_archived_events(self):
+        """ Querying archived events when service reads archive """
+        self.service()
+        events = self.db.tables['events']
+        archive = self.db.tables['archive']
+        with self.db.engine.begin() as conn:
+            moved = events.select().where(events.c.id <= 6)
+            columns = [column.name for column in events.columns]
+            conn.execute(archive.insert().from_select(columns, moved))
+            conn.execute(events.delete().where(events.c.id <= 6))
+
+        service = EventService(db=self.db)
+        self.assertEquals(6, service.query().count())
+
+        service = EventService(db=self.db, read_archive=True)
+        self.assertEquals(12, service.query().count())
+        query = service.query().type('OTHER_EVENT')
+        self.assertEquals(4, query.count())
+        self.assertEquals([1, 4, 7, 10], [e.id for e in query.all()])
+
+        query = service.query().order_by('created', reverse=True)
+        first = query.page(5)
+        second = query.page(5, after=first[-1])
+        ids = [e.id for e in first + second + query.page(5, second[-1])]
+        self.assertEquals(list(range(12, 0, -1)), ids)
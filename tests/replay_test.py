@@ -0,0 +1,197 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+import os
+from shiftevent import exceptions as x
+from shiftevent.event_service import EventService
+from shiftevent.handlers import BaseHandler
+from shiftevent.handlers import NoTypes
+from shiftevent.replay import Replay
+
+
+class ProjectionHandler(BaseHandler):
+    """ Appends event ids to a file per object """
+    EVENT_TYPES = ('DUMMY_EVENT',)
+
+    def handle(self, event):
+        if event.id == self.context.get('fail_on'):
+            raise Exception('Handler exception')
+        path = os.path.join(self.context['path'], str(event.object_id))
+        with open(path, 'a') as file:
+            file.write('{}\n'.format(event.id))
+        return event
+
+    def rollback(self, event):
+        return event
+
+
+class CollectingHandler(BaseHandler):
+    """ Collects replayed events in context """
+    EVENT_TYPES = ('DUMMY_EVENT',)
+
+    def handle(self, event):
+        self.context['replayed'].append(event.id)
+        return event
+
+    def rollback(self, event):
+        return event
+
+
+@attr('event', 'replay')
+class ReplayTest(BaseTestCase):
+
+    def populate(self, service, count, objects=5):
+        """ Write some events """
+        for i in range(count):
+            service.event(
+                type='DUMMY_EVENT',
+                author=1,
+                object_id=i % objects,
+                payload={}
+            )
+
+    def projection(self):
+        """ Read projected event ids per object """
+        projection = dict()
+        for object_id in os.listdir(self.tmp):
+            with open(os.path.join(self.tmp, object_id)) as file:
+                ids = [int(line) for line in file.read().split()]
+            projection[object_id] = ids
+        return projection
+
+    def test_instantiating_replay(self):
+        """ Instantiating replay """
+        service = EventService(db=self.db)
+        replay = Replay(service, [ProjectionHandler], workers=2)
+        self.assertIsInstance(replay, Replay)
+        self.assertEquals(['DUMMY_EVENT'], replay.types)
+
+    def test_raise_on_bad_config(self):
+        """ Raise on invalid replay configuration """
+        service = EventService(db=self.db)
+        with self.assertRaises(x.ConfigurationException):
+            Replay(service, [ProjectionHandler], batch_size=0)
+        with self.assertRaises(x.MissingEventType):
+            Replay(service, [NoTypes])
+        with self.assertRaises(x.HandlerInstantiationError):
+            Replay(service, [object])
+
+    def test_partition_by_object_keeping_order(self):
+        """ Partitioning batch by object keeps id order """
+        service = EventService(db=self.db)
+        replay = Replay(service, [ProjectionHandler], workers=3)
+        rows = [dict(id=i, object_id=str(i % 4)) for i in range(1, 21)]
+        partitions = replay.partition(rows)
+        self.assertEquals(20, sum(len(p) for p in partitions))
+        for partition in partitions:
+            ids = [row['id'] for row in partition]
+            self.assertEquals(sorted(ids), ids)
+            for object_id in set(row['object_id'] for row in partition):
+                other = [p for p in partitions if p is not partition]
+                for rows in other:
+                    self.assertNotIn(
+                        object_id,
+                        [row['object_id'] for row in rows]
+                    )
+
+    def test_replay_in_current_process(self):
+        """ Replaying events without worker processes """
+        service = EventService(db=self.db)
+        self.populate(service, 12)
+        context = dict(replayed=[])
+        replay = Replay(
+            service,
+            [CollectingHandler],
+            workers=0,
+            batch_size=5,
+            handler_context=context
+        )
+        self.assertEquals(12, replay.run())
+        self.assertEquals(list(range(1, 13)), context['replayed'])
+
+    def test_replay_across_processes(self):
+        """ Replaying events across worker processes in order per object """
+        service = EventService(db=self.db)
+        self.populate(service, 40)
+        progress = []
+        replay = Replay(
+            service,
+            [ProjectionHandler],
+            workers=3,
+            batch_size=7,
+            handler_context=dict(path=self.tmp),
+            progress=lambda *args: progress.append(args)
+        )
+        self.assertEquals(40, replay.run())
+
+        projection = self.projection()
+        self.assertEquals(5, len(projection))
+        for object_id, ids in projection.items():
+            expected = list(range(int(object_id) + 1, 41, 5))
+            self.assertEquals(expected, ids)
+
+        self.assertEquals((7, 40, 7), progress[0])
+        self.assertEquals((40, 40, 40), progress[-1])
+
+    def test_resume_from_checkpoint(self):
+        """ Failed replay resumes from last checkpointed batch """
+        service = EventService(db=self.db)
+        self.populate(service, 20)
+        context = dict(path=self.tmp, fail_on=13)
+        replay = Replay(
+            service,
+            [ProjectionHandler],
+            name='projection',
+            workers=2,
+            batch_size=5,
+            handler_context=context
+        )
+        with self.assertRaises(Exception):
+            replay.run()
+        self.assertEquals(10, service.get_checkpoint('projection'))
+
+        del context['fail_on']
+        replay = Replay(
+            service,
+            [ProjectionHandler],
+            name='projection',
+            workers=2,
+            batch_size=5,
+            handler_context=context
+        )
+        self.assertEquals(10, replay.run())
+        self.assertEquals(20, service.get_checkpoint('projection'))
+
+        replayed = set()
+        for ids in self.projection().values():
+            replayed.update(ids)
+        self.assertEquals(set(range(1, 21)), replayed)
+
+    def test_count_archived_events(self):
+        """ Counting archived events when service reads archive """
+        self.populate(EventService(db=self.db), 10)
+        events = self.db.tables['events']
+        archive = self.db.tables['archive']
+        with self.db.engine.begin() as conn:
+            moved = events.select().where(events.c.id <= 4)
+            columns = [column.name for column in events.columns]
+            conn.execute(archive.insert().from_select(columns, moved))
+            conn.execute(events.delete().where(events.c.id <= 4))
+
+        replay = Replay(EventService(db=self.db), [CollectingHandler])
+        self.assertEquals(6, replay.count())
+
+        service = EventService(db=self.db, read_archive=True)
+        context = dict(replayed=[])
+        progress = []
+        replay = Replay(
+            service,
+            [CollectingHandler],
+            workers=0,
+            handler_context=context,
+            progress=lambda *args: progress.append(args)
+        )
+        self.assertEquals(10, replay.count())
+        self.assertEquals(7, replay.count(after_id=3))
+        self.assertEquals(10, replay.run())
+        self.assertEquals((10, 10, 10), progress[-1])
@@ -0,0 +1,34 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+from shiftevent.snapshot import Snapshot
+from shiftevent.snapshot import JsonSerializer
+from shiftevent.snapshot import PickleSerializer
+from datetime import datetime
+
+
+@attr('snapshot')
+class SnapshotTest(BaseTestCase):
+
+    def test_instantiating_snapshot(self):
+        """ Instantiating snapshot """
+        snapshot = Snapshot(object_id='123', event_id=1, state={'a': 1})
+        self.assertIsInstance(snapshot, Snapshot)
+        self.assertIsInstance(snapshot.created, datetime)
+        self.assertIn('<Snapshot', repr(snapshot))
+
+    def test_json_serializer(self):
+        """ Serializing state to json """
+        state = dict(body='I am the state 😂', count=2)
+        serializer = JsonSerializer()
+        data = serializer.serialize(state)
+        self.assertTrue(type(data) is bytes)
+        self.assertEquals(state, serializer.deserialize(data))
+
+    def test_pickle_serializer(self):
+        """ Serializing state with pickle """
+        state = dict(created=datetime(2019, 1, 1), items={1, 2})
+        serializer = PickleSerializer()
+        data = serializer.serialize(state)
+        self.assertTrue(type(data) is bytes)
+        self.assertEquals(state, serializer.deserialize(data))
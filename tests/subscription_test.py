@@ -0,0 +1,242 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+
+import threading
+import time
+from datetime import datetime
+from shiftevent import exceptions as x
+from shiftevent.event_service import EventService
+from shiftevent.handlers import Dummy1
+from shiftevent.subscription import Subscription
+
+
+class Other(Dummy1):
+    """ Handler for other event type """
+    EVENT_TYPES = ('OTHER_EVENT',)
+
+
+@attr('event', 'subscription')
+class SubscriptionTest(BaseTestCase):
+
+    def populate(self, service, count, type='DUMMY_EVENT'):
+        """ Write some events """
+        for i in range(count):
+            service.event(type=type, author=1, object_id=i, payload={})
+
+    def test_instantiating_subscription(self):
+        """ Instantiating subscription """
+        service = EventService(db=self.db)
+        subscription = Subscription(service, 'projector', print)
+        self.assertIsInstance(subscription, Subscription)
+        self.assertIsNone(subscription.position)
+
+    def test_raise_on_bad_config(self):
+        """ Raise on invalid subscription configuration """
+        service = EventService(db=self.db)
+        with self.assertRaises(x.ConfigurationException):
+            Subscription(service, 'projector', print, batch_size=0)
+        with self.assertRaises(x.ConfigurationException):
+            Subscription(service, 'projector', print, max_interval=0.01)
+
+    def test_catch_up_delivers_events_in_order(self):
+        """ Catching up delivers all events in order """
+        service = EventService(db=self.db)
+        self.populate(service, 25)
+        delivered = []
+        subscription = Subscription(
+            service,
+            'projector',
+            lambda e: delivered.append(e.id),
+            batch_size=10
+        )
+        self.assertEquals(25, subscription.catch_up())
+        self.assertEquals(list(range(1, 26)), delivered)
+        self.assertEquals(25, subscription.get_checkpoint())
+
+    def test_resume_from_checkpoint(self):
+        """ New subscription resumes from persisted checkpoint """
+        service = EventService(db=self.db)
+        self.populate(service, 5)
+        Subscription(service, 'projector', lambda e: None).catch_up()
+        self.populate(service, 3)
+
+        delivered = []
+        subscription = Subscription(
+            service,
+            'projector',
+            lambda e: delivered.append(e.id)
+        )
+        subscription.catch_up()
+        self.assertEquals([6, 7, 8], delivered)
+
+        other = Subscription(service, 'other', lambda e: None)
+        self.assertEquals(8, other.catch_up())
+
+    def test_filter_by_type(self):
+        """ Subscription only delivers events of given types """
+        handlers = dict(DUMMY_EVENT=[Dummy1], OTHER_EVENT=[Other])
+        service = EventService(db=self.db, handlers=handlers)
+        self.populate(service, 2)
+        self.populate(service, 3, type='OTHER_EVENT')
+        delivered = []
+        subscription = Subscription(
+            service,
+            'projector',
+            lambda e: delivered.append(e.type),
+            types='OTHER_EVENT'
+        )
+        subscription.catch_up()
+        self.assertEquals(['OTHER_EVENT'] * 3, delivered)
+
+    def test_batch_checkpoint_commits(self):
+        """ Checkpoint is committed every so many events """
+        service = EventService(db=self.db)
+        self.populate(service, 7)
+        subscription = Subscription(
+            service,
+            'projector',
+            lambda e: None,
+            checkpoint_every=3
+        )
+        subscription.poll()
+        self.assertEquals(6, subscription.get_checkpoint())
+        self.assertTrue(subscription.pending)
+        subscription.commit()
+        self.assertEquals(7, subscription.get_checkpoint())
+
+    def test_commit_delivered_events_on_failure(self):
+        """ Commit checkpoint of delivered events when callback fails """
+        service = EventService(db=self.db)
+        self.populate(service, 5)
+
+        def callback(event):
+            if event.id == 4:
+                raise Exception('Callback exception')
+
+        subscription = Subscription(service, 'projector', callback)
+        with self.assertRaises(Exception):
+            subscription.poll()
+        self.assertEquals(3, subscription.get_checkpoint())
+
+    def test_backoff_when_idle(self):
+        """ Polling backs off when idle and resets on new events """
+        service = EventService(db=self.db)
+        subscription = Subscription(
+            service,
+            'projector',
+            lambda e: None,
+            batch_size=10,
+            min_interval=1,
+            max_interval=5
+        )
+        intervals = [subscription.next_interval(0) for _ in range(5)]
+        self.assertEquals([1, 2, 4, 5, 5], intervals)
+        self.assertEquals(0, subscription.next_interval(10))
+        self.assertEquals(1, subscription.next_interval(0))
+
+    def test_run_until_stopped(self):
+        """ Running subscription follows the store until stopped """
+        service = EventService(db=self.db)
+        self.populate(service, 3)
+        stop = threading.Event()
+
+        def callback(event):
+            if event.id == 3:
+                stop.set()
+
+        subscription = Subscription(service, 'projector', callback)
+        subscription.run(stop)
+        self.assertEquals(3, subscription.get_checkpoint())
+
+    def test_deliver_events_committed_out_of_order(self):
+        """ Events committed after higher ids are delivered late """
+        service = EventService(db=self.db)
+        self.populate(service, 4)
+        events = self.db.tables['events']
+        with self.db.engine.begin() as conn:
+            query = events.select().where(events.c.id.in_([2, 3]))
+            in_flight = [dict(row) for row in conn.execute(query)]
+            conn.execute(events.delete().where(events.c.id.in_([2, 3])))
+
+        delivered = []
+        subscription = Subscription(
+            service,
+            'projector',
+            lambda e: delivered.append(e.id)
+        )
+        subscription.catch_up()
+        self.assertEquals([1, 4], delivered)
+        self.assertEquals(1, subscription.get_checkpoint())
+
+        with self.db.engine.begin() as conn:
+            conn.execute(events.insert(), in_flight[1:])
+        subscription.catch_up()
+        self.assertEquals([1, 4, 3], delivered)
+        self.assertEquals(1, subscription.get_checkpoint())
+
+        with self.db.engine.begin() as conn:
+            conn.execute(events.insert(), in_flight[:1])
+        subscription.catch_up()
+        self.assertEquals([1, 4, 3, 2], delivered)
+        self.assertEquals(4, subscription.get_checkpoint())
+
+    def test_skip_gaps_after_timeout(self):
+        """ Gaps are no longer waited for after gap timeout """
+        handlers = dict(DUMMY_EVENT=[Dummy1], OTHER_EVENT=[Other])
+        service = EventService(db=self.db, handlers=handlers)
+        self.populate(service, 1)
+        self.populate(service, 1, type='OTHER_EVENT')
+        self.populate(service, 2)
+        events = self.db.tables['events']
+        with self.db.engine.begin() as conn:
+            conn.execute(events.delete().where(events.c.id == 3))
+
+        subscription = Subscription(
+            service,
+            'projector',
+            lambda e: None,
+            types='DUMMY_EVENT',
+            gap_timeout=0.01
+        )
+        subscription.catch_up()
+        self.assertEquals([3], list(subscription.gaps))
+        self.assertEquals(2, subscription.get_checkpoint())
+
+        time.sleep(0.02)
+        subscription.catch_up()
+        self.assertEquals({}, subscription.gaps)
+        self.assertEquals(4, subscription.get_checkpoint())
+
+    def test_only_wait_for_recent_gaps(self):
+        """ Only gaps near the head of the store are waited for """
+        service = EventService(db=self.db)
+        events = self.db.tables['events']
+        rows = [dict(
+            id=id,
+            created=datetime.utcnow(),
+            type='DUMMY_EVENT',
+            author='1',
+            object_id='1',
+            payload='{}',
+            payload_rollback='{}'
+        ) for id in range(2, 4001, 2)]
+        with self.db.engine.begin() as conn:
+            conn.execute(events.insert(), rows)
+
+        subscription = Subscription(
+            service,
+            'projector',
+            lambda e: None,
+            batch_size=500
+        )
+        self.assertEquals(2000, subscription.catch_up())
+        self.assertEquals(250, len(subscription.gaps))
+        self.assertGreater(min(subscription.gaps), 3500)
+        self.assertEquals(3500, subscription.get_checkpoint())
+
+        subscription.GAP_RANGES = 3
+        self.assertEquals(3, len(subscription.gap_ranges()))
+        with self.db.engine.begin() as conn:
+            conn.execute(events.insert(), [dict(rows[0], id=3999)])
+        self.assertEquals(1, subscription.catch_up())
+        self.assertNotIn(3999, subscription.gaps)
@@ -0,0 +1,179 @@
+from tests.base import BaseTestCase
+from nose.plugins.attrib import attr
+from unittest import skipIf
+
+import os
+from shiftevent import codecs
+from shiftevent import exceptions as x
+from shiftevent.db import Db
+from shiftevent.event_service import EventService
+from shiftevent.handlers import Dummy1
+from shiftevent.transfer import Exporter, Importer, get_compression
+from shiftevent.transfer import read_lines
+
+
+class Interrupt(Exception):
+    """ Raised to interrupt a transfer """
+    pass
+
+
+class Other(Dummy1):
+    """ Handler of other events """
+    EVENT_TYPES = ('OTHER_EVENT',)
+
+
+@attr('event', 'transfer')
+class TransferTest(BaseTestCase):
+
+    def populate(self, count=10):
+        """ Write events of two objects to test database """
+        handlers = dict(DUMMY_EVENT=[Dummy1], OTHER_EVENT=[Other])
+        service = EventService(db=self.db, handlers=handlers)
+        for i in range(count):
+            service.event(
+                type='DUMMY_EVENT' if i % 5 else 'OTHER_EVENT',
+                author=1,
+                object_id=i % 2,
+                payload={'i': i, 'text': 'Event {}'.format(i)},
+                payload_rollback={'i': -i}
+            )
+        return service
+
+    def target(self):
+        """ Create event service over an empty target database """
+        path = os.path.join(self.tmp, 'target.db')
+        db = Db('sqlite:///{}'.format(path))
+        db.meta.create_all()
+        return EventService(db=db)
+
+    def interrupt(self, after):
+        """ Create progress callback interrupting transfer """
+        def progress(events, last_id):
+            if events >= after:
+                raise Interrupt()
+        return progress
+
+    def assert_transferred(self, source, target):
+        """ Assert target store holds same events as source """
+        expected = list(source.iter_events())
+        events = list(target.iter_events())
+        self.assertEquals(len(expected), len(events))
+        for event, imported in zip(expected, events):
+            self.assertEquals(event.to_dict(), imported.to_dict())
+
+    def test_detect_compression(self):
+        """ Detecting compression from file extension """
+        self.assertEquals('gzip', get_compression('events.ndjson.gz'))
+        self.assertEquals('none', get_compression('events.ndjson'))
+        self.assertEquals('gzip', get_compression('events', 'gzip'))
+        with self.assertRaises(x.ConfigurationException):
+            get_compression('events', 'lzma')
+        with self.assertRaises(x.ConfigurationException):
+            Exporter(self.populate(0), batch_size=0)
+
+    @skipIf(not codecs.zstandard, 'zstandard is not installed')
+    def test_detect_zstd_compression(self):
+        """ Detecting zstd compression from file extension """
+        self.assertEquals('zstd', get_compression('events.ndjson.zst'))
+
+    def test_export_and_import(self):
+        """ Exporting and importing events with every compression """
+        source = self.populate()
+        names = ['events.ndjson', 'events.ndjson.gz']
+        if codecs.zstandard:
+            names.append('events.zst')
+        for name in names:
+            path = os.path.join(self.tmp, name)
+            stats = Exporter(source, batch_size=3).export(path)
+            self.assertEquals(10, stats['events'])
+            self.assertEquals(10, stats['last_id'])
+            self.assertEquals(10, len(list(read_lines(path))))
+
+            target = self.target()
+            stats = Importer(target, batch_size=4).import_events(path)
+            self.assertEquals(10, stats['events'])
+            self.assertGreater(stats['events_per_sec'], 0)
+            self.assert_transferred(source, target)
+
+            event = target.event(type='DUMMY_EVENT', author=1, object_id=1)
+            self.assertEquals(11, event.id)
+            self.assertEquals(6, event.version)
+            os.remove(os.path.join(self.tmp, 'target.db'))
+
+    def test_export_event_types(self):
+        """ Exporting selected event types """
+        source = self.populate()
+        path = os.path.join(self.tmp, 'events.ndjson')
+        stats = Exporter(source).export(path, types=['OTHER_EVENT'])
+        self.assertEquals(2, stats['events'])
+
+    def test_resume_export(self):
+        """ Resuming interrupted export """
+        source = self.populate()
+        path = os.path.join(self.tmp, 'events.ndjson.gz')
+        exporter = Exporter(source, batch_size=3)
+        with self.assertRaises(Interrupt):
+            exporter.export(path, progress=self.interrupt(6))
+        self.assertTrue(os.path.exists(path + '.checkpoint'))
+
+        stats = exporter.export(path, resume=True)
+        self.assertEquals(4, stats['events'])
+        self.assertEquals(10, stats['total'])
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+        ids = [line.split(',')[0] for line in read_lines(path)]
+        self.assertEquals(['{{"id":{}'.format(i) for i in range(1, 11)], ids)
+
+        with self.assertRaises(x.EventError):
+            exporter.export(path, resume=True)
+
+    def test_resume_import(self):
+        """ Resuming interrupted import """
+        source = self.populate()
+        path = os.path.join(self.tmp, 'events.ndjson')
+        Exporter(source).export(path)
+
+        target = self.target()
+        importer = Importer(target, batch_size=4)
+        with self.assertRaises(Interrupt):
+            importer.import_events(path, progress=self.interrupt(4))
+        self.assertEquals(4, importer.last_id())
+
+        stats = importer.import_events(path, resume=True)
+        self.assertEquals(6, stats['events'])
+        self.assert_transferred(source, target)
+
+    def test_export_archived_events(self):
+        """ Exporting archived events along with the store """
+        source = self.populate(4)
+        events = self.db.tables['events']
+        archive = self.db.tables['archive']
+        with self.db.engine.begin() as conn:
+            moved = events.select().where(events.c.id <= 3)
+            columns = [column.name for column in events.columns]
+            conn.execute(archive.insert().from_select(columns, moved))
+            conn.execute(events.delete().where(events.c.id <= 3))
+
+        path = os.path.join(self.tmp, 'events.ndjson')
+        stats = Exporter(source, batch_size=2).export(path)
+        self.assertEquals(4, stats['events'])
+        ids = [line.split(',')[0] for line in read_lines(path)]
+        self.assertEquals(['{{"id":{}'.format(i) for i in range(1, 5)], ids)
+
+    def test_export_events_without_payloads(self):
+        """ Exporting events stored without payloads """
+        source = self.populate(2)
+        events = self.db.tables['events']
+        with self.db.engine.begin() as conn:
+            conn.execute(events.update().where(events.c.id == 1).values(
+                payload=None,
+                payload_rollback=None
+            ))
+
+        path = os.path.join(self.tmp, 'events.ndjson')
+        self.assertEquals(2, Exporter(source).export(path)['events'])
+        target = self.target()
+        Importer(target).import_events(path)
+        self.assertEquals({}, target.get_event(1).payload)
+        payload = target.get_event(2).payload
+        self.assertEquals({'i': 1, 'text': 'Event 1'}, payload)